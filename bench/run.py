@@ -0,0 +1,477 @@
+"""Benchmarks for the SDK hot paths.
+
+Every benchmark runs in process against StandInServer, so no account or network is
+needed. Results are written as JSON so runs of different SDK versions can be compared:
+
+    python bench/run.py
+    python bench/run.py --compare old_bench_output.txt
+
+Rates (items/s, MB/s) are better when higher, times (us/op) and memory (KB, B/item) when lower.
+
+Memory benchmarks report the peak and retained memory of an operation, and the bytes
+each resulting item holds on to. Peak and retained memory come from tracemalloc where
+the interpreter has it, otherwise from the resident set size of the process.
+"""
+if __package__ is None:
+    import os
+    from os import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import gc
+import os
+import sys
+import json
+import time
+import uuid
+import types
+import platform
+import subprocess
+import argparse
+import StringIO
+import datetime
+import threading
+import collections
+
+try:
+    import tracemalloc
+except ImportError:
+    # only on Python 3, or Python 2 built with the pytracemalloc patch
+    tracemalloc = None
+
+import requests
+
+from buttfs.path import Path
+from buttfs.errors import error_from_response
+from buttfs.standin import StandInServer
+from buttfs.private import codec
+from buttfs.private.workers import run_concurrently
+from buttfs.private.filesystem_common import create_items_from_json
+
+MB = 1024 * 1024
+
+# unit of each result and whether a bigger value is better
+UNITS = {
+    'items/s': True,
+    'MB/s': True,
+    'us/op': False,
+    'ms': False,
+    'KB': False,
+    'B/item': False,
+}
+
+# import statements timed in a new interpreter, and the most milliseconds each may take
+IMPORT_BUDGETS = collections.OrderedDict([
+    ('import_package', ('import buttfs', 5.0)),
+    # mostly requests, which every session needs
+    ('import_session', ('from buttfs import Session', 150.0)),
+])
+
+# item counts of the listing memory benchmarks, before scaling
+MEMORY_LIST_COUNTS = (10000, 100000, 1000000)
+
+
+def best_time(function, number, repeat=3):
+    """
+    :param function:    Function without arguments.
+    :param number:      Calls per timing.
+    :param repeat:      Number of timings.
+    :return:            Fastest time of a single call, in seconds.
+    """
+    best = None
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in xrange(repeat):
+            start = time.time()
+            for _ in xrange(number):
+                function()
+            elapsed = (time.time() - start) / number
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best
+
+
+def current_rss_kb():
+    """
+    :return: Resident set size of the process in KB, None where it is not available.
+    """
+    try:
+        with open('/proc/self/statm') as fp:
+            pages = int(fp.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024
+    except (IOError, OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class MemoryProbe(object):
+    """Peak and retained memory of the block it runs, in KB. Retained memory is measured after a
+    collection when the block ends, so anything the block should hold must still be referenced.
+
+    source:     'tracemalloc', 'rss', or None when neither is available.
+    peak:       Most memory in use during the block, above what was in use before it.
+    retained:   Memory still in use when the block ended, above what was in use before it.
+    """
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.source = None
+        self.peak = None
+        self.retained = None
+
+    def __enter__(self):
+        gc.collect()
+        if tracemalloc is not None:
+            self.source = 'tracemalloc'
+            tracemalloc.start()
+            return self
+        self._baseline = current_rss_kb()
+        if self._baseline is not None:
+            self.source = 'rss'
+            self._highest = self._baseline
+            self._done = threading.Event()
+            self._sampler = threading.Thread(target=self._sample)
+            self._sampler.daemon = True
+            self._sampler.start()
+        return self
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self._highest = max(self._highest, current_rss_kb())
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        gc.collect()
+        if self.source == 'tracemalloc':
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.peak, self.retained = peak / 1024, current / 1024
+        elif self.source == 'rss':
+            self._done.set()
+            self._sampler.join()
+            current = current_rss_kb()
+            self.peak = max(self._highest, current) - self._baseline
+            self.retained = current - self._baseline
+
+
+class ExistingObjects(object):
+    """Every object the collector tracks, and the objects they refer to. They are kept alive, so
+    objects made later cannot reuse their ids.
+    """
+    def __init__(self):
+        gc.collect()
+        self._objects = gc.get_objects()
+        self._referents = [gc.get_referents(o) for o in self._objects]
+        self._ids = set(id(o) for o in self._objects)
+        for referents in self._referents:
+            self._ids.update(id(o) for o in referents)
+
+    def __contains__(self, o):
+        return id(o) in self._ids
+
+
+# shared by the whole program rather than held by a result
+_NOT_RETAINED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.ClassType)
+
+
+def retained_bytes(result, existing):
+    """Size of everything result refers to, directly or not, that did not exist before it was made.
+
+    :param result:      Object to measure, i.e. a list of items.
+    :param existing:    ExistingObjects taken before result was made.
+    :return:            Bytes, as counted by sys.getsizeof.
+    """
+    seen = set()
+    total = 0
+    pending = [result]
+    while pending:
+        o = pending.pop()
+        if id(o) in seen or o in existing or isinstance(o, _NOT_RETAINED):
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        pending.extend(gc.get_referents(o))
+    return total
+
+
+def count_label(count):
+    if count >= 1000000 and not count % 1000000:
+        return '{}m'.format(count / 1000000)
+    if count >= 1000 and not count % 1000:
+        return '{}k'.format(count / 1000)
+    return str(count)
+
+
+def make_rows(count):
+    now = time.time()
+    rows = []
+    for index in xrange(count):
+        row = {
+            'id': uuid.uuid4().hex,
+            'name': 'item {}'.format(index),
+            'version': 1,
+            'date_created': now,
+            'date_meta_last_modified': now,
+            'date_content_last_modified': now,
+            'application_data': {},
+        }
+        if index % 10:
+            row.update({'type': 'file', 'size': index, 'extension': 'txt', 'mime': 'text/plain'})
+        else:
+            row['type'] = 'folder'
+        rows.append(row)
+    return rows
+
+
+class Bench(object):
+    """Benchmarks sharing one authenticated session on a stand-in server."""
+
+    def __init__(self, scale=1.0, latency=0, memory_limit=2048):
+        self.scale = scale
+        self.memory_limit = memory_limit
+        self.server = StandInServer(latency=latency)
+        self.session = self.server.session()
+        self.session.authenticate(self.server.username, self.server.password)
+        self.rest = self.session.rest_interface
+        self.root = self.session.get_filesystem().root_container()
+        self.results = collections.OrderedDict()
+
+    def count(self, base):
+        return max(1, int(base * self.scale))
+
+    def record(self, name, value, unit, **details):
+        result = collections.OrderedDict([('value', round(value, 3)), ('unit', unit)])
+        result.update(sorted(details.items()))
+        self.results[name] = result
+
+    def bench_list_throughput(self):
+        rows = make_rows(self.count(2000))
+        parent = Path.path_from_string('/' + uuid.uuid4().hex)
+        seconds = best_time(lambda: create_items_from_json(self.rest, rows, parent), 1)
+        self.record('list_throughput', len(rows) / seconds, 'items/s', items=len(rows))
+
+    def bench_path(self):
+        ids = [uuid.uuid4().hex for _ in xrange(8)]
+        path_string = '/' + '/'.join(ids)
+        number = self.count(5000)
+        seconds = best_time(lambda: Path.path_from_string(path_string), number)
+        self.record('path_build', seconds * 1e6, 'us/op', depth=len(ids))
+        path = Path.path_from_string(path_string)
+        seconds = best_time(lambda: str(path.parent.child(ids[-1])), number)
+        self.record('path_stringify', seconds * 1e6, 'us/op', depth=len(ids))
+
+    def record_memory(self, name, probe, held_bytes, items, **details):
+        self.record(name, held_bytes / float(items), 'B/item', items=items, **details)
+        if probe.source is not None:
+            self.record(name + '_peak', probe.peak, 'KB', source=probe.source)
+            self.record(name + '_retained', probe.retained, 'KB', source=probe.source)
+
+    def bench_memory_list(self):
+        parent = Path.path_from_string('/' + uuid.uuid4().hex)
+        bytes_per_item = 0
+        for base in MEMORY_LIST_COUNTS:
+            count = self.count(base)
+            name = 'memory_list_' + count_label(count)
+            # estimated from the smaller listings
+            needed_mb = bytes_per_item * count / MB
+            if needed_mb > self.memory_limit:
+                sys.stderr.write('Skipped {}: it would need about {} MB, past --memory-limit.\n'.format(
+                    name, int(needed_mb)))
+                continue
+            existing = ExistingObjects()
+            with MemoryProbe() as probe:
+                # rows are made inside the probe, as a listing decodes them
+                items = create_items_from_json(self.rest, make_rows(count), parent)
+            held = retained_bytes(items, existing)
+            self.record_memory(name, probe, held, count)
+            bytes_per_item = max(bytes_per_item, held / float(count), (probe.peak or 0) * 1024.0 / count)
+            del items, existing
+
+    def _make_tree(self, depth, files):
+        folder = self.root.create_folder(uuid.uuid4().hex)
+        top = folder
+        for level in xrange(depth):
+            for index in xrange(files):
+                folder.upload('x', custom_name='file {}.txt'.format(index), data_inline=True)
+            folder = folder.create_folder('level {}'.format(level))
+        return top
+
+    def bench_memory_walk(self):
+        depth, files = self.count(100), 10
+        top = self._make_tree(depth, files)
+        filesystem = self.session.get_filesystem()
+        existing = ExistingObjects()
+        with MemoryProbe() as probe:
+            items = filesystem.walk(top)
+        held = retained_bytes(items, existing)
+        self.record_memory('memory_walk', probe, held, len(items), depth=depth)
+
+    def bench_import_time(self, repeat=5):
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+        for name, (statement, budget) in IMPORT_BUDGETS.iteritems():
+            code = 'import time\nstart = time.time()\n{}\nprint(time.time() - start)'.format(statement)
+            seconds = min(float(subprocess.check_output([sys.executable, '-c', code], env=env))
+                          for _ in xrange(repeat))
+            self.record(name, seconds * 1000, 'ms', budget_ms=budget, over_budget=seconds * 1000 > budget)
+
+    def bench_get_copy(self):
+        seconds = best_time(self.rest.get_copy, self.count(2000))
+        self.record('get_copy', seconds * 1e6, 'us/op')
+
+    def bench_sign_request(self):
+        connection = self.rest.bc_conn
+        query = {'username': 'someone@example.com', 'password': 'secret', 'grant_type': 'password'}
+
+        def sign():
+            headers = connection._get_base_headers(oauth=True)
+            connection._sign_request('POST', '/v2/oauth2/token', query, headers)
+
+        seconds = best_time(sign, self.count(5000))
+        self.record('sign_request', seconds * 1e6, 'us/op')
+
+    def bench_error_from_response(self):
+        request = requests.Request('GET', 'https://{}/v2/folders/missing/'.format(self.server.host)).prepare()
+        response = requests.Response()
+        response.status_code = 404
+        response.headers['Content-Type'] = 'application/json'
+        response._content = codec.dumps({'error': {'code': 2003, 'message': 'Folder not found'}, 'result': None})
+        response.request = request
+
+        seconds = best_time(lambda: error_from_response(request, response), self.count(5000))
+        self.record('error_from_response', seconds * 1e6, 'us/op')
+
+    def _upload(self, size, name):
+        content = StringIO.StringIO('x' * size)
+        return self.root.upload(content, custom_name=name, data_inline=True)
+
+    def bench_upload(self):
+        size = self.count(16) * MB
+        start = time.time()
+        self._upload(size, 'upload.bin')
+        seconds = time.time() - start
+        self.record('upload', size / float(MB) / seconds, 'MB/s', size_mb=size / MB)
+        # in a new process: in this one the earlier benchmarks leave the peak and freed memory behind
+        code = 'import sys, json\nsys.path.insert(0, {!r})\nimport run\nprint(json.dumps(run.upload_memory({})))'.format(
+            os.path.dirname(os.path.abspath(__file__)), size)
+        source, peak = json.loads(subprocess.check_output([sys.executable, '-c', code]))
+        if source is not None:
+            self.record('upload_peak', peak, 'KB', source=source, size_mb=size / MB)
+
+    def bench_download(self):
+        size = self.count(16) * MB
+        item = self._upload(size, 'download.bin')
+        start = time.time()
+        item.read()
+        seconds = time.time() - start
+        self.record('download_single', size / float(MB) / seconds, 'MB/s', size_mb=size / MB)
+
+    def bench_parallel_download(self, streams=4):
+        size = self.count(4) * MB
+        items = [self._upload(size, 'parallel {}.bin'.format(index)) for index in xrange(streams)]
+
+        def download(item):
+            received = [0]
+
+            def save(response):
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    received[0] += len(chunk)
+
+            item.rest_interface.download(item.path(), save)
+            return received[0]
+
+        start = time.time()
+        results = run_concurrently(download, items, max_workers=streams)
+        seconds = time.time() - start
+        total = sum(result for _, result, _ in results)
+        self.record('download_parallel', total / float(MB) / seconds, 'MB/s',
+                    size_mb=total / MB, streams=streams)
+
+    def run(self, names=None):
+        benchmarks = [name[len('bench_'):] for name in dir(self) if name.startswith('bench_')]
+        for name in sorted(benchmarks):
+            if names and name not in names:
+                continue
+            getattr(self, 'bench_' + name)()
+        return self.results
+
+
+def upload_memory(size):
+    """Peak memory of an upload, for Bench.bench_upload to run in a new process.
+
+    :param size:    Bytes to upload.
+    :return:        MemoryProbe source and peak in KB. The content is made before the probe starts.
+    """
+    bench = Bench()
+    content = StringIO.StringIO('x' * size)
+    with MemoryProbe() as probe:
+        bench.root.upload(content, custom_name='upload.bin', data_inline=True)
+    return probe.source, probe.peak
+
+
+def environment(args):
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return collections.OrderedDict([
+        ('date', datetime.datetime.utcnow().isoformat() + 'Z'),
+        ('python', platform.python_version()),
+        ('implementation', platform.python_implementation()),
+        ('platform', platform.platform()),
+        ('requests', requests.__version__),
+        ('codec', codec.name()),
+        ('numpy', numpy_version),
+        ('scale', args.scale),
+        ('latency', args.latency),
+        ('memory_source', 'tracemalloc' if tracemalloc is not None else 'rss' if current_rss_kb() is not None else None),
+    ])
+
+
+def compare(old, new):
+    """
+    :param old: Results of an earlier run.
+    :param new: Results of this run.
+    :return:    Lines describing the change of every result in both runs.
+    """
+    lines = []
+    for name, result in new.iteritems():
+        if name not in old or old[name]['unit'] != result['unit'] or not old[name]['value']:
+            continue
+        ratio = result['value'] / old[name]['value']
+        faster = ratio >= 1 if UNITS[result['unit']] else ratio <= 1
+        lines.append('{:<24} {:>12} -> {:>12} {:<8} {:+.1%} {}'.format(
+            name, old[name]['value'], result['value'], result['unit'], ratio - 1,
+            'better' if faster else 'worse'))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the ButtFS SDK against a local stand-in server.')
+    parser.add_argument('names', nargs='*', help='Benchmarks to run. Defaults to all of them.')
+    parser.add_argument('--output', default='bench_output.txt', help='File the JSON results are written to.')
+    parser.add_argument('--compare', help='Earlier output file to compare the results with.')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplies the size of every benchmark.')
+    parser.add_argument('--latency', type=float, default=0, help='Seconds the stand-in waits before each response.')
+    parser.add_argument('--memory-limit', type=int, default=2048,
+                        help='MB a memory benchmark may use. Larger listings are skipped.')
+    args = parser.parse_args(argv)
+
+    results = Bench(args.scale, args.latency, args.memory_limit).run(args.names)
+    output = collections.OrderedDict([('environment', environment(args)), ('results', results)])
+
+    with open(args.output, 'w') as fp:
+        json.dump(output, fp, indent=2)
+        fp.write('\n')
+
+    for name, result in results.iteritems():
+        print '{:<24} {:>12} {}{}'.format(name, result['value'], result['unit'],
+                                          ' (over budget of {})'.format(result['budget_ms']) if result.get('over_budget') else '')
+    if args.compare:
+        with open(args.compare) as fp:
+            old = json.load(fp)['results']
+        print
+        print '\n'.join(compare(old, results))
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,91 @@
-from account import Account
-from container import Folder
-from errors import (
+"""ButtFS SDK.
+
+Public names are imported from their modules the first time they are used, so
+importing buttfs is cheap and programs only load the parts of the SDK, and of
+requests, that they use.
+"""
+import sys
+import types
+import importlib
+
+# public name: module that defines it
+_EXPORTS = {
+    'Account': '.account',
+    'BandwidthLimiter': '.bandwidth',
+    'TokenBucket': '.bandwidth',
+    'set_process_bandwidth_limits': '.bandwidth',
+    'MetaBatch': '.batch',
+    'BatchReport': '.batch',
+    'RequestBudget': '.budget',
+    'CostEstimate': '.budget',
+    'RequestBudgetWarning': '.budget',
+    'Folder': '.container',
+    'ContentIndex': '.content_index',
+    'File': '.file',
+    'Filesystem': '.filesystem',
+    'ItemIndex': '.index',
+    'LazyItemList': '.listing',
+    'RequestRecord': '.metrics',
+    'HistogramSink': '.metrics',
+    'PrometheusSink': '.metrics',
+    'CallbackSink': '.metrics',
+    'Path': '.path',
+    'SessionProfiler': '.profiler',
+    'ItemRecord': '.record',
+    'RequestLogPolicy': '.request_logging',
+    'Session': '.session',
+    'SessionPool': '.session_pool',
+    'ItemTable': '.table',
+    'TokenStore': '.token_store',
+    'Span': '.tracing',
+    'SpanCollector': '.tracing',
+    'current_span': '.tracing',
+    'User': '.user',
+    'ExistValues': '.private.buttfs_paths',
+    'RestoreValue': '.private.buttfs_paths',
+    'VersionConflictValue': '.private.buttfs_paths',
+    'ListFormat': '.private.buttfs_paths',
+    'OverBudgetValue': '.private.buttfs_paths',
+    'TransferPriority': '.private.buttfs_paths',
+}
+
+_ERRORS = (
     # SDK errors
-    SessionNotLinked, OperationNotAllowed, InvalidArgument, MissingArgument, MethodNotImplemented,
+    'SessionNotLinked', 'OperationNotAllowed', 'InvalidArgument', 'MissingArgument', 'MethodNotImplemented',
+    'PathNotFound', 'RequestBudgetExceeded', 'InsecureTokenStore',
     # ButtFS Server Errors
-    AuthenticatedError, GenericPanicError,
+    'AuthenticatedError', 'GenericPanicError',
     # Filesystem error
-    VersionMismatchIgnored,
+    'VersionMismatchIgnored',
     # File errors
-    FileNotFound, InvalidName, InvalidDateCreated, InvalidDateMetaLastModified,
-    InvalidDateContentLastModified, SizeMustBePositive, NameRequired, ToPathRequired,
-    VersionMissingOrIncorrect,
+    'FileNotFound', 'InvalidName', 'InvalidDateCreated', 'InvalidDateMetaLastModified',
+    'InvalidDateContentLastModified', 'SizeMustBePositive', 'NameRequired', 'ToPathRequired',
+    'VersionMissingOrIncorrect', 'FileVersionMissingOrIncorrect',
     # Folder errors
-    FolderDoesNotExist, FolderNotFound, MissingPathParameter, NameConflictInOperation,
-    VersionMissingOrIncorrect, NameRequred, DirectoryNotEmpty
+    'FolderDoesNotExist', 'FolderNotFound', 'MissingPathParameter', 'NameConflictInOperation',
+    'NameRequred', 'DirectoryNotEmpty',
 )
-from file import File
-from filesystem import Filesystem
-from path import Path
-from session import Session
-from user import User
-from private.buttfs_paths import ExistValues, RestoreValue, VersionConflictValue
+_EXPORTS.update((name, '.errors') for name in _ERRORS)
+
+__all__ = sorted(_EXPORTS)
+
+
+class _LazyPackage(types.ModuleType):
+    # stands in for this module in sys.modules
+    def __getattr__(self, name):
+        module_name = _EXPORTS.get(name)
+        if module_name is None:
+            raise AttributeError("'module' object has no attribute '{}'".format(name))
+        value = getattr(importlib.import_module(module_name, self.__name__), name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(_EXPORTS))
+
 
+_package = _LazyPackage(__name__, __doc__)
+_package.__dict__.update((key, value) for key, value in globals().items() if key.startswith('__'))
+# Python 2 clears the globals of a module that is no longer referenced
+_package._module = sys.modules[__name__]
+sys.modules[__name__] = _package
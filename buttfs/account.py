@@ -6,16 +6,25 @@ class Account(CachedObject):
     """
         REST Documentation: https://www.bitcasa.com/cloudfs-api-docs/api/Get%20Profile.html
     """
+    CACHE_NAME = 'account'
+
     def __init__(self, rest_interface, response_info):
         super(Account, self).__init__()
         self.rest_interface = rest_interface
         self._initialize_self(response_info, self.rest_interface.get_latest_header_info())
 
-    def _refresh_request(self):
-        result = self.rest_interface.user_profile()
+    def _refresh_request(self, debug=False):
+        if debug:
+            self.rest_interface.debug_requests(1)
+        result = self.rest_interface.cached_user_profile(refresh=True)
         headers = self.rest_interface.get_latest_header_info()
         return result, headers
 
+    def _storage_header(self, key):
+        # headers of the latest response in the session, falling back to when this was created
+        headers = self.rest_interface.get_latest_header_info() or self.data['headers']
+        return headers.get('storage', {}).get(key)
+
     def _initialize_self(self, request_info, x_headers):
         self.data = {'request':request_info, 'headers':x_headers}
 
@@ -31,6 +40,9 @@ class Account(CachedObject):
         """
         :return: Current storage usage of the account.
         """
+        usage = self._storage_header('usage')
+        if usage is not None:
+            return int(usage)
         return self.data['request']['storage']['usage']
 
     @property
@@ -38,7 +50,7 @@ class Account(CachedObject):
         """
         :return: Storage limit of the current account plan.
         """
-        return self.data['headers']['storage']['limit']
+        return self._storage_header('limit')
 
     @property
     def over_storage_limit(self):
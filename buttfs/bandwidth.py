@@ -0,0 +1,241 @@
+"""Bandwidth limits for uploads and downloads.
+
+Transfers take tokens from a token bucket for every block they send or receive, so
+a limited transfer runs at a steady rate instead of in bursts. Each session has its
+own limits for uploads and downloads, and every session also takes from the limits
+of the process, set with set_process_bandwidth_limits.
+
+When transfers wait for the same bucket, high priority transfers are served before
+normal ones and normal ones before low ones. Transfers of the same priority are
+served in the order they started waiting.
+"""
+import io
+import time
+import heapq
+import itertools
+import threading
+
+from private.buttfs_paths import TransferPriority
+
+UPLOAD = 'upload'
+DOWNLOAD = 'download'
+
+# a bucket holds this many seconds of transfer by default, so limits are smooth
+DEFAULT_BURST_SECONDS = 0.1
+MIN_BURST = 16 * 1024
+# larger reads of request bodies are paid for a block at a time
+BLOCK_SIZE = 8192
+
+_RANKS = dict((priority, rank) for rank, priority in enumerate(TransferPriority.allowed))
+
+
+class TokenBucket(object):
+    """Rate limit in bytes per second.
+
+    rate:   Bytes per second. None for no limit.
+    burst:  Bytes that can be taken at once after the bucket has been idle.
+    """
+    def __init__(self, rate=None, burst=None):
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self.bytes = 0
+        self.waited = 0.0
+        self.configure(rate, burst)
+
+    def configure(self, rate=None, burst=None):
+        """Replace the limit. Transfers that are waiting continue at the new rate.
+
+        :param rate:    Bytes per second. None for no limit.
+        :param burst:   Bytes that can be taken at once. Defaults to DEFAULT_BURST_SECONDS of the rate,
+                        and at least MIN_BURST.
+        """
+        with self._condition:
+            self.rate = float(rate) if rate else None
+            if self.rate is None:
+                self.burst = None
+            else:
+                self.burst = float(burst) if burst else max(self.rate * DEFAULT_BURST_SECONDS, MIN_BURST)
+            self.tokens = self.burst
+            self._updated = time.time()
+            self._condition.notify_all()
+
+    def _refill(self):
+        now = time.time()
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self._updated) * self.rate)
+        self._updated = now
+
+    def consume(self, amount, priority=TransferPriority.normal):
+        """Wait until amount bytes can be transferred.
+        Blocks larger than the burst are let through once the bucket is full, and paid for by later blocks.
+
+        :param amount:      Bytes about to be transferred.
+        :param priority:    TransferPriority of the transfer.
+        :return:            Seconds waited.
+        """
+        with self._condition:
+            self.bytes += amount
+            if self.rate is None:
+                return 0.0
+            started = time.time()
+            ticket = (_RANKS[priority], next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while self.rate is not None:
+                    self._refill()
+                    needed = min(amount, self.burst)
+                    if self._waiting[0] != ticket:
+                        # a transfer of higher priority, or one that waited longer, goes first
+                        self._condition.wait()
+                    elif self.tokens >= needed:
+                        self.tokens -= amount
+                        break
+                    else:
+                        self._condition.wait((needed - self.tokens) / self.rate)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+            waited = time.time() - started
+            self.waited += waited
+            return waited
+
+    def snapshot(self):
+        """
+        :return: Dictionary with the rate, burst, bytes transferred, seconds waited and transfers waiting.
+        """
+        with self._condition:
+            return {'rate': self.rate, 'burst': self.burst, 'bytes': self.bytes, 'waited': self.waited,
+                    'waiting': len(self._waiting)}
+
+
+class BandwidthLimiter(object):
+    """Upload and download limits of a session, shared by every copy of its rest adapter, or of the process.
+
+    upload:     TokenBucket of request bodies of uploads.
+    download:   TokenBucket of response bodies of downloads.
+    priority:   TransferPriority of transfers that do not set one.
+    parent:     Limiter that is also applied, i.e. the one of the process. Optional.
+    """
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.upload = TokenBucket()
+        self.download = TokenBucket()
+        self.priority = TransferPriority.normal
+
+    def configure(self, upload=None, download=None, burst=None, priority=TransferPriority.normal):
+        """Replace the limits.
+
+        :param upload:      Bytes per second for uploads. None for no limit.
+        :param download:    Bytes per second for downloads. None for no limit.
+        :param burst:       Bytes a transfer can take at once. Optional.
+        :param priority:    TransferPriority of transfers that do not set one.
+        :raises InvalidArgument: priority is not a TransferPriority.
+        """
+        if not TransferPriority.legal_value(priority):
+            TransferPriority.raise_exception(priority)
+        self.upload.configure(upload, burst)
+        self.download.configure(download, burst)
+        self.priority = priority
+
+    def limits(self, direction):
+        """
+        :param direction:   UPLOAD or DOWNLOAD.
+        :return:            True if this limiter or its parent limits transfers in direction.
+        """
+        if getattr(self, direction).rate is not None:
+            return True
+        return self.parent is not None and self.parent.limits(direction)
+
+    def consume(self, direction, amount, priority=None):
+        """Wait until amount bytes can be transferred in direction by this limiter and its parent.
+
+        :return: Seconds waited.
+        """
+        priority = priority or self.priority
+        waited = getattr(self, direction).consume(amount, priority)
+        if self.parent is not None:
+            waited += self.parent.consume(direction, amount, priority)
+        return waited
+
+    def throttled_body(self, body, priority=None):
+        """
+        :param body:        Request body, a string or a file.
+        :param priority:    TransferPriority of the upload. Defaults to the priority of the limiter.
+        :return:            File that reads body at the upload rate.
+        """
+        return _ThrottledBody(body, self, priority)
+
+    def throttle_response(self, response, priority=None):
+        """Make the body of an unread requests.Response read at the download rate."""
+        response.raw = _ThrottledRaw(response.raw, self, priority)
+        return response
+
+    def snapshot(self):
+        """
+        :return: Dictionary of UPLOAD and DOWNLOAD to TokenBucket.snapshot of this limiter.
+        """
+        return {UPLOAD: self.upload.snapshot(), DOWNLOAD: self.download.snapshot()}
+
+
+class _ThrottledBody(object):
+    # sent a block at a time by httplib
+    def __init__(self, body, limiter, priority):
+        self._body = io.BytesIO(body) if isinstance(body, basestring) else body
+        self._limiter = limiter
+        self._priority = priority
+
+    def read(self, size=-1):
+        left = size if size is not None and size >= 0 else None
+        blocks = []
+        while left is None or left > 0:
+            block = self._body.read(BLOCK_SIZE if left is None else min(left, BLOCK_SIZE))
+            if not block:
+                break
+            self._limiter.consume(UPLOAD, len(block), self._priority)
+            blocks.append(block)
+            if left is not None:
+                left -= len(block)
+        return b''.join(blocks)
+
+
+class _ThrottledRaw(object):
+    # stands in for response.raw, which requests reads with stream or read
+    def __init__(self, raw, limiter, priority):
+        self._raw = raw
+        self._limiter = limiter
+        self._priority = priority
+
+    def read(self, amt=None, *args, **kwargs):
+        block = self._raw.read(amt, *args, **kwargs)
+        if block:
+            self._limiter.consume(DOWNLOAD, len(block), self._priority)
+        return block
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        if hasattr(self._raw, 'stream'):
+            blocks = self._raw.stream(amt, decode_content=decode_content)
+        else:
+            blocks = iter(lambda: self._raw.read(amt), b'')
+        for block in blocks:
+            if block:
+                self._limiter.consume(DOWNLOAD, len(block), self._priority)
+            yield block
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+process_limiter = BandwidthLimiter()
+
+
+def set_process_bandwidth_limits(upload=None, download=None, burst=None):
+    """Limit the transfers of every session in this process together. Each session can also have its own limits,
+    set with Session.set_bandwidth_limits.
+
+    :param upload:      Bytes per second for uploads. None for no limit.
+    :param download:    Bytes per second for downloads. None for no limit.
+    :param burst:       Bytes a transfer can take at once. Optional.
+    :return:            None
+    """
+    process_limiter.configure(upload, download, burst)
@@ -0,0 +1,122 @@
+from errors import invalid_argument, InvalidVersion, VersionMismatchIgnored, VersionMissingOrIncorrect, \
+    FileVersionMissingOrIncorrect
+from private.buttfs_paths import VersionConflictValue
+from private.workers import run_concurrently
+from budget import CostEstimate
+
+# errors caused by the local item being out of date
+CONFLICT_ERRORS = (InvalidVersion, VersionMismatchIgnored, VersionMissingOrIncorrect, FileVersionMissingOrIncorrect)
+
+
+class BatchReport(object):
+    """Outcome of MetaBatch.commit.
+
+    applied:    Items that were saved.
+    conflicted: (item, exception) pairs for items whose version was out of date.
+    failed:     (item, exception) pairs for every other failure.
+
+    Conflicted and failed items keep their pending changes, so they can be refreshed and added to another batch.
+    """
+    def __init__(self):
+        self.applied = []
+        self.conflicted = []
+        self.failed = []
+
+    @property
+    def success(self):
+        return not self.conflicted and not self.failed
+
+    def __str__(self):
+        return 'BatchReport(applied={}, conflicted={}, failed={})'.format(
+            len(self.applied), len(self.conflicted), len(self.failed))
+
+    def __repr__(self):
+        return str(self)
+
+
+class MetaBatch(object):
+    """Collects metadata changes from many Files and Folders and saves them together.
+    Each item is still one alter meta request, but requests run on up to max_workers threads.
+
+    Can be used as a context manager, in which case it commits when the block exits without an exception:
+
+        with filesystem.batch() as batch:
+            for item in items:
+                item.mime = 'image/jpeg'
+                batch.add(item)
+        print batch.report
+    """
+    def __init__(self, if_conflict=VersionConflictValue.fail, max_workers=8):
+        if not VersionConflictValue.legal_value(if_conflict):
+            VersionConflictValue.raise_exception(if_conflict)
+        if max_workers < 1:
+            raise invalid_argument('max_workers', 'at least 1', max_workers)
+        self.if_conflict = if_conflict
+        self.max_workers = max_workers
+        self.report = None
+        self._pending = []
+
+    def add(self, item, if_conflict=None):
+        """Queue an item with unsaved changes. Items without changes are ignored on commit.
+
+        :param item:        File or Folder with changed metadata.
+        :param if_conflict: Behavior if this item is out of date. Defaults to the batch policy.
+        :return:            self
+        """
+        if if_conflict is None:
+            if_conflict = self.if_conflict
+        elif not VersionConflictValue.legal_value(if_conflict):
+            VersionConflictValue.raise_exception(if_conflict)
+        self._pending.append((item, if_conflict))
+        return self
+
+    def __len__(self):
+        return len(self._pending)
+
+    def commit(self, debug=False, dry_run=False):
+        """Save every queued item.
+
+        :param debug:   If true, will print the the request and response to stdout for each item.
+        :param dry_run: If true, nothing is saved, the items stay queued and a CostEstimate of the requests is returned.
+        :return:        BatchReport describing the result for each item.
+        """
+        pending = [(item, if_conflict) for item, if_conflict in self._pending if item.changed_meta]
+        if dry_run:
+            estimate = CostEstimate()
+            for item, if_conflict in pending:
+                changes = dict((key, item.data[key]) for key in item.changed_meta)
+                changes.update({'version': item.data['version'], 'version-conflict': if_conflict})
+                item.rest_interface.estimate_request(estimate, 'alter {} meta'.format(item.type), item.path(), changes)
+            return estimate
+        self._pending = []
+
+        def save(entry):
+            item, if_conflict = entry
+            changes = set(item.changed_meta)
+            try:
+                return item.save(if_conflict, debug)
+            except Exception:
+                # save clears the changes before sending them
+                item.changed_meta.update(changes)
+                raise
+
+        report = BatchReport()
+        for entry, result, error in run_concurrently(save, pending, self.max_workers):
+            item = entry[0]
+            if error is None:
+                report.applied.append(item)
+            elif isinstance(error, CONFLICT_ERRORS):
+                report.conflicted.append((item, error))
+            else:
+                report.failed.append((item, error))
+
+        self.report = report
+        return report
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        return False
@@ -0,0 +1,146 @@
+"""Request counting, budgets and dry-run cost estimates.
+
+Accounts have a quota of API requests. RequestBudget counts the requests a session
+makes by endpoint and can warn or refuse once a limit is reached. Bulk operations
+accept dry_run=True and return a CostEstimate of the requests they would make instead
+of making them.
+"""
+import warnings
+import threading
+import collections
+
+from errors import request_budget_exceeded
+from private.buttfs_paths import OverBudgetValue
+
+
+class RequestBudgetWarning(UserWarning):
+    pass
+
+
+class RequestBudget(object):
+    """Requests made by a session, and its limits. Shared by every copy of the session's rest adapter.
+
+    limit:              Maximum number of requests in total. None for no limit.
+    endpoint_limits:    Dictionary of endpoint name from rest_endpoints to its maximum number of requests.
+    over_budget:        OverBudgetValue.fail refuses requests past a limit with RequestBudgetExceeded, before
+                        they are sent. OverBudgetValue.warn sends them and issues a RequestBudgetWarning.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.limit = None
+        self.endpoint_limits = {}
+        self.over_budget = OverBudgetValue.fail
+        self.reset()
+
+    def reset(self):
+        """Forget every counted request. Limits are kept."""
+        with self._lock:
+            self.counts = collections.Counter()
+            self.total = 0
+
+    def configure(self, limit=None, endpoint_limits=None, over_budget=OverBudgetValue.fail):
+        """Replace the limits.
+
+        :param limit:           Maximum number of requests in total. None for no limit.
+        :param endpoint_limits: Dictionary of endpoint name to maximum number of requests. Optional.
+        :param over_budget:     OverBudgetValue.fail or OverBudgetValue.warn.
+        """
+        if not OverBudgetValue.legal_value(over_budget):
+            OverBudgetValue.raise_exception(over_budget)
+        with self._lock:
+            self.limit = limit
+            self.endpoint_limits = dict(endpoint_limits or {})
+            self.over_budget = over_budget
+
+    def _exceeded(self, endpoint, count, total):
+        if self.limit is not None and total > self.limit:
+            return 'all endpoints', total, self.limit
+        endpoint_limit = self.endpoint_limits.get(endpoint)
+        if endpoint_limit is not None and count > endpoint_limit:
+            return endpoint, count, endpoint_limit
+        return None
+
+    def charge(self, endpoint):
+        """Count a request that is about to be sent.
+
+        :raises RequestBudgetExceeded: The request is past a limit and over_budget is fail. It is not counted.
+        """
+        with self._lock:
+            count = self.counts[endpoint] + 1
+            exceeded = self._exceeded(endpoint, count, self.total + 1)
+            if exceeded and self.over_budget == OverBudgetValue.fail:
+                raise request_budget_exceeded(*exceeded)
+            self.counts[endpoint] = count
+            self.total += 1
+        if exceeded:
+            warnings.warn(str(request_budget_exceeded(*exceeded)), RequestBudgetWarning, stacklevel=2)
+
+    def remaining(self, endpoint=None):
+        """
+        :param endpoint:    Also apply the limit of this endpoint. Optional.
+        :return:            Number of requests left before a limit, None if there is no limit.
+        """
+        with self._lock:
+            left = []
+            if self.limit is not None:
+                left.append(self.limit - self.total)
+            if endpoint in self.endpoint_limits:
+                left.append(self.endpoint_limits[endpoint] - self.counts[endpoint])
+            return max(0, min(left)) if left else None
+
+    def allows(self, estimate):
+        """
+        :param estimate:    CostEstimate of an operation.
+        :return:            True if the requests of estimate fit in what is left of every limit.
+        """
+        with self._lock:
+            if self.limit is not None and self.total + estimate.requests > self.limit:
+                return False
+            for endpoint, count in estimate.requests_by_endpoint.iteritems():
+                endpoint_limit = self.endpoint_limits.get(endpoint)
+                if endpoint_limit is not None and self.counts[endpoint] + count > endpoint_limit:
+                    return False
+            return True
+
+    def snapshot(self):
+        """
+        :return: Dictionary of endpoint name to number of requests.
+        """
+        with self._lock:
+            return dict(self.counts)
+
+
+class CostEstimate(object):
+    """Requests and bytes an operation would send. Sizes are of request bodies, files included."""
+    def __init__(self):
+        self.requests_by_endpoint = collections.Counter()
+        self.bytes_by_endpoint = collections.Counter()
+
+    @property
+    def requests(self):
+        return sum(self.requests_by_endpoint.itervalues())
+
+    @property
+    def bytes_sent(self):
+        return sum(self.bytes_by_endpoint.itervalues())
+
+    def add(self, endpoint, bytes_sent=0, requests=1):
+        self.requests_by_endpoint[endpoint] += requests
+        self.bytes_by_endpoint[endpoint] += bytes_sent
+        return self
+
+    def __add__(self, other):
+        result = CostEstimate()
+        for estimate in (self, other):
+            result.requests_by_endpoint.update(estimate.requests_by_endpoint)
+            result.bytes_by_endpoint.update(estimate.bytes_by_endpoint)
+        return result
+
+    def __str__(self):
+        lines = ['{} requests, {} bytes'.format(self.requests, self.bytes_sent)]
+        for endpoint, count in sorted(self.requests_by_endpoint.iteritems()):
+            lines.append('  {}: {} requests, {} bytes'.format(endpoint, count, self.bytes_by_endpoint[endpoint]))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return 'CostEstimate({} requests, {} bytes)'.format(self.requests, self.bytes_sent)
@@ -3,7 +3,11 @@ import os
 from item import Item
 from path import Path
 from private.filesystem_common import list_items_from_path, create_items_from_json
-from private.buttfs_paths import VersionConflictValue, ExistValues
+from private.buttfs_paths import VersionConflictValue, ExistValues, ListFormat
+from tracing import traced, item_attributes
+from budget import CostEstimate
+from content_index import hash_content
+from errors import invalid_argument, FileNotFound
 
 
 class Container(Item):
@@ -12,22 +16,26 @@ class Container(Item):
     """
     def __init__(self, rest_interface):
         super(Container, self).__init__(rest_interface)
-        self._full_path = Path.path_from_string('/')
+        self._full_path = Path.root()
 
-    def list(self, debug=False):
+    @traced('Container.list', item_attributes)
+    def list(self, debug=False, list_format=ListFormat.items):
         """List the contents of this container.
 
         REST Documentation: https://www.bitcasa.com/cloudfs-api-docs/api/List%20Folder.html
 
-        :param debug: If true, will print the the request and response to stdout.
+        :param debug:       If true, will print the the request and response to stdout.
+        :param list_format: Type of the returned entries. ListFormat.compact returns ItemRecords,
+                            ListFormat.columnar an ItemTable and ListFormat.lazy a LazyItemList.
+                            Defaults to items.
         :return: Array of Items in container.
         """
         if debug:
             self.rest_interface.debug_requests(1)
-        return list_items_from_path(self.rest_interface, self.path(), self.in_trash)
+        return list_items_from_path(self.rest_interface, self.path(), self.in_trash, list_format)
 
     def __str__(self):
-        return 'container:' + self.path()
+        return 'container:' + str(self.path())
 
 class Folder(Container):
     @staticmethod
@@ -54,8 +62,12 @@ class Folder(Container):
             self.rest_interface.debug_requests(1)
         return self.rest_interface.folder_get_meta(self.path()), {}
 
-    def upload(self, source, custom_name=None, custom_mime=None, exists=ExistValues.fail, data_inline=False, debug=False):
+    @traced('Folder.upload', item_attributes)
+    def upload(self, source, custom_name=None, custom_mime=None, exists=ExistValues.fail, data_inline=False, debug=False, priority=None, dedupe=False):
         """Upload a file or a string to ButtFS.
+        With dedupe, content already uploaded by this session, or found in its content index, is copied on the server
+        instead of sent again. If the earlier file is in this folder with the same name, it is returned as is, as with
+        ExistValues.reuse. See content_index.
 
         REST Documentation: https://www.bitcasa.com/cloudfs-api-docs/api/Upload%20File.html
 
@@ -65,6 +77,8 @@ class Folder(Container):
         :param exists:          Behavior if the given name exists on ButtFS. Defaults to fail.
         :param data_inline:     Flag to indicate if the source is a string or a filename.
         :param debug:           If true, will print the the request and response to stdout.
+        :param priority:        TransferPriority of the upload when bandwidth is limited. Optional.
+        :param dedupe:          If true, hash the data first and copy a file with the same content instead of uploading.
 
         :returns:   New file object.
         :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
@@ -75,6 +89,13 @@ class Folder(Container):
         if not custom_name:
             custom_name = os.path.basename(source)
 
+        if dedupe:
+            index = self.rest_interface.bc_conn.content_index
+            digest = hash_content(source, data_inline)
+            existing = self._copy_content(index, digest, custom_name, exists)
+            if existing is not None:
+                return existing
+
         file_data = source
         if not data_inline:
             file_data = open(file_data, 'rb')
@@ -84,9 +105,83 @@ class Folder(Container):
         if custom_mime:
             files['file'].append(custom_mime)
 
-        upload_response = self.rest_interface.upload(self.path(), files, exists)
-        return create_items_from_json(self.rest_interface, upload_response, self.path(), self.in_trash)[0]
-
+        upload_response = self.rest_interface.upload(self.path(), files, exists, priority=priority)
+        uploaded = create_items_from_json(self.rest_interface, upload_response, self.path(), self.in_trash)[0]
+        if dedupe:
+            index.add(digest, uploaded)
+        return uploaded
+
+    def _copy_content(self, index, digest, name, exists):
+        # the indexed file with the content, copied into this folder, or None if it has to be uploaded
+        entry = index.lookup(digest)
+        if entry is None:
+            return None
+        try:
+            meta = self.rest_interface.file_get_meta(entry['path'])['meta']
+        except FileNotFound:
+            meta = None
+        if meta is None or not index.matches(entry, meta):
+            # moved, deleted or overwritten since it was indexed
+            index.discard(digest)
+            return None
+
+        if Path.path_from_string(entry['path']).parent == self.path() and meta['name'] == name:
+            result = meta
+        else:
+            result = self.rest_interface.copy_file(entry['path'], self.path(), name, exists)['meta']
+        return create_items_from_json(self.rest_interface, result, self.path(), self.in_trash)[0]
+
+    @traced('Folder.upload_tree', item_attributes)
+    def upload_tree(self, local_path, exists=ExistValues.fail, dry_run=False, debug=False, priority=None, dedupe=False):
+        """Upload a local folder and everything below it into a folder of the same name in this folder.
+        Folders that already exist on ButtFS are reused.
+
+        :param local_path:  Path of a local folder.
+        :param exists:      Behavior if a file of the same name exists on ButtFS. Defaults to fail.
+        :param dry_run:     If true, nothing is uploaded and a CostEstimate of the requests is returned.
+        :param debug:       If true, will print the the requests and responses to stdout.
+        :param priority:    TransferPriority of the uploads when bandwidth is limited. Optional.
+        :param dedupe:      If true, files with content already uploaded are copied instead, as with upload.
+                            The content index is written once, at the end. A dry run still estimates every file
+                            as an upload.
+
+        :returns:   Folder holding the contents of local_path, or a CostEstimate for a dry run.
+        :raises InvalidArgument:        local_path is not a folder.
+        :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
+        :raises AuthenticatedError:     Based on ButtFS Error Code.
+        """
+        local_path = os.path.abspath(local_path)
+        if not os.path.isdir(local_path):
+            raise invalid_argument('local_path', 'path of an existing local folder', local_path)
+        if not ExistValues.legal_value(exists):
+            ExistValues.raise_exception(exists)
+
+        estimate = CostEstimate() if dry_run else None
+        folders = {}
+        # with dedupe, the content index is written once instead of after each file
+        with self.rest_interface.bc_conn.content_index.batch():
+            for folder_path, folder_names, file_names in os.walk(local_path):
+                folder_names.sort()
+                parent = folders.get(os.path.dirname(folder_path), self)
+                name = os.path.basename(folder_path)
+                if dry_run:
+                    # the folders do not exist, so every request is estimated against this folder
+                    self.rest_interface.estimate_request(estimate, 'create folder', self.path(),
+                                                         {'name': name, 'exists': ExistValues.reuse})
+                else:
+                    folders[folder_path] = parent.create_folder(name, ExistValues.reuse, debug)
+
+                for file_name in sorted(file_names):
+                    file_path = os.path.join(folder_path, file_name)
+                    if dry_run:
+                        self.rest_interface.estimate_request(estimate, 'upload file', self.path(), {'exists': exists},
+                                                             file_name, os.path.getsize(file_path))
+                    else:
+                        folders[folder_path].upload(file_path, exists=exists, priority=priority, dedupe=dedupe, debug=debug)
+
+        return estimate if dry_run else folders[local_path]
+
+    @traced('Folder.create_folder', item_attributes)
     def create_folder(self, container_or_name, exists=ExistValues.fail, debug=False):
         """Create a new folder in this folder.
 
@@ -109,6 +204,7 @@ class Folder(Container):
         return create_items_from_json(self.rest_interface, new_folder_response, self.path(), self.in_trash)[0]
 
 
+    @traced('Folder.save', item_attributes)
     def save(self, if_conflict=VersionConflictValue.fail, debug=False):
         """Save changes to folder metadata.
         See notes on individual setters for quirks.
@@ -134,6 +230,7 @@ class Folder(Container):
         self._initialize_self(response, {})
         return self
 
+    @traced('Folder.delete', item_attributes)
     def delete(self, commit=False, force=False, debug=False):
         """Delete folder.
         Folder will only be removed from trash if commit is True. This is the case for folders in or out of the trash, so folders
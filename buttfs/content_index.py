@@ -0,0 +1,158 @@
+"""Index of uploaded content, for uploads that skip content already on ButtFS.
+
+Folder.upload and Folder.upload_tree with dedupe=True hash the local data first. If
+the index has a file with the same hash, it is copied on the server, or reused if it
+is already in the folder under the same name, and no data is sent. Otherwise the data
+is uploaded and the new file added to the index.
+
+Every session has an index in memory. Session.keep_content_index keeps it in a file
+for later sessions of the same account. Files that were moved, deleted or overwritten
+since they were indexed are found out before they are used, dropped from the index,
+and uploaded again.
+"""
+import os
+import hashlib
+import threading
+import contextlib
+
+from private import codec
+from private.utils import replace_file
+
+HASH_ALGORITHM = 'sha256'
+# local files are hashed a block at a time
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_content(source, data_inline=False):
+    """
+    :param source:      Path of a local file, or the data itself if data_inline.
+    :param data_inline: Flag to indicate if the source is a string or a filename.
+    :return:            Hex digest of the data.
+    """
+    digest = hashlib.new(HASH_ALGORITHM)
+    if data_inline:
+        digest.update(source)
+    else:
+        with open(source, 'rb') as fp:
+            for block in iter(lambda: fp.read(HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class ContentIndex(object):
+    """Hash of uploaded content: the file on ButtFS holding it.
+
+    The file is rewritten after each change, or once at the end of a batch. Wrap many uploads in batch(), as
+    Folder.upload_tree does, so they do not rewrite the whole index each.
+
+    :param path:    File to keep the index in. None to keep it in memory.
+    """
+    def __init__(self, path=None):
+        self.path = None
+        self._lock = threading.Lock()
+        self._entries = {}
+        # depth of batch blocks, and whether the file is behind the entries
+        self._batches = 0
+        self._dirty = False
+        if path is not None:
+            self.open(path)
+
+    def open(self, path):
+        """Keep the index in path from now on. Files indexed there are added to the ones indexed in memory.
+
+        :param path:    File to keep the index in. Created with its folders if it does not exist.
+        :return:        None
+        """
+        with self._lock:
+            if os.path.exists(path):
+                with open(path, 'rb') as fp:
+                    self._entries.update(codec.try_loads(fp.read(), None) or {})
+            self.path = path
+            self._dirty = True
+            self._write()
+
+    def lookup(self, digest):
+        """
+        :param digest:  Hash from hash_content.
+        :return:        Dictionary with the path, size and date_content_last_modified of the file when it was indexed,
+                        None if no file has the content.
+        """
+        with self._lock:
+            entry = self._entries.get(digest)
+            return dict(entry) if entry is not None else None
+
+    def add(self, digest, item):
+        """
+        :param digest:  Hash from hash_content.
+        :param item:    File on ButtFS holding the content.
+        :return:        None
+        """
+        entry = {'path': str(item.path()), 'size': item.size,
+                 'date_content_last_modified': item.data.get('date_content_last_modified')}
+        with self._lock:
+            self._entries[digest] = entry
+            self._dirty = True
+            self._write()
+
+    def discard(self, digest):
+        """Forget the file holding digest, i.e. once it is deleted.
+
+        :return: True if there was a file to forget.
+        """
+        with self._lock:
+            if self._entries.pop(digest, None) is None:
+                return False
+            self._dirty = True
+            self._write()
+            return True
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Write the file once when the block exits, instead of after each change in it. Blocks can be nested."""
+        with self._lock:
+            self._batches += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batches -= 1
+                self._write()
+
+    def flush(self):
+        """Write the file now if it is behind, i.e. during a long batch.
+
+        :return: None
+        """
+        with self._lock:
+            self._write(force=True)
+
+    def matches(self, entry, meta):
+        """
+        :param entry:   Dictionary from lookup.
+        :param meta:    Current meta of the file at entry['path'].
+        :return:        True if the file still holds the content it was indexed with.
+        """
+        return meta.get('type') == 'file' and meta.get('size') == entry['size'] and \
+            meta.get('date_content_last_modified') == entry['date_content_last_modified']
+
+    def _write(self, force=False):
+        if self.path is None or not self._dirty or (self._batches and not force):
+            return
+        folder = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        # written next to the index and renamed over it, so readers never see part of a file
+        temporary = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            with open(temporary, 'wb') as fp:
+                fp.write(codec.dumps(self._entries))
+            replace_file(temporary, self.path)
+        except Exception:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        self._dirty = False
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
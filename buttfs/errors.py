@@ -1,5 +1,4 @@
-import json
-import inspect
+from private import codec
 from private.utils import request_to_string, response_to_string
 
 class ButtFSError(Exception):
@@ -31,6 +30,24 @@ class MethodNotImplemented(ButtFSError):
     def __init__(self, object, method_name):
         self.message = 'The \"{}\" method of the {} is not currently implemented. To find out the future plans for this method contact ButtFS support.'.format(method_name, type(object))
 
+class PathNotFound(ButtFSError):
+    def __init__(self, name_path):
+        self.name_path = name_path
+        self.message = 'No item found at "{}".'.format(name_path)
+
+class RequestBudgetExceeded(ButtFSError):
+    def __init__(self, endpoint, used, limit):
+        self.endpoint = endpoint
+        self.used = used
+        self.limit = limit
+        self.message = 'Request budget for {} exceeded: request {} of a limit of {}.'.format(endpoint, used, limit)
+
+class InsecureTokenStore(ButtFSError):
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+        self.message = 'Token store "{}" can be read by other users (mode {:o}). Restrict it to its owner (mode 600).'.format(path, mode)
+
 def session_not_linked_error():
     return SessionNotLinked()
 
@@ -46,6 +63,15 @@ def missing_argument(arg_name):
 def method_not_implemented(object, method_name):
     return MethodNotImplemented(object, method_name)
 
+def path_not_found(name_path):
+    return PathNotFound(name_path)
+
+def request_budget_exceeded(endpoint, used, limit):
+    return RequestBudgetExceeded(endpoint, used, limit)
+
+def insecure_token_store(path, mode):
+    return InsecureTokenStore(path, mode)
+
 class AuthenticatedError(ButtFSError):
     INTERNAL_CODE = None
 
@@ -53,6 +79,8 @@ class AuthenticatedError(ButtFSError):
         self.response = response
         self.request = request
         self.message = message
+        # decoded body, set by error_from_response when it has already been decoded
+        self.response_json = None
 
         # support errors that can return several codes for the same problem
         if code and type(self.INTERNAL_CODE) is tuple:
@@ -64,10 +92,9 @@ class AuthenticatedError(ButtFSError):
 
 
     def json(self):
-        try:
-            return json.loads(self.response.content)
-        except:
-            return self.response.content
+        if self.response_json is not None:
+            return self.response_json
+        return codec.try_loads(self.response.content, self.response.content)
 
     def code(self):
         return self.INTERNAL_CODE
@@ -76,7 +103,8 @@ class AuthenticatedError(ButtFSError):
         return self.response.status_code
 
     def __str__(self):
-        return '\nRequest:\n{}\nResponse:\n{}'.format(request_to_string(self.request), response_to_string(self.response))
+        return '\nRequest:\n{}\nResponse:\n{}'.format(
+            request_to_string(self.request), response_to_string(self.response, self.response_json))
 
 
 class UnknownError(AuthenticatedError):
@@ -174,7 +202,8 @@ class NameRequired(FileError):
 class ToPathRequired(FileError):
     INTERNAL_CODE = 3020
 
-class VersionMissingOrIncorrect(FileError):
+# named apart from the folder error of the same name, which would replace it in this module
+class FileVersionMissingOrIncorrect(FileError):
     INTERNAL_CODE = 3021
 
 # File exceptions that are never raised from the server
@@ -319,45 +348,100 @@ class InvalidVerbose(FolderError):
     INTERNAL_CODE = 2050
 
 
-
+# exceptions indexed by codes, written out so importing does not search the module.
+# Meta exceptions (codes ending in 000) are not included. Where two classes share a name,
+# only the later one is reachable, so 3007 and 3021 are not indexed. test_errors checks this table
+# against the INTERNAL_CODE of every class.
 _error_index = {
+    2002: FolderDoesNotExist,
+    2003: FolderNotFound,
+    2004: UploadToReadOnlyDestinationFailed,
+    2005: MoveToReadOnlyDestinationFailed,
+    2006: CopyToReadOnlyDestinationFailed,
+    2007: RenameOnReadOnlyLocationFailed,
+    2008: DeleteOnReadOnlyLocationFailed,
+    2009: CreateFolderOnReadOnlyLocationFailed,
+    2010: FailedToReadFilesystem,
+    2011: FailedToReadFilesystem,
+    2012: FailedToReadFilesystem,
+    2013: FailedToReadFilesystem,
+    2014: NameConflictCreatingFolder,
+    2015: NameConflictOnUpload,
+    2016: NameConflictOnRename,
+    2017: NameConflictOnMove,
+    2018: NameConflictOnCopy,
+    2019: FailedToSaveChanges,
+    2020: FailedToSaveChanges,
+    2021: FailedToSaveChanges,
+    2022: FailedToBroadcastUpdate,
+    2023: FailedToBroadcastUpdate,
+    2024: FailedToSaveChanges,
+    2025: FailedToSaveChanges,
+    2026: CannotDeleteTheInfiniteDrive,
+    2028: MissingToParameter,
+    2033: ExistsParameterInvalid,
+    2034: MissingPathParameter,
+    2036: SpecifiedLocationIsReadOnly,
+    2037: SpecifiedSourceIsReadOnly,
+    2038: SpecifiedDestinationIsReadOnly,
+    2039: PathDoesNotExist,
+    2040: PermissionDenied,
+    2041: PermissionDenied,
+    2042: NameConflictInOperation,
+    2043: InvalidOperation,
+    2044: VersionMissingOrIncorrect,
+    2045: InvalidDepth,
+    2046: VersionDoesNotExist,
+    2047: NameRequred,
+    2048: InvalidName,
+    2049: TreeRequired,
+    2050: InvalidVerbose,
+    2052: DirectoryNotEmpty,
+    3001: FileNotFound,
+    3009: InvalidExists,
+    3010: ExtensionTooLong,
+    3011: InvalidDateCreated,
+    3012: InvalidDateMetaLastModified,
+    3013: InvalidDateContentLastModified,
+    3014: MIMETooLong,
+    3015: SizeMustBePositive,
+    3018: NameRequired,
+    3019: SizeRequired,
+    3020: ToPathRequired,
+    3021: FileVersionMissingOrIncorrect,
+    6001: PathRequired,
+    6003: ShareWouldExceedQuota,
+    6004: ShareDoesNotExist,
+    8001: InvalidVersion,
+    8002: VersionMismatchIgnored,
+    8004: OrigionalPathNoLongerExists,
+    8007: FilesystemIsOverTheLimit,
+    8008: FilesystemWouldBeOverTheLimit,
+    9006: APICallLimitReached,
+    9999: GenericPanicError,
 }
 
-exception_names = dir()
-module_objects = globals()
-
-# build dictionary of exceptions indexed by codes
-for name in exception_names:
-    excpt = module_objects[name]
-    if inspect.isclass(excpt) and issubclass(excpt, AuthenticatedError) and hasattr(excpt, 'INTERNAL_CODE'):
-        if excpt.INTERNAL_CODE == None:
-            continue
-        elif type(excpt.INTERNAL_CODE) is tuple:
-            for code in excpt.INTERNAL_CODE:
-                _error_index[code] = excpt
-        elif excpt.INTERNAL_CODE % 1000 != 0:
-            # non-base exceptions
-            _error_index[excpt.INTERNAL_CODE] = excpt
-        elif excpt.INTERNAL_CODE % 1000 == 0:
-            # meta exception
-            continue
-        else:
-            raise ValueError("Exception {} incorrectly detected as a base exception!".format(excpt))
-
-
-def error_from_response(request, response):
+
+def error_from_response(request, response, response_json=None):
+    """
+    :param request:         PreparedRequest that failed.
+    :param response:        Response to the request.
+    :param response_json:   Decoded body of the response. Decoded here if not given.
+    :return:                AuthenticatedError subclass for the ButtFS error code, None if the request succeeded.
+    """
     if response.status_code == 200:
         return None
 
-    try:
-        response_json = json.loads(response.content)
-    except:
-        return AuthenticatedError(request, response)
+    if response_json is None:
+        response_json = codec.try_loads(response.content)
+        if response_json is None:
+            return AuthenticatedError(request, response)
 
     # we can do this
+    error = None
     if 'error' in response_json:
         if response_json['error'] == 'invalid_request':
-            return InvalidRequest(request, response)
+            error = InvalidRequest(request, response)
         elif 'code' in response_json['error']:
             code = int(response_json['error']['code'])
             message = response_json['error']['message']
@@ -367,6 +451,9 @@ def error_from_response(request, response):
                 # ButtFS instead of authenticated error because we don't really know
                 raise UnknownError(request, response, message)
 
-            return error_class(request, response, message)
+            error = error_class(request, response, message)
 
-    return AuthenticatedError(request, response)
+    if error is None:
+        error = AuthenticatedError(request, response)
+    error.response_json = response_json
+    return error
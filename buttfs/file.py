@@ -4,6 +4,7 @@ from item import Item
 from os.path import exists, isdir, split, join
 from errors import method_not_implemented, operation_not_allowed, invalid_argument
 from private.buttfs_paths import VersionConflictValue, RestoreValue
+from tracing import traced, item_attributes
 
 class File(Item):
     def __init__(self, rest_interface):
@@ -30,6 +31,7 @@ class File(Item):
 
         return callback
 
+    @traced('File.delete', item_attributes)
     def delete(self, commit=False, force=False, debug=False):
         """Delete the file.
 
@@ -58,6 +60,7 @@ class File(Item):
                 self.in_trash = True
             return result
 
+    @traced('File.save', item_attributes)
     def save(self, if_conflict=VersionConflictValue.fail, debug=False):
         """Save changes to the file.
         See notes on individual setters for quirks.
@@ -93,7 +96,8 @@ class File(Item):
         """
         return self.rest_interface.wait_for_downloads(timeout)
 
-    def download(self, local_path, custom_name=None, synchronous=False, debug=False):
+    @traced('File.download', item_attributes)
+    def download(self, local_path, custom_name=None, synchronous=False, debug=False, priority=None):
         """Download the file to the local filesystem.
         Does not replicate any metadata.
         If downloads are started with synchronous=True ButtFS SDK will attempt to block until all downloads are complete on destruction. This may block your
@@ -105,6 +109,7 @@ class File(Item):
         :param custom_name: Can use a separate argument to specify local file name. If file name is included in both local_path and this, local_path takes priority. Optional.
         :param synchronous: If true, download will return immediately and download in separate thread.
         :param debug:       If true, will print the the request and response to stdout.
+        :param priority:    TransferPriority of the download when bandwidth is limited. Optional.
         :return: None
         :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
         :raises AuthenticatedError:     Based on ButtFS Error Code.
@@ -141,18 +146,20 @@ class File(Item):
         full_path = join(folder_path, file_name)
         fp = open(full_path, 'wb')
 
-        self.rest_interface.download(self.path(), self._get_download_callback(fp, True), background=(not synchronous))
+        self.rest_interface.download(self.path(), self._get_download_callback(fp, True), background=(not synchronous), priority=priority)
 
     # file interface
-    def read(self, size=None, debug=False):
+    @traced('File.read', item_attributes)
+    def read(self, size=None, debug=False, priority=None):
         """File-like interface to read file. Reads size bytes from last offset.
         Reads file synchronously - does not start threads.
         Warning: Each read() call generates on request to ButtFS.
 
         REST Documentation: https://www.bitcasa.com/cloudfs-api-docs/api/Download%20File.html
 
-        :param size:    Number of bytes to read. If None, will read entire file. Defaults to None.
-        :param debug:   If true, will print the the request and response to stdout.
+        :param size:        Number of bytes to read. If None, will read entire file. Defaults to None.
+        :param debug:       If true, will print the the request and response to stdout.
+        :param priority:    TransferPriority of the download when bandwidth is limited. Optional.
         :return:    File contents.
         """
         if debug:
@@ -162,7 +169,7 @@ class File(Item):
         if size:
             range = [self.tell(), self.tell() + size]
 
-        self.rest_interface.download(self.path(), self._get_download_callback(fp, False), range=range)
+        self.rest_interface.download(self.path(), self._get_download_callback(fp, False), range=range, priority=priority)
 
         return fp.read()
 
@@ -1,9 +1,15 @@
 from private.filesystem_common import *
 from errors import method_not_implemented
-from private.buttfs_paths import ExistValues, RestoreValue
+from private.buttfs_paths import ExistValues, RestoreValue, VersionConflictValue, ListFormat
 from container import Folder
 
 from item import Item
+from record import ItemRecord
+from index import ItemIndex
+from table import ItemTable
+from batch import MetaBatch
+from budget import CostEstimate
+from tracing import traced, items_attributes
 
 class Filesystem(object):
 
@@ -12,24 +18,122 @@ class Filesystem(object):
     def __init__(self, rest_interface):
             self.rest_interface = rest_interface
 
-    def list(self, item, debug=False):
+    @traced('Filesystem.list')
+    def list(self, item, debug=False, list_format=ListFormat.items):
         """List contents of item if the item is a folder.
 
-        :param item:    Folder to list the contents of.
-        :param debug:   If true, will print the the request and response to stdout.
+        :param item:        Folder to list the contents of.
+        :param debug:       If true, will print the the request and response to stdout.
+        :param list_format: Type of the returned entries. ListFormat.compact returns ItemRecords,
+                            ListFormat.columnar an ItemTable and ListFormat.lazy a LazyItemList.
+                            Defaults to items.
 
-        :returns:   Dictionary representation of JSON response.
+        :returns:   List of Items in the folder.
         :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
         :raises AuthenticatedError:     Based on ButtFS Error Code.
         """
         path = item
         in_trash = False
-        if isinstance(item, Item):
+        if isinstance(item, (Item, ItemRecord)):
             path = item.url()
             in_trash = item.in_trash
         if debug:
             self.rest_interface.debug_requests(1)
-        return list_items_from_path(self.rest_interface, path, in_trash)
+        return list_items_from_path(self.rest_interface, path, in_trash, list_format)
+
+    def iter_list(self, item, debug=False, list_format=ListFormat.items):
+        """List contents of item, creating items while the response is still arriving.
+        Memory use does not grow with the size of the folder and the first item is
+        available before the whole listing has been received.
+
+        :param item:        Folder to list the contents of.
+        :param debug:       If true, will print the the request and response to stdout.
+        :param list_format: ListFormat.items or ListFormat.compact. Defaults to items.
+
+        :returns:   Generator of Items in the folder.
+        :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
+        :raises AuthenticatedError:     Based on ButtFS Error Code.
+        :raises InvalidArgument:        list_format is not items or compact.
+        """
+        path = item
+        in_trash = False
+        if isinstance(item, (Item, ItemRecord)):
+            path = item.url()
+            in_trash = item.in_trash
+        if debug:
+            self.rest_interface.debug_requests(1)
+        return iter_items_from_path(self.rest_interface, path, in_trash, list_format)
+
+    @traced('Filesystem.resolve')
+    def resolve(self, name_path, debug=False):
+        """Find an item by the names along its path, e.g. '/Photos/2014/a.jpg'.
+        Listings are cached per session, so repeat lookups only list folders that have not
+        been seen yet or were changed through the SDK since they were listed.
+
+        :param name_path:   '/' separated names from the root to the item.
+        :param debug:       If true, will print the the request and response to stdout.
+
+        :returns:   File or Folder at name_path.
+        :raises PathNotFound:           No item has that name path.
+        :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
+        :raises AuthenticatedError:     Based on ButtFS Error Code.
+        """
+        if debug:
+            self.rest_interface.debug_requests(1)
+        return resolve_name_path(self.rest_interface, name_path)
+
+    @traced('Filesystem.index')
+    def index(self, item=None, include_trash=False, debug=False):
+        """Walk a subtree once and return a searchable local index of it.
+        See ItemIndex.find for the supported queries and ItemIndex.refresh to update changed folders.
+
+        :param item:            Folder or path to index. Defaults to the root.
+        :param include_trash:   If true, items in the trash are indexed as well.
+        :param debug:           If true, will print the the request and response to stdout.
+
+        :returns:   ItemIndex of the subtree.
+        :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
+        :raises AuthenticatedError:     Based on ButtFS Error Code.
+        """
+        path = item
+        if isinstance(item, (Item, ItemRecord)):
+            path = item.path()
+        return ItemIndex(self.rest_interface, path).build(include_trash, debug)
+
+    @traced('Filesystem.walk')
+    def walk(self, item=None, in_trash=False, debug=False, list_format=ListFormat.items):
+        """List every folder below item, breadth first.
+
+        :param item:        Folder or path to walk. Defaults to the root.
+        :param in_trash:    If true, walk the trash instead.
+        :param debug:       If true, will print the the request and response to stdout.
+        :param list_format: ListFormat.columnar returns a single ItemTable of every item below item.
+                            Otherwise a list of the contents of every folder. Defaults to items.
+
+        :returns:   ItemTable or list of the items below item.
+        :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
+        :raises AuthenticatedError:     Based on ButtFS Error Code.
+        """
+        if not ListFormat.legal_value(list_format):
+            ListFormat.raise_exception(list_format)
+        path = item
+        if item is None:
+            path = self.root_container().path()
+        elif isinstance(item, (Item, ItemRecord)):
+            path = item.path()
+            in_trash = in_trash or item.in_trash
+        if debug:
+            self.rest_interface.debug_requests(1)
+
+        listings = walk_listings(self.rest_interface, path, in_trash)
+        if list_format == ListFormat.columnar:
+            return ItemTable.from_rows(self.rest_interface, listings, in_trash)
+
+        items = []
+        for folder_path, rows in listings:
+            folder_path = folder_path if folder_path != '/' else None
+            items.extend(create_listing(self.rest_interface, rows, folder_path, in_trash, list_format))
+        return items
 
     def root_container(self):
         """
@@ -37,50 +141,71 @@ class Filesystem(object):
         """
         return Folder.root_folder(self.rest_interface.get_copy())
 
-    def list_trash(self, debug=False):
+    @traced('Filesystem.list_trash')
+    def list_trash(self, debug=False, list_format=ListFormat.items):
         """List the items in the trash.
 
-        :param debug:   If true, will print the the request and response to stdout.
-        :return:
+        :param debug:       If true, will print the the request and response to stdout.
+        :param list_format: Type of the returned entries. ListFormat.compact returns ItemRecords,
+                            ListFormat.columnar an ItemTable and ListFormat.lazy a LazyItemList.
+                            Defaults to items.
+        :return:            List of Items in the trash.
         """
         if debug:
             self.rest_interface.debug_requests(1)
-        result = self.rest_interface.list_trash(self.root_container().path())
-        return create_items_from_json(self.rest_interface, result, None, True)
+        return list_items_from_path(self.rest_interface, self.root_container().path(), True, list_format)
 
-    def move(self, items, destination, exists=ExistValues.reuse, debug=False):
+    @traced('Filesystem.move', items_attributes)
+    def move(self, items, destination, exists=ExistValues.reuse, debug=False, dry_run=False):
         """Move list of items to destination.
 
         :param items:       List of items to move.
         :param destination: Path or Folder to move the items to.
         :param exists:      How to handle if an item of the same name exists in the destination folder. Defaults to rename.
         :param debug:       If true, will print the the request and response to stdout.
+        :param dry_run:     If true, nothing is moved and a CostEstimate of the requests is returned.
 
         :returns:   Details of the new item(s) in a dictionary.
         :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
         :raises AuthenticatedError:     Based on ButtFS Error Code.
         """
+        if dry_run:
+            return estimate_move_or_copy(self.rest_interface, 'move', items, destination, exists)
         if debug:
             self.rest_interface.debug_requests(1)
         return move_items(self.rest_interface, items, destination, exists)
 
-    def copy(self, items, destination, exists=ExistValues.reuse, debug=False):
+    @traced('Filesystem.copy', items_attributes)
+    def copy(self, items, destination, exists=ExistValues.reuse, debug=False, dry_run=False):
         """Copy items to destination.
 
         :param items:       List of items to copy.
         :param destination: Path or Folder to copy the items to.
         :param exists:      How to handle if an item of the same name exists in the destination folder. Defaults to rename.
         :param debug:       If true, will print the the request and response to stdout.
+        :param dry_run:     If true, nothing is copied and a CostEstimate of the requests is returned.
 
         :returns:   Details of the new item(s) in a dictionary.
         :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
         :raises AuthenticatedError:     Based on ButtFS Error Code.
         """
+        if dry_run:
+            return estimate_move_or_copy(self.rest_interface, 'copy', items, destination, exists)
         if debug:
             self.rest_interface.debug_requests(1)
         return copy_items(self.rest_interface, items, destination, exists)
 
-    def restore(self, items, method=RestoreValue.fail, method_argument=None, debug=False):
+    def batch(self, if_conflict=VersionConflictValue.fail, max_workers=8):
+        """Start a batch of metadata saves. Add changed items to it and commit them together.
+
+        :param if_conflict: Default behavior if an item is out of date. Can be set per item in MetaBatch.add.
+        :param max_workers: Maximum number of saves sent at the same time.
+        :return:            Empty MetaBatch.
+        """
+        return MetaBatch(if_conflict, max_workers)
+
+    @traced('Filesystem.restore', items_attributes)
+    def restore(self, items, method=RestoreValue.fail, method_argument=None, debug=False, dry_run=False):
         """Restore item(s) from trash.
         REST documentation: https://www.bitcasa.com/cloudfs-api-docs/api/Recover%20Trash%20Item.html
 
@@ -88,12 +213,21 @@ class Filesystem(object):
         :param restore_method:  Determines method used to restore item.
         :param method_argument: Expected contents determined by value of restore_method
         :param debug:       If true, will print the the request and response to stdout.
+        :param dry_run:     If true, nothing is restored and a CostEstimate of the requests is returned.
         :return:    Items at new location.
         """
+        if dry_run:
+            estimate = CostEstimate()
+            data = self.rest_interface.restore_data(method, method_argument)
+            for item in items:
+                path = item.path() if isinstance(item, (Item, ItemRecord)) else item
+                self.rest_interface.estimate_request(estimate, 'recover trash item', path, data)
+            return estimate
+
         results = []
         for item in items:
             path = item
-            if isinstance(item, Item):
+            if isinstance(item, (Item, ItemRecord)):
                 path = item.path()
             results.append(self.rest_interface.restore_trash_item(path, method, method_argument))
 
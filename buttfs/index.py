@@ -0,0 +1,302 @@
+from array import array
+
+from path import Path
+from private.path_cache import PathCache
+from private.filesystem_common import list_rows, walk_listings, create_items_from_json
+from private.utils import name_matcher
+
+
+class ItemIndex(object):
+    """Searchable snapshot of a remote subtree.
+
+    The subtree is walked once and kept in parallel arrays, one entry per item, so
+    queries run locally without any requests. Folders that change can be re-listed
+    with refresh() instead of walking the whole tree again.
+
+    Note: application_data is not kept in the index. Call refresh() on returned items if it is needed.
+    """
+    FOLDER = 0
+    FILE = 1
+
+    def __init__(self, rest_interface, root=None):
+        self.rest_interface = rest_interface
+        if root is None:
+            root = '/'
+        self.root_path = str(root)
+        self._reset()
+
+    def _reset(self):
+        self.ids = []
+        self.names = []
+        self.parents = array('l')
+        self.kinds = array('b')
+        self.versions = array('l')
+        self.sizes = array('d')
+        self.dates_created = array('d')
+        self.dates_meta_last_modified = array('d')
+        self.dates_content_last_modified = array('d')
+        self.extensions = array('l')
+        self.mimes = array('l')
+        self.trashed = array('b')
+        self.mirrored = array('b')
+        self.alive = array('b')
+
+        # extension and mime strings are stored once and referenced by code
+        self._strings = []
+        self._string_codes = {}
+        self._children = {}
+        self._folder_rows = {}
+        self._removed = 0
+
+    def _code(self, string):
+        string = string or ''
+        code = self._string_codes.get(string)
+        if code is None:
+            code = len(self._strings)
+            self._strings.append(string)
+            self._string_codes[string] = code
+        return code
+
+    def _set_row(self, row, data):
+        self.names[row] = data['name']
+        self.versions[row] = data.get('version', 0) or 0
+        self.sizes[row] = data.get('size', 0) or 0
+        self.dates_created[row] = data.get('date_created', 0) or 0
+        self.dates_meta_last_modified[row] = data.get('date_meta_last_modified', 0) or 0
+        self.dates_content_last_modified[row] = data.get('date_content_last_modified', 0) or 0
+        self.extensions[row] = self._code(data.get('extension'))
+        self.mimes[row] = self._code(data.get('mime'))
+        self.mirrored[row] = 1 if data.get('is_mirrored') else 0
+
+    def _add_row(self, data, parent_row, in_trash):
+        row = len(self.ids)
+        self.ids.append(data['id'])
+        self.names.append(None)
+        self.parents.append(parent_row)
+        self.kinds.append(self.FOLDER if data['type'] == 'folder' else self.FILE)
+        for column in (self.versions, self.sizes, self.dates_created, self.dates_meta_last_modified,
+                       self.dates_content_last_modified, self.extensions, self.mimes, self.mirrored):
+            column.append(0)
+        self.trashed.append(1 if in_trash else 0)
+        self.alive.append(1)
+        self._set_row(row, data)
+        self._children.setdefault(parent_row, []).append(row)
+        return row
+
+    def _remove_row(self, row):
+        stack = [row]
+        while stack:
+            current = stack.pop()
+            if self.alive[current]:
+                self.alive[current] = 0
+                self._removed += 1
+            stack.extend(self._children.pop(current, []))
+
+    def _walk(self, path, parent_row, in_trash):
+        rows_by_path = {str(path): parent_row}
+        for folder_path, listing in walk_listings(self.rest_interface, path, in_trash):
+            parent = rows_by_path.pop(folder_path)
+            for data in listing:
+                row = self._add_row(data, parent, in_trash)
+                if data['type'] == 'folder':
+                    child_path = PathCache.child_path(folder_path, data['id'])
+                    rows_by_path[child_path] = row
+                    if not in_trash:
+                        self._folder_rows[child_path] = row
+
+    def build(self, include_trash=False, debug=False):
+        """Walk the subtree and index every item in it. Replaces any previous contents.
+
+        :param include_trash:   If true, items in the trash are indexed as well.
+        :param debug:           If true, will print the the request and response to stdout.
+        :return:                self
+        """
+        if debug:
+            self.rest_interface.debug_requests(1)
+        self._reset()
+        self._walk(self.root_path, -1, False)
+        if include_trash:
+            self._walk('/', -1, True)
+        return self
+
+    def refresh(self, *folders):
+        """Re-list changed folders and update their direct contents.
+        New sub-folders are walked, removed ones are dropped with everything below them.
+
+        :param folders: Folders or id paths of folders in the index. Defaults to the index root.
+        :return:        self
+        """
+        if not folders:
+            folders = [self.root_path]
+
+        for folder in folders:
+            path = str(folder.path()) if hasattr(folder, 'path') else str(folder)
+            if path == self.root_path:
+                parent_row = -1
+            elif path in self._folder_rows:
+                parent_row = self._folder_rows[path]
+            else:
+                continue
+
+            rows = list_rows(self.rest_interface, path)
+            existing = dict((self.ids[row], row) for row in self._children.get(parent_row, [])
+                            if self.alive[row] and not self.trashed[row])
+            for data in rows:
+                row = existing.pop(data['id'], None)
+                if row is not None:
+                    self._set_row(row, data)
+                    continue
+                row = self._add_row(data, parent_row, False)
+                if data['type'] == 'folder':
+                    child_path = PathCache.child_path(path, data['id'])
+                    self._folder_rows[child_path] = row
+                    self._walk(child_path, row, False)
+
+            for row in existing.itervalues():
+                self._remove_row(row)
+
+        for path, row in self._folder_rows.items():
+            if not self.alive[row]:
+                del self._folder_rows[path]
+        if self._removed > len(self.ids) / 2:
+            self.compact()
+        return self
+
+    def compact(self):
+        """Drop the storage held by removed items.
+        :return: None
+        """
+        keep = [row for row in xrange(len(self.ids)) if self.alive[row]]
+        new_rows = dict((old, new) for new, old in enumerate(keep))
+        new_rows[-1] = -1
+
+        def take(column):
+            if isinstance(column, array):
+                return array(column.typecode, (column[row] for row in keep))
+            return [column[row] for row in keep]
+
+        parents = array('l', (new_rows[self.parents[row]] for row in keep))
+        for name in ('ids', 'names', 'kinds', 'versions', 'sizes', 'dates_created', 'dates_meta_last_modified',
+                     'dates_content_last_modified', 'extensions', 'mimes', 'trashed', 'mirrored', 'alive'):
+            setattr(self, name, take(getattr(self, name)))
+        self.parents = parents
+
+        self._children = {}
+        for row, parent in enumerate(self.parents):
+            self._children.setdefault(parent, []).append(row)
+        self._folder_rows = dict((path, new_rows[row]) for path, row in self._folder_rows.iteritems())
+        self._removed = 0
+
+    def __len__(self):
+        return len(self.ids) - self._removed
+
+    def _row_path(self, row):
+        # id path of the folder containing row
+        path = '/' if self.trashed[row] else self.root_path
+        ids = []
+        row = self.parents[row]
+        while row != -1:
+            ids.append(self.ids[row])
+            row = self.parents[row]
+        for item_id in reversed(ids):
+            path = PathCache.child_path(path, item_id)
+        return path
+
+    def _row_data(self, row):
+        data = {
+            'id': self.ids[row],
+            'name': self.names[row],
+            'type': 'folder' if self.kinds[row] == self.FOLDER else 'file',
+            'version': self.versions[row],
+            'is_mirrored': bool(self.mirrored[row]),
+            'date_created': self.dates_created[row],
+            'date_meta_last_modified': self.dates_meta_last_modified[row],
+            'date_content_last_modified': self.dates_content_last_modified[row],
+            'application_data': {},
+        }
+        if self.kinds[row] == self.FILE:
+            data['size'] = int(self.sizes[row])
+            data['extension'] = self._strings[self.extensions[row]]
+            data['mime'] = self._strings[self.mimes[row]]
+        return data
+
+    def item(self, row):
+        """
+        :param row: Row number returned by find_rows.
+        :return:    File or Folder for the row.
+        """
+        parent_path = self._row_path(row)
+        parent_path = Path.path_from_string(parent_path) if parent_path != '/' else None
+        return create_items_from_json(self.rest_interface, self._row_data(row), parent_path, bool(self.trashed[row]))[0]
+
+    def find_rows(self, name=None, regex=None, extension=None, mime=None, min_size=None, max_size=None,
+                  created_after=None, created_before=None, modified_after=None, modified_before=None,
+                  in_trash=False, item_type=None, limit=None):
+        """Same as find, but returns row numbers instead of items."""
+        def in_range(column, low, high):
+            low = low if low is not None else float('-inf')
+            high = high if high is not None else float('inf')
+            return lambda row: low <= column[row] <= high
+
+        def equals(column, value):
+            return lambda row: column[row] == value
+
+        checks = []
+        if in_trash is not None:
+            checks.append(equals(self.trashed, 1 if in_trash else 0))
+        if item_type is not None:
+            checks.append(equals(self.kinds, self.FOLDER if item_type == 'folder' else self.FILE))
+        for column, value in ((self.extensions, extension), (self.mimes, mime)):
+            if value is not None:
+                if value not in self._string_codes:
+                    return []
+                checks.append(equals(column, self._string_codes[value]))
+        if min_size is not None or max_size is not None:
+            checks.append(in_range(self.sizes, min_size, max_size))
+        if created_after is not None or created_before is not None:
+            checks.append(in_range(self.dates_created, created_after, created_before))
+        if modified_after is not None or modified_before is not None:
+            checks.append(in_range(self.dates_content_last_modified, modified_after, modified_before))
+        names = self.names
+        pattern = name_matcher(name, regex)
+        if pattern is not None:
+            checks.append(lambda row: pattern(names[row]))
+
+        alive = self.alive
+        found = []
+        for row in xrange(len(self.ids)):
+            if not alive[row]:
+                continue
+            for check in checks:
+                if not check(row):
+                    break
+            else:
+                found.append(row)
+                if limit and len(found) >= limit:
+                    break
+        return found
+
+    def find(self, name=None, regex=None, extension=None, mime=None, min_size=None, max_size=None,
+             created_after=None, created_before=None, modified_after=None, modified_before=None,
+             in_trash=False, item_type=None, limit=None):
+        """Search the index. All given conditions must match. Ranges are inclusive.
+
+        :param name:            Glob pattern matched against the whole name, i.e. '*.mov'.
+        :param regex:           Regular expression searched for in the name.
+        :param extension:       File extension without the dot.
+        :param mime:            Mime type of files.
+        :param min_size:        Minimum size in bytes.
+        :param max_size:        Maximum size in bytes.
+        :param created_after:   Earliest date_created. In seconds.
+        :param created_before:  Latest date_created. In seconds.
+        :param modified_after:  Earliest date_content_last_modified. In seconds.
+        :param modified_before: Latest date_content_last_modified. In seconds.
+        :param in_trash:        True for trashed items only, None for both. Defaults to False.
+        :param item_type:       'file' or 'folder'. Defaults to both.
+        :param limit:           Maximum number of results. Optional.
+        :return:                List of Files and Folders.
+        """
+        rows = self.find_rows(name, regex, extension, mime, min_size, max_size, created_after, created_before,
+                              modified_after, modified_before, in_trash, item_type, limit)
+        return [self.item(row) for row in rows]
+
@@ -4,8 +4,10 @@ from private.buttfs_paths import VersionConflictValue, ExistValues, RestoreValue
 from errors import operation_not_allowed, method_not_implemented
 from private.cached_object import CachedObject
 from path import Path
+from tracing import traced, item_attributes
 
 class Item(CachedObject):
+    CACHE_NAME = 'items'
 
     def __init__(self, rest_interface):
         super(Item, self).__init__()
@@ -20,13 +22,14 @@ class Item(CachedObject):
         self.in_trash = in_trash
 
         if not parent_path:
-            self._full_path = Path.path_from_string('/')
+            parent_path = Path.root()
         elif isinstance(parent_path, Item):
-            self._full_path = parent_path.path().copy()
-        else:
-            self._full_path = parent_path.copy()
+            parent_path = parent_path.path()
+        elif isinstance(parent_path, basestring):
+            parent_path = Path.path_from_string(parent_path)
 
-        self._full_path.append(self.id)
+        # shares the parent path instead of copying it
+        self._full_path = parent_path.child(self.id)
 
         return self
 
@@ -144,6 +147,7 @@ class Item(CachedObject):
     def path(self):
         return self._full_path
 
+    @traced('Item.move_to', item_attributes)
     def move_to(self, dest, exists=ExistValues.rename, debug=False):
         """Move item to destination.
 
@@ -162,6 +166,7 @@ class Item(CachedObject):
             self.rest_interface.debug_requests(1)
         move_items(self.rest_interface, [self.path()], dest, exists=exists)
 
+    @traced('Item.copy_to', item_attributes)
     def copy_to(self, dest, exists=ExistValues.rename, debug=False):
         """Copy item to destination.
 
@@ -186,6 +191,7 @@ class Item(CachedObject):
     def save(self, if_conflict=VersionConflictValue.fail, debug=False):
         raise Exception('Save not implemented for item base class!')
 
+    @traced('Item.restore', item_attributes)
     def restore(self, restore_method=RestoreValue.fail, method_argument=None):
         """Restore item from trash.
         REST documentation: https://www.bitcasa.com/cloudfs-api-docs/api/Recover%20Trash%20Item.html
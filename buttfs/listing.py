@@ -0,0 +1,97 @@
+import collections
+
+from private.filesystem_common import create_items_from_json
+
+
+class LazyItemList(collections.Sequence):
+    """Listing that keeps the decoded rows and creates items only when they are used.
+
+    Indexing or iterating creates the File or Folder for a row once and keeps it, so
+    repeated access returns the same object. len(), find() and names() never create items.
+    Slicing returns another LazyItemList that shares the rows and any created items.
+    """
+    def __init__(self, rest_interface, rows, parent_path, in_trash=False):
+        self.rest_interface = rest_interface
+        self.parent_path = parent_path
+        self.in_trash = in_trash
+        self._rows = rows
+        # created items, shared with every slice of this list
+        self._items = [None] * len(rows)
+        # positions in _rows visible through this list, None for all of them
+        self._indexes = None
+
+    def _position(self, index):
+        return index if self._indexes is None else self._indexes[index]
+
+    def _item(self, index):
+        position = self._position(index)
+        item = self._items[position]
+        if item is None:
+            item = create_items_from_json(
+                self.rest_interface, self._rows[position], self.parent_path, self.in_trash)[0]
+            self._items[position] = item
+        return item
+
+    def _row(self, index):
+        return self._rows[self._position(index)]
+
+    def __len__(self):
+        return len(self._rows) if self._indexes is None else len(self._indexes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            view = LazyItemList.__new__(LazyItemList)
+            view.__dict__.update(self.__dict__)
+            view._indexes = [self._position(i) for i in xrange(*index.indices(len(self)))]
+            return view
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('list index out of range')
+        return self._item(index)
+
+    def __iter__(self):
+        for index in xrange(len(self)):
+            yield self._item(index)
+
+    def __eq__(self, other):
+        if isinstance(other, (LazyItemList, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return 'LazyItemList({} items, {} created)'.format(len(self), self.created_count())
+
+    def created_count(self):
+        """
+        :return: Number of rows that have been turned into items.
+        """
+        return sum(1 for index in xrange(len(self)) if self._items[self._position(index)] is not None)
+
+    def names(self):
+        """
+        :return: List of the names of every entry, without creating items.
+        """
+        return [self._row(index)['name'] for index in xrange(len(self))]
+
+    def find(self, name, item_type=None):
+        """First entry with the given name.
+
+        :param name:        Name to look for.
+        :param item_type:   'file' or 'folder' to only match that type.
+        :return:            File or Folder, None if there is no match.
+        """
+        for index in xrange(len(self)):
+            row = self._row(index)
+            if row['name'] == name and (item_type is None or row['type'] == item_type):
+                return self._item(index)
+        return None
+
+    def materialize(self):
+        """
+        :return: List of every item.
+        """
+        return list(self)
@@ -0,0 +1,252 @@
+"""Timing and size of every request a session makes.
+
+Sinks are added with Session.add_metrics_sink. Each is called with a RequestRecord
+once the request is complete, on the thread that made the request. Nothing is
+measured while a session has no sinks.
+"""
+import os
+import bisect
+import threading
+
+from private.utils import replace_file
+
+# upper bounds of the duration buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestRecord(object):
+    """Measurements of a single request.
+
+    endpoint:           Friendly name of the request from rest_endpoints, i.e. 'list folder'.
+    method:             HTTP method.
+    status:             HTTP status code, None if no response was received.
+    error:              Name of the exception raised by the request, None if it succeeded.
+    bytes_sent:         Size of the request body.
+    bytes_received:     Size of the response body. Content-Length for streamed responses.
+    queue_wait:         Seconds from the call until the request was handed to the transport.
+    time_to_first_byte: Seconds from sending the request until the response headers were read.
+    total_time:         Seconds from the call until the response body was read. Streamed responses
+                        are recorded when their headers arrive, background downloads when they finish.
+    connection_reused:  True if a pooled connection was used, False if one was opened.
+                        None when the transport does not pool connections.
+    streamed:           True if the body was left for the caller to read.
+    """
+    __slots__ = ('endpoint', 'method', 'status', 'error', 'bytes_sent', 'bytes_received', 'queue_wait',
+                 'time_to_first_byte', 'total_time', 'connection_reused', 'streamed')
+
+    def __init__(self, endpoint, method):
+        self.endpoint = endpoint
+        self.method = method
+        self.status = None
+        self.error = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.queue_wait = 0.0
+        self.time_to_first_byte = None
+        self.total_time = 0.0
+        self.connection_reused = None
+        self.streamed = False
+
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __repr__(self):
+        return 'RequestRecord({} {} {} {:.3f}s)'.format(self.method, self.endpoint, self.status, self.total_time)
+
+
+class RequestMetrics(object):
+    """Sinks of a session, shared by every copy of its rest adapter."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sinks = ()
+
+    @property
+    def enabled(self):
+        return bool(self._sinks)
+
+    def add_sink(self, sink):
+        """
+        :param sink: Function called with a RequestRecord, or any object with a record method.
+        """
+        with self._lock:
+            self._sinks += (sink,)
+
+    def remove_sink(self, sink):
+        with self._lock:
+            self._sinks = tuple(s for s in self._sinks if s != sink)
+
+    def emit(self, record):
+        for sink in self._sinks:
+            if hasattr(sink, 'record'):
+                sink.record(record)
+            else:
+                sink(record)
+
+
+class CallbackSink(object):
+    """Calls function(record) for every request, optionally only for some endpoints."""
+    def __init__(self, function, endpoints=None):
+        self.function = function
+        self.endpoints = frozenset(endpoints) if endpoints is not None else None
+
+    def record(self, record):
+        if self.endpoints is None or record.endpoint in self.endpoints:
+            self.function(record)
+
+
+class _Series(object):
+    __slots__ = ('count', 'buckets', 'total_time', 'time_to_first_byte', 'queue_wait',
+                 'bytes_sent', 'bytes_received', 'reused', 'errors')
+
+    def __init__(self, bucket_count):
+        self.count = 0
+        self.buckets = [0] * (bucket_count + 1)
+        self.total_time = 0.0
+        self.time_to_first_byte = 0.0
+        self.queue_wait = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.reused = 0
+        self.errors = 0
+
+
+class HistogramSink(object):
+    """Keeps a duration histogram and totals for every endpoint, method and status."""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bucket_bounds = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def record(self, record):
+        key = (record.endpoint, record.method, record.status)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.bucket_bounds))
+            series.count += 1
+            series.buckets[bisect.bisect_left(self.bucket_bounds, record.total_time)] += 1
+            series.total_time += record.total_time
+            series.time_to_first_byte += record.time_to_first_byte or 0.0
+            series.queue_wait += record.queue_wait
+            series.bytes_sent += record.bytes_sent
+            series.bytes_received += record.bytes_received
+            series.reused += 1 if record.connection_reused else 0
+            series.errors += 1 if record.error else 0
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def snapshot(self):
+        """
+        :return: Dictionary of (endpoint, method, status) to a dictionary of counters. buckets holds
+                 the number of requests no slower than each bound in bucket_bounds, then the total.
+        """
+        with self._lock:
+            result = {}
+            for key, series in self._series.iteritems():
+                cumulative, buckets = 0, []
+                for count in series.buckets:
+                    cumulative += count
+                    buckets.append(cumulative)
+                result[key] = {
+                    'count': series.count,
+                    'buckets': buckets,
+                    'total_time': series.total_time,
+                    'mean_time': series.total_time / series.count,
+                    'time_to_first_byte': series.time_to_first_byte,
+                    'queue_wait': series.queue_wait,
+                    'bytes_sent': series.bytes_sent,
+                    'bytes_received': series.bytes_received,
+                    'connections_reused': series.reused,
+                    'errors': series.errors,
+                }
+            return result
+
+    def quantile(self, q, endpoint=None):
+        """Estimate a request duration quantile from the buckets.
+
+        :param q:           Quantile between 0 and 1, i.e. 0.99.
+        :param endpoint:    Only include this endpoint. Defaults to every request.
+        :return:            Upper bound of the bucket holding the quantile in seconds. None if there are
+                            no requests, infinity if it is past the last bucket.
+        """
+        with self._lock:
+            counts = [0] * (len(self.bucket_bounds) + 1)
+            for key, series in self._series.iteritems():
+                if endpoint is None or key[0] == endpoint:
+                    counts = [a + b for a, b in zip(counts, series.buckets)]
+        total = sum(counts)
+        if not total:
+            return None
+        cumulative = 0
+        for bound, count in zip(self.bucket_bounds + (float('inf'),), counts):
+            cumulative += count
+            if cumulative >= q * total:
+                return bound
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PrometheusSink(HistogramSink):
+    """HistogramSink that can write the Prometheus text exposition format."""
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='buttfs_request'):
+        super(PrometheusSink, self).__init__(buckets)
+        self.prefix = prefix
+
+    def exposition(self):
+        """
+        :return: String of every metric in the Prometheus text format.
+        """
+        snapshot = sorted(self.snapshot().iteritems(), key=lambda item: map(str, item[0]))
+        counters = (
+            ('time_to_first_byte_seconds_total', 'time_to_first_byte', 'Seconds until response headers were read.'),
+            ('queue_wait_seconds_total', 'queue_wait', 'Seconds before requests were handed to the transport.'),
+            ('sent_bytes_total', 'bytes_sent', 'Bytes of request bodies.'),
+            ('received_bytes_total', 'bytes_received', 'Bytes of response bodies.'),
+            ('reused_connections_total', 'connections_reused', 'Requests sent on a pooled connection.'),
+            ('errors_total', 'errors', 'Requests that raised an error.'),
+        )
+        name = self.prefix + '_duration_seconds'
+        lines = ['# HELP {} Seconds from the call until the response body was read.'.format(name),
+                 '# TYPE {} histogram'.format(name)]
+        for (endpoint, method, status), values in snapshot:
+            labels = 'endpoint="{}",method="{}",status="{}"'.format(
+                _label_value(endpoint), _label_value(method), _label_value(status if status is not None else ''))
+            for bound, count in zip(self.bucket_bounds + (float('inf'),), values['buckets']):
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, labels, _number(bound), count))
+            lines.append('{}_sum{{{}}} {}'.format(name, labels, _number(values['total_time'])))
+            lines.append('{}_count{{{}}} {}'.format(name, labels, values['count']))
+
+        for suffix, key, help_text in counters:
+            name = '{}_{}'.format(self.prefix, suffix)
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} counter'.format(name))
+            for (endpoint, method, status), values in snapshot:
+                labels = 'endpoint="{}",method="{}",status="{}"'.format(
+                    _label_value(endpoint), _label_value(method), _label_value(status if status is not None else ''))
+                lines.append('{}{{{}}} {}'.format(name, labels, _number(values[key])))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, target):
+        """Write the exposition to a file, i.e. for the node exporter textfile collector.
+
+        :param target:  Path or writable file. A path is replaced atomically.
+        :return:        None
+        """
+        text = self.exposition()
+        if hasattr(target, 'write'):
+            target.write(text)
+            return
+        temporary = '{}.{}.tmp'.format(target, os.getpid())
+        with open(temporary, 'w') as fp:
+            fp.write(text)
+        replace_file(temporary, target)
@@ -1,7 +1,56 @@
-import copy
+class _PathNode(object):
+    # one immutable segment of a path, shared by every path below it
+    __slots__ = ('parent', 'name', 'length', 'string')
+
+    def __init__(self, parent, name):
+        self.parent = parent
+        self.name = name
+        self.length = parent.length + 1 if parent is not None else 1
+        self.string = None
+
+    def to_string(self):
+        if self.string is None:
+            # fill in any ancestors that have not been converted yet without recursing
+            pending = []
+            node = self
+            while node is not None and node.string is None:
+                pending.append(node)
+                node = node.parent
+            for node in reversed(pending):
+                if node.parent is None:
+                    node.string = node.name
+                elif node.parent.string == '/':
+                    node.string = '/' + node.name
+                else:
+                    node.string = node.parent.string + '/' + node.name
+        return self.string
+
+    def segments(self):
+        names = []
+        node = self
+        while node is not None:
+            names.append(node.name)
+            node = node.parent
+        names.reverse()
+        return names
+
+
+_ROOT = _PathNode(None, '/')
 
 
 class Path(object):
+    """Path of ids through the filesystem.
+
+    Paths are made of shared, immutable segments: child() creates a new Path in constant
+    time without copying the parent, and the string form is built once and cached.
+    Paths hash and compare equal to their string form, so they can be mixed with
+    URL strings in dictionaries and comparisons.
+
+    append() is kept for compatibility. It re-points this Path at a new segment and does
+    not affect other paths, but a Path should not be appended to while it is a dictionary key.
+    """
+    __slots__ = ('_node',)
+
     @staticmethod
     def path_from_string(path_string):
         """Create a path from a string. Separator character is a '/'
@@ -35,8 +84,79 @@ class Path(object):
         paths.insert(0, '/')
         return Path.path_from_string_list(paths)
 
+    @staticmethod
+    def root():
+        """
+        :return: Path of the filesystem root. All root paths share the same segment.
+        """
+        return Path._from_node(_ROOT)
+
+    @staticmethod
+    def _from_node(node):
+        path = Path.__new__(Path)
+        path._node = node
+        return path
+
     def __init__(self, paths):
-        self.paths = filter(len, paths)
+        node = None
+        for name in paths:
+            if not len(name):
+                continue
+            if node is None and name == '/':
+                node = _ROOT
+            else:
+                node = _PathNode(node, name)
+        self._node = node
+
+    @property
+    def paths(self):
+        """
+        :return: List of the segments in this path.
+        """
+        if self._node is None:
+            return []
+        return self._node.segments()
+
+    @property
+    def name(self):
+        """
+        :return: Last segment of the path, the id of the item it points to.
+        """
+        return self._node.name if self._node is not None else None
+
+    @property
+    def parent(self):
+        """
+        :return: Path of the containing folder, None for the root.
+        """
+        if self._node is None or self._node.parent is None:
+            return None
+        return Path._from_node(self._node.parent)
+
+    def child(self, new_path):
+        """
+        :param new_path: Item or string id of item.
+        :return: New Path for new_path inside this path. This path is not changed.
+        """
+        id = new_path
+        if hasattr(new_path, 'id'):
+            id = new_path.id
+        return Path._from_node(_PathNode(self._node, id))
+
+    def is_ancestor(self, other):
+        """
+        :param other: Path or path string.
+        :return: True if other is inside this path, at any depth.
+        """
+        if not isinstance(other, Path):
+            other = Path.path_from_string(str(other))
+        mine = self._node
+        node = other._node
+        if mine is None or node is None or node.length <= mine.length:
+            return False
+        while node.length > mine.length:
+            node = node.parent
+        return node is mine or node.to_string() == mine.to_string()
 
     def __getitem__(self, item):
         if type(item) is slice:
@@ -47,29 +167,36 @@ class Path(object):
             return self.paths[item]
 
     def __str__(self):
-        if self.paths[0] == '/':
-            return '/' + '/'.join(self.paths[1:])
-        else:
-            return '/'.join(self.paths)
+        return self._node.to_string()
 
     def __repr__(self):
         return self.__str__()
 
     def __len__(self):
-        return len(self.paths)
+        return self._node.length if self._node is not None else 0
+
+    def __eq__(self, other):
+        if isinstance(other, Path):
+            return self._node is other._node or str(self) == str(other)
+        if isinstance(other, basestring):
+            return str(self) == other
+        return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(str(self))
 
     def copy(self):
         """
-        :return: A copy of the path.
+        :return: A copy of the path. Shares all segments with this path.
         """
-        return copy.deepcopy(self)
+        return Path._from_node(self._node)
 
     def append(self, new_path):
         """
         :param new_path: Item or string id of item.
         :return: None
         """
-        id = new_path
-        if hasattr(new_path, 'id'):
-            id = new_path.id
-        self.paths.append(id)
+        self._node = self.child(new_path)._node
@@ -46,6 +46,40 @@ class RestoreValue(Values):
     allowed = [fail, rescue, recreate]
 
 
+class ListFormat(Values):
+    # File and Folder objects
+    items = 'items'
+    # read-only ItemRecords, promoted to items when changed
+    compact = 'compact'
+    # single ItemTable with one row per entry
+    columnar = 'columnar'
+    # LazyItemList, items created when first accessed
+    lazy = 'lazy'
+    _name = 'list format'
+
+    allowed = [items, compact, columnar, lazy]
+
+
+class OverBudgetValue(Values):
+    # refuse requests past the budget
+    fail = 'fail'
+    # send them and warn
+    warn = 'warn'
+    _name = 'over budget'
+
+    allowed = [fail, warn]
+
+
+class TransferPriority(Values):
+    # waiting transfers are served in this order
+    high = 'high'
+    normal = 'normal'
+    low = 'low'
+    _name = 'transfer priority'
+
+    allowed = [high, normal, low]
+
+
 rest_endpoints = {
     # layout:
     # '<friendly name>': {
@@ -0,0 +1,123 @@
+import threading
+
+
+class CacheStats(object):
+    """Counters for a single cache.
+
+    hits:           Reads answered from the cache.
+    misses:         Reads that had to make a request.
+    stale_serves:   Reads answered with data known to be out of date, or found to be out of date once used.
+    evictions:      Entries dropped from the cache.
+    bytes_held:     Approximate size of the cached data. Computed when a snapshot is taken.
+    refreshes:      Number of requests made to fill the cache, with their total and maximum latency in seconds.
+    """
+    def __init__(self, name, registry=None, size_function=None):
+        self.name = name
+        self.registry = registry
+        self.size_function = size_function
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.stale_serves = 0
+            self.evictions = 0
+            self.refreshes = 0
+            self.refresh_time = 0.0
+            self.refresh_time_max = 0.0
+
+    def _notify(self, event, value):
+        if self.registry is not None and self.registry.sink is not None:
+            self.registry.sink(self.name, event, value)
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+        self._notify('hit', 1)
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+        self._notify('miss', 1)
+
+    def stale(self):
+        with self._lock:
+            self.stale_serves += 1
+        self._notify('stale', 1)
+
+    def evicted(self, count=1):
+        if count <= 0:
+            return
+        with self._lock:
+            self.evictions += count
+        self._notify('eviction', count)
+
+    def refreshed(self, seconds):
+        with self._lock:
+            self.refreshes += 1
+            self.refresh_time += seconds
+            self.refresh_time_max = max(self.refresh_time_max, seconds)
+        self._notify('refresh', seconds)
+
+    def snapshot(self):
+        """
+        :return: Dictionary of the current counters.
+        """
+        bytes_held = self.size_function() if self.size_function else None
+        with self._lock:
+            reads = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': float(self.hits) / reads if reads else None,
+                'stale_serves': self.stale_serves,
+                'evictions': self.evictions,
+                'bytes_held': bytes_held,
+                'refreshes': self.refreshes,
+                'refresh_time_total': self.refresh_time,
+                'refresh_time_mean': self.refresh_time / self.refreshes if self.refreshes else None,
+                'refresh_time_max': self.refresh_time_max,
+            }
+
+
+class CacheStatsRegistry(object):
+    """All cache counters for a session.
+
+    sink is an optional function called as sink(cache_name, event, value) for every
+    event, where event is one of 'hit', 'miss', 'stale', 'eviction' or 'refresh'.
+    It is called on the thread that used the cache, so it should return quickly.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.sink = None
+
+    def get(self, name, size_function=None):
+        """
+        :param name:            Name of the cache.
+        :param size_function:   Function returning the approximate bytes held by the cache. Optional.
+        :return:                CacheStats for name, created if needed.
+        """
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = CacheStats(name, self, size_function)
+            elif size_function is not None:
+                stats.size_function = size_function
+            return stats
+
+    def snapshot(self):
+        """
+        :return: Dictionary of cache name to counters.
+        """
+        with self._lock:
+            stats = self._stats.values()
+        return dict((s.name, s.snapshot()) for s in stats)
+
+    def reset(self):
+        with self._lock:
+            stats = self._stats.values()
+        for s in stats:
+            s.reset()
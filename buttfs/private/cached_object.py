@@ -5,6 +5,9 @@ from ..errors import ButtFSError
 class CachedObject(object):
     # no caching by default
     CACHE_EXPIRE = 0
+    # name used for the session cache statistics. Reads of the cached attributes are not
+    # counted, only refreshes. Subclasses count hits and misses where they decide to refresh
+    CACHE_NAME = 'objects'
 
     def __init__(self):
         self.last_update = time.time()
@@ -17,12 +20,23 @@ class CachedObject(object):
     def _refresh_request(self, debug=False):
         pass
 
-    def _update_self(self, debug=False):
+    def _cache_stats(self):
+        rest_interface = getattr(self, 'rest_interface', self)
+        registry = getattr(rest_interface, 'cache_stats', None)
+        if registry is None:
+            return None
+        return registry.get(self.CACHE_NAME)
 
+    def _update_self(self, debug=False):
+        start = time.time()
         result, x_headers = self._refresh_request(debug)
         self._initialize_self(result, x_headers)
         self.dirty = False
         self.last_update = time.time()
+
+        stats = self._cache_stats()
+        if stats:
+            stats.refreshed(self.last_update - start)
         return True
 
     def _prepare_to_read(self):
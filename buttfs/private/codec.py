@@ -0,0 +1,74 @@
+"""JSON codec used for every request and response.
+
+The fastest installed library is used: ujson, then simplejson, then the standard
+library json module. use() selects a codec explicitly, by module name or by any
+object with loads and dumps functions.
+"""
+import importlib
+
+PREFERRED = ('ujson', 'simplejson', 'json')
+
+_codec = None
+
+
+def _first_available():
+    for name in PREFERRED:
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            continue
+
+
+def use(codec=None):
+    """Select the JSON codec.
+
+    :param codec:   Module name, or object with loads and dumps functions. None selects the
+                    fastest installed library.
+    :return:        The codec now in use.
+    """
+    global _codec
+    if codec is None:
+        codec = _first_available()
+    elif isinstance(codec, basestring):
+        codec = importlib.import_module(codec)
+    _codec = codec
+    return codec
+
+
+def name():
+    """
+    :return: Name of the codec in use.
+    """
+    return getattr(_codec, '__name__', type(_codec).__name__)
+
+
+def loads(content):
+    """
+    :param content: JSON document.
+    :return:        Decoded value.
+    :raises ValueError: content is not valid JSON.
+    """
+    return _codec.loads(content)
+
+
+def dumps(value):
+    """
+    :param value:   Value to encode.
+    :return:        JSON document.
+    """
+    return _codec.dumps(value)
+
+
+def try_loads(content, default=None):
+    """
+    :param content: JSON document or other response content.
+    :param default: Returned if content is not valid JSON.
+    :return:        Decoded value or default.
+    """
+    try:
+        return _codec.loads(content)
+    except (ValueError, TypeError):
+        return default
+
+
+use()
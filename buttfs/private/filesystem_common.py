@@ -1,22 +1,104 @@
 import collections
 
-from ..errors import invalid_argument
+from ..errors import invalid_argument, path_not_found
+from path_cache import PathCache
+from buttfs_paths import ListFormat, ExistValues
 
-def list_items_from_path(rest_interface, path, in_trash=False):
+def _listing_rows(data):
+    if 'results' in data:
+        data = data['results']
+
+    if 'items' in data:
+        data = data['items']
+
+    return data
+
+def list_items_from_path(rest_interface, path, in_trash=False, list_format=ListFormat.items):
+    if not ListFormat.legal_value(list_format):
+        ListFormat.raise_exception(list_format)
     if in_trash:
         response = rest_interface.list_trash(path)
     else:
         response = rest_interface.list_folder(path)
+        rest_interface.path_cache.record_listing(path, _listing_rows(response))
     path = path if str(path) != '/' else None
 
     # only use actual response
-    return create_items_from_json(rest_interface, response, path, in_trash)
+    return create_listing(rest_interface, response, path, in_trash, list_format)
+
+def iter_items_from_path(rest_interface, path, in_trash=False, list_format=ListFormat.items):
+    if list_format not in (ListFormat.items, ListFormat.compact):
+        raise invalid_argument('list_format', 'ListFormat.items or ListFormat.compact', list_format)
+    from ..path import Path
+    if in_trash:
+        rows = rest_interface.iter_trash(path)
+    else:
+        rows = rest_interface.iter_folder(path)
+    parent_path = Path.path_from_string(str(path)) if str(path) != '/' else None
+
+    # the request has been sent, items are created as rows are parsed
+    return (create_listing(rest_interface, row, parent_path, in_trash, list_format)[0] for row in rows)
+
+def create_listing(rest_interface, data, parent_path, in_trash=False, list_format=ListFormat.items):
+    if list_format == ListFormat.compact:
+        return create_records_from_json(rest_interface, data, parent_path, in_trash)
+    if list_format == ListFormat.columnar:
+        return create_table_from_json(rest_interface, data, parent_path, in_trash)
+    if list_format == ListFormat.lazy:
+        from ..listing import LazyItemList
+        data = _listing_rows(data)
+        if isinstance(data, collections.Mapping):
+            data = [data]
+        return LazyItemList(rest_interface, data, parent_path, in_trash)
+    return create_items_from_json(rest_interface, data, parent_path, in_trash)
+
+def list_rows(rest_interface, path, in_trash=False):
+    """List a folder without creating items.
+    :return: List of item dictionaries in the folder.
+    """
+    if in_trash:
+        return _listing_rows(rest_interface.list_trash(path))
+    rows = _listing_rows(rest_interface.list_folder(path))
+    rest_interface.path_cache.record_listing(path, rows)
+    return rows
+
+def walk_listings(rest_interface, path, in_trash=False):
+    """Breadth first walk of the folders below path.
+    Yields tuples of (folder id path, list of item dictionaries in that folder).
+    """
+    pending = collections.deque([str(path)])
+    while pending:
+        folder_path = pending.popleft()
+        rows = list_rows(rest_interface, folder_path, in_trash)
+        yield folder_path, rows
+
+        for row in rows:
+            if row['type'] == 'folder':
+                pending.append(PathCache.child_path(folder_path, row['id']))
+
+def resolve_name_path(rest_interface, name_path):
+    from ..container import Folder
+    from ..path import Path
+    names = [name for name in name_path.split('/') if name]
+    if not names:
+        return Folder.root_folder(rest_interface.get_copy())
+
+    def list_folder(path):
+        return _listing_rows(rest_interface.list_folder(path))
+
+    found = rest_interface.path_cache.resolve(names, list_folder)
+    if found is None:
+        raise path_not_found(name_path)
+
+    data, parent_path = found
+    parent_path = Path.path_from_string(parent_path) if parent_path != '/' else None
+    return create_items_from_json(rest_interface, data, parent_path)[0]
 
 def move_items(rest_interface, items, destination, exists):
     from ..file import File
     from ..container import Folder
     from ..item import Item
-    if isinstance(destination, Item):
+    if isinstance(destination, Item) or hasattr(destination, 'promote'):
         destination = destination.path()
     operations = {
         File:lambda file: rest_interface.move_file(file.path(), destination, file.name, exists),
@@ -29,7 +111,7 @@ def copy_items(rest_interface, items, destination, exists):
     from ..file import File
     from ..container import Folder
     from ..item import Item
-    if isinstance(destination, Item):
+    if isinstance(destination, Item) or hasattr(destination, 'promote'):
         destination = destination.path()
 
     operations = {
@@ -39,10 +121,38 @@ def copy_items(rest_interface, items, destination, exists):
 
     return _process_items_by_type(items, operations)
 
+def estimate_move_or_copy(rest_interface, verb, items, destination, exists):
+    """CostEstimate of move_items or copy_items, without sending anything.
+
+    :param verb:    'move' or 'copy'.
+    """
+    from ..budget import CostEstimate
+    from ..file import File
+    from ..container import Folder
+    from ..item import Item
+    if isinstance(destination, Item) or hasattr(destination, 'promote'):
+        destination = destination.path()
+
+    estimate = CostEstimate()
+    data = {'to': destination}
+    if exists:
+        if not ExistValues.legal_value(exists):
+            ExistValues.raise_exception(exists)
+        data['exists'] = exists
+
+    def add(kind):
+        return lambda item: rest_interface.estimate_request(
+            estimate, '{} {}'.format(verb, kind), item.path(), dict(data, name=item.name))
+
+    _process_items_by_type(items, {File: add('file'), Folder: add('folder')})
+    return estimate
+
 def _process_items_by_type(items, operation_dictionary):
     if type(items) is not list and type(items) is not tuple:
         items = [items]
     for item in items:
+        if hasattr(item, 'promote'):
+            item = item.promote()
         if type(item) in operation_dictionary:
             op = operation_dictionary[type(item)]
             op(item)
@@ -56,11 +166,7 @@ def _process_items_by_type(items, operation_dictionary):
 def create_items_from_json(rest_interface, data, parent_path, in_trash=False):
     from ..file import File
     from ..container import Folder
-    if 'results' in data:
-        data = data['results']
-
-    if 'items' in data:
-        data = data['items']
+    data = _listing_rows(data)
 
     items = []
 
@@ -90,3 +196,33 @@ def create_items_from_json(rest_interface, data, parent_path, in_trash=False):
 
 
     return items
+
+def create_records_from_json(rest_interface, data, parent_path, in_trash=False):
+    from ..record import ItemRecord
+    from ..path import Path
+    data = _listing_rows(data)
+
+    if not parent_path:
+        parent_path = Path.root()
+    elif hasattr(parent_path, 'path'):
+        parent_path = parent_path.path()
+    elif isinstance(parent_path, basestring):
+        parent_path = Path.path_from_string(parent_path)
+
+    if isinstance(data, collections.Mapping):
+        data = [data]
+    # records share the parent path and the rest interface
+    return [ItemRecord(rest_interface, item_json, parent_path, in_trash) for item_json in data]
+
+def create_table_from_json(rest_interface, data, parent_path, in_trash=False):
+    from ..table import ItemTable
+    data = _listing_rows(data)
+
+    if hasattr(parent_path, 'path'):
+        parent_path = parent_path.path()
+    if not parent_path:
+        parent_path = '/'
+
+    if isinstance(data, collections.Mapping):
+        data = [data]
+    return ItemTable.from_rows(rest_interface, [(parent_path, data)], in_trash)
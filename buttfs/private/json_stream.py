@@ -0,0 +1,156 @@
+"""Incremental parsing of the items array in listing responses.
+
+Listings look like {"result": {"items": [{...}, {...}], "meta": {...}}}. ArrayParser
+scans the body as it arrives and decodes each element of the array as soon as it is
+complete, so only the element being read is held in memory.
+"""
+import re
+
+import codec
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_SEEK, _ARRAY, _ELEMENT, _DONE = range(4)
+
+# characters that can change the parser state. Everything else is skipped over.
+_SPECIAL = re.compile(r'[\[\]{}":,\\]')
+
+
+class ArrayParser(object):
+    """Finds the array stored under key and yields its elements.
+
+    Elements must be objects or arrays, which is always the case for listings.
+    Bytes are scanned directly: UTF-8 never uses the ASCII characters JSON is
+    structured with inside multi-byte characters.
+    """
+    def __init__(self, key='items', max_depth=2):
+        self.key = key
+        self.max_depth = max_depth
+        self._state = _SEEK
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # while seeking: pieces of the current string and the last complete one
+        self._string = []
+        self._last_string = None
+        self._after_key = False
+        # pieces of the element being read
+        self._element = []
+        self._element_depth = 0
+
+    @property
+    def done(self):
+        return self._state == _DONE
+
+    def feed(self, chunk):
+        """
+        :param chunk:   Next part of the document.
+        :return:        List of the elements completed by chunk.
+        """
+        values = []
+        if self._state == _DONE or not chunk:
+            return values
+
+        skip = 1 if self._escape else 0
+        self._escape = False
+        string_start = 0
+        element_start = 0
+
+        for match in _SPECIAL.finditer(chunk):
+            i = match.start()
+            if i < skip:
+                continue
+            c = chunk[i]
+
+            if self._in_string:
+                if c == '\\':
+                    skip = i + 2
+                    if skip > len(chunk):
+                        self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._state == _SEEK:
+                        self._last_string = ''.join(self._string) + chunk[string_start:i]
+                        self._string = []
+                        self._after_key = False
+                continue
+
+            if self._state == _ELEMENT:
+                if c == '"':
+                    self._in_string = True
+                elif c in '{[':
+                    self._element_depth += 1
+                elif c in '}]':
+                    self._element_depth -= 1
+                    if self._element_depth == 0:
+                        self._element.append(chunk[element_start:i + 1])
+                        values.append(codec.loads(''.join(self._element)))
+                        self._element = []
+                        self._state = _ARRAY
+
+            elif self._state == _ARRAY:
+                if c in '{[':
+                    self._state = _ELEMENT
+                    self._element_depth = 1
+                    element_start = i
+                elif c == ']':
+                    self._state = _DONE
+                    return values
+
+            else:
+                if c == '"':
+                    self._in_string = True
+                    string_start = i + 1
+                elif c == ':':
+                    self._after_key = self._last_string == self.key and self._depth <= self.max_depth
+                elif c == '[' and self._after_key:
+                    self._state = _ARRAY
+                elif c in '{[':
+                    self._depth += 1
+                    self._after_key = False
+                elif c in '}]':
+                    self._depth -= 1
+                elif c == ',':
+                    self._after_key = False
+                    self._last_string = None
+
+        # keep the unfinished parts for the next chunk
+        if self._state == _ELEMENT:
+            self._element.append(chunk[element_start:])
+        elif self._state == _SEEK and self._in_string:
+            self._string.append(chunk[string_start:])
+        return values
+
+    def close(self):
+        """
+        :raises ValueError: The document ended before the array did.
+        """
+        if self._state != _DONE:
+            raise ValueError('Listing ended before the end of the {} array.'.format(self.key))
+
+
+def iter_array(chunks, key='items'):
+    """
+    :param chunks:  Iterable of the parts of a JSON document.
+    :param key:     Key of the array to read.
+    :return:        Generator of the elements of the array.
+    :raises ValueError: The document ended before the array did.
+    """
+    parser = ArrayParser(key)
+    for chunk in chunks:
+        for value in parser.feed(chunk):
+            yield value
+    parser.close()
+
+
+def iter_response_items(response, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    :param response:    Streamed requests.Response for a listing.
+    :param chunk_size:  Number of bytes read at a time.
+    :return:            Generator of item dictionaries. The response is closed when it ends.
+    """
+    try:
+        for value in iter_array(response.iter_content(chunk_size=chunk_size)):
+            yield value
+    finally:
+        response.close()
@@ -0,0 +1,194 @@
+import sys
+import time
+import threading
+
+from cache_stats import CacheStats
+
+
+class PathCacheNode(object):
+    """A folder or file seen in a listing.
+    Children are keyed by name and only exist once the folder has been listed.
+    """
+    def __init__(self, path, data=None):
+        self.path = path
+        self.data = data
+        self.children = None
+        self.listed_at = 0
+        self.stale = False
+
+
+class PathCache(object):
+    """Name to id trie built from folder listings.
+
+    Every listing that passes through the SDK is recorded so human readable paths
+    (/Photos/2014/a.jpg) can be turned into id paths without listing each level again.
+    Mutations made through the SDK invalidate the folders they touch. Changes made
+    by other clients are picked up once CACHE_EXPIRE seconds have passed.
+
+    Shared by all copies of a rest interface, so access is locked.
+    """
+    CACHE_EXPIRE = 300
+
+    def __init__(self, expire=None, stats=None):
+        if expire is not None:
+            self.CACHE_EXPIRE = expire
+        self._lock = threading.RLock()
+        self._nodes = {}
+        self.stats = stats if stats is not None else CacheStats('path')
+        self.stats.size_function = self.approximate_size
+        self.clear()
+
+    def clear(self):
+        """Forget everything.
+        :return: None
+        """
+        with self._lock:
+            self.stats.evicted(len(self._nodes) - 1)
+            self._root = PathCacheNode('/', None)
+            self._nodes = {'/': self._root}
+
+    def approximate_size(self):
+        """
+        :return: Approximate number of bytes held by the cache.
+        """
+        with self._lock:
+            nodes = self._nodes.values()
+        size = sys.getsizeof(self._nodes)
+        for node in nodes:
+            size += sys.getsizeof(node) + sys.getsizeof(node.__dict__) + sys.getsizeof(node.path)
+            if node.children:
+                size += sys.getsizeof(node.children)
+            if node.data:
+                size += sys.getsizeof(node.data) + sum(sys.getsizeof(v) for v in node.data.itervalues())
+        return size
+
+    @staticmethod
+    def parent_path(path):
+        """
+        :param path: Id path string or Path.
+        :return: Id path string of the parent folder.
+        """
+        path = str(path).rstrip('/')
+        parent = path[:path.rfind('/')]
+        return parent if parent else '/'
+
+    @staticmethod
+    def child_path(path, item_id):
+        return '{}/{}'.format(str(path).rstrip('/'), item_id)
+
+    def _is_fresh(self, node):
+        if node.children is None or node.stale:
+            return False
+        if self.CACHE_EXPIRE is None:
+            return True
+        return (time.time() - node.listed_at) <= self.CACHE_EXPIRE
+
+    def _drop(self, node):
+        # remove node and everything below it from the path index
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if self._nodes.get(current.path) is current:
+                del self._nodes[current.path]
+                self.stats.evicted()
+            if current.children:
+                stack.extend(current.children.values())
+
+    def record_listing(self, path, items):
+        """Store the contents of a folder listing.
+
+        :param path:    Id path of the listed folder.
+        :param items:   List of item dictionaries from the listing.
+        :return: Trie node of the listed folder.
+        """
+        path = str(path)
+        with self._lock:
+            node = self._nodes.get(path)
+            if node is None:
+                node = PathCacheNode(path)
+                self._nodes[path] = node
+
+            old_children = node.children or {}
+            old_by_id = dict((child.data['id'], child) for child in old_children.itervalues())
+            children = {}
+            for item in items:
+                child = old_by_id.pop(item['id'], None)
+                if child is None:
+                    child = PathCacheNode(self.child_path(path, item['id']))
+                    self._nodes[child.path] = child
+                child.data = item
+                children[item['name']] = child
+
+            for removed in old_by_id.itervalues():
+                self._drop(removed)
+
+            node.children = children
+            node.listed_at = time.time()
+            node.stale = False
+            return node
+
+    def invalidate(self, path):
+        """Mark a folder's listing as out of date. Its children are kept in
+        the index until the folder is listed again.
+
+        :param path: Id path of the folder.
+        :return: None
+        """
+        with self._lock:
+            node = self._nodes.get(str(path))
+            if node is not None:
+                node.stale = True
+
+    def forget(self, path):
+        """Remove an item and everything below it. Used when an item is moved or deleted.
+
+        :param path: Id path of the item.
+        :return: None
+        """
+        with self._lock:
+            path = str(path)
+            node = self._nodes.get(path)
+            if node is None:
+                return
+            parent = self._nodes.get(self.parent_path(path))
+            if parent is not None and parent.children:
+                for name, child in parent.children.items():
+                    if child is node:
+                        del parent.children[name]
+            self._drop(node)
+
+    def resolve(self, names, list_folder):
+        """Walk the trie one name at a time, listing folders that are missing or stale.
+
+        :param names:       List of names from the root to the item.
+        :param list_folder: Function that takes an id path and returns the list of item dictionaries in that folder.
+        :return:            Tuple of the item dictionary and the id path of its parent folder. None if the path does not exist.
+        """
+        node = self._root
+        for name in names:
+            with self._lock:
+                fresh = self._is_fresh(node)
+                child = node.children.get(name) if fresh else None
+            if child is not None:
+                self.stats.hit()
+            else:
+                if node.data is not None and node.data.get('type') != 'folder':
+                    return None
+                # stale, never listed, or the name was created by another client
+                self.stats.miss()
+                if fresh:
+                    self.stats.stale()
+                start = time.time()
+                listing = list_folder(node.path)
+                self.stats.refreshed(time.time() - start)
+                node = self.record_listing(node.path, listing)
+                with self._lock:
+                    child = node.children.get(name)
+                if child is None:
+                    return None
+            parent = node
+            node = child
+
+        if node is self._root:
+            return None
+        return node.data, parent.path
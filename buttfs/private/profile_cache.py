@@ -0,0 +1,140 @@
+import sys
+import time
+import threading
+
+from cache_stats import CacheStats
+
+
+class ProfileCache(object):
+    """User profile and account header information shared by a session.
+
+    The profile is kept for CACHE_EXPIRE seconds. Concurrent requests for an expired
+    profile are coalesced into a single request. Storage information from the
+    X-BCS-Account-Storage-* headers is updated by every response, so it stays
+    current without fetching the profile again.
+    """
+    CACHE_EXPIRE = 60
+
+    def __init__(self, expire=None, stats=None):
+        if expire is not None:
+            self.CACHE_EXPIRE = expire
+        self.stats = stats if stats is not None else CacheStats('profile')
+        self.stats.size_function = self.approximate_size
+        self._lock = threading.Lock()
+        self._in_flight = None
+        # bumped by invalidate and clear, so a fetch started before them is not kept
+        self._generation = 0
+        self._profile = None
+        self._fetched_at = 0
+        self._header_information = {}
+
+    def get(self, fetch, max_age=None):
+        """Return the cached profile, fetching it if it has expired.
+
+        :param fetch:   Function that requests the profile.
+        :param max_age: Maximum age of the cached profile in seconds. Defaults to CACHE_EXPIRE.
+        :return:        Dictionary of profile information.
+        """
+        if max_age is None:
+            max_age = self.CACHE_EXPIRE
+        with self._lock:
+            profile = self._profile
+            if profile is not None and max_age is not None and time.time() - self._fetched_at <= max_age:
+                fetching = None
+            else:
+                fetching = self._in_flight
+                leader = fetching is None
+                if leader:
+                    fetching = self._in_flight = threading.Event()
+                    fetching.profile = None
+                    fetching.error = None
+                    generation = self._generation
+
+        if fetching is None:
+            self.stats.hit()
+            return profile
+
+        if not leader:
+            # coalesced into the request already in flight
+            fetching.wait()
+            if fetching.error is not None:
+                raise fetching.error
+            self.stats.hit()
+            return fetching.profile
+
+        self.stats.miss()
+        start = time.time()
+        try:
+            profile = fetch()
+        except Exception as e:
+            fetching.error = e
+            raise
+        else:
+            fetching.profile = profile
+            self.stats.refreshed(time.time() - start)
+            with self._lock:
+                if self._generation == generation:
+                    self._profile = profile
+                    self._fetched_at = time.time()
+            return profile
+        finally:
+            with self._lock:
+                if self._in_flight is fetching:
+                    self._in_flight = None
+            fetching.set()
+
+    def invalidate(self):
+        """Fetch the profile again on next use.
+        :return: None
+        """
+        with self._lock:
+            if self._profile is not None:
+                self.stats.evicted()
+            self._profile = None
+            self._invalidate_in_flight()
+
+    def clear(self):
+        """Forget the profile and header information, i.e. when changing users.
+        :return: None
+        """
+        with self._lock:
+            if self._profile is not None:
+                self.stats.evicted()
+            self._profile = None
+            self._header_information = {}
+            self._invalidate_in_flight()
+
+    def _invalidate_in_flight(self):
+        # the fetch in flight may have been answered before the change: it is not kept, and later
+        # calls do not wait for it
+        self._generation += 1
+        self._in_flight = None
+
+    def approximate_size(self):
+        """
+        :return: Approximate number of bytes held by the cache.
+        """
+        profile = self._profile
+        size = sys.getsizeof(self._header_information)
+        if profile:
+            size += sys.getsizeof(profile) + sum(sys.getsizeof(v) for v in profile.itervalues())
+        return size
+
+    def update_headers(self, header_information):
+        """Merge header information parsed from a response.
+        :param header_information: Dictionary in the format of ButtFSRESTAdapter.get_latest_header_info.
+        :return: None
+        """
+        if not header_information:
+            return
+        with self._lock:
+            merged = dict(self._header_information)
+            for key, values in header_information.iteritems():
+                merged[key] = dict(merged.get(key, {}), **values)
+            self._header_information = merged
+
+    def header_information(self):
+        """
+        :return: Latest header information seen by any request in the session.
+        """
+        return self._header_information
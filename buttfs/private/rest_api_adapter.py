@@ -2,24 +2,42 @@ import requests
 import datetime
 import base64
 import hmac
-import json
 import hashlib
 import threading
+import time
 from copy import deepcopy
 
-from utils import request_to_string, response_to_string, utf8_quote_plus, make_utf8
-from ..errors import error_from_response, session_not_linked_error, ButtFSError, missing_argument, invalid_argument
-from buttfs_paths import rest_endpoints, ExistValues, VersionConflictValue, RestoreValue
+from utils import RequestLog, utf8_quote_plus, make_utf8
+from json_stream import iter_response_items, STREAM_CHUNK_SIZE
+import codec
+from ..metrics import RequestMetrics, RequestRecord
+from ..tracing import Tracer, use_span, wrap
+from ..request_logging import RequestLogPolicy
+from ..budget import RequestBudget
+from ..bandwidth import BandwidthLimiter, process_limiter, UPLOAD, DOWNLOAD
+from ..content_index import ContentIndex
+from ..errors import error_from_response, session_not_linked_error, ButtFSError, AuthenticatedError, missing_argument, invalid_argument
+from buttfs_paths import rest_endpoints, ExistValues, VersionConflictValue, RestoreValue, TransferPriority
 from cached_object import CachedObject
+from path_cache import PathCache
+from profile_cache import ProfileCache
+from cache_stats import CacheStatsRegistry
 
 debug = False
 
 class ButtFSRESTAdapter(CachedObject):
-    def __init__(self, url_root, client_id, secret,  auth_token=''):
+    CACHE_NAME = 'link'
+
+    def __init__(self, url_root, client_id, secret,  auth_token='', shared_with=None):
         super(ButtFSRESTAdapter, self).__init__()
-        self.bc_conn = ButtFSConnection(url_root, client_id, secret,  auth_token)
+        self.bc_conn = ButtFSConnection(url_root, client_id, secret,  auth_token,
+                                        shared_with.bc_conn if shared_with is not None else None)
         self.linked = False
         self.debug_count = 0
+        self.cache_stats = CacheStatsRegistry()
+        self.path_cache = PathCache(stats=self.cache_stats.get('path'))
+        self.profile_cache = ProfileCache(stats=self.cache_stats.get('profile'))
+        self.bc_conn.profile_cache = self.profile_cache
 
     #a nop, the real work is done in _initialize_self
     def _refresh_request(self, debug=False):
@@ -50,10 +68,18 @@ class ButtFSRESTAdapter(CachedObject):
         refreshing their information as time goes on. However, we can change
         behavior in the future.
 
+        Caches are shared between the copies rather than copied.
+
         :returns:   A ButtFSRESTAdapter that is authenticated to the same account as self.
 
         """
-        return deepcopy(self)
+        memo = dict((id(shared), shared) for shared in self._shared_objects())
+        return deepcopy(self, memo)
+
+    def _shared_objects(self):
+        return [self.cache_stats, self.path_cache, self.profile_cache, self.bc_conn.http_session, self.bc_conn.metrics,
+                self.bc_conn.tracer, self.bc_conn.log_policy, self.bc_conn.budget, self.bc_conn.bandwidth,
+                self.bc_conn.authentication, self.bc_conn.content_index]
 
     def debug_requests(self, count):
         """Print information for future requests.
@@ -78,18 +104,73 @@ class ButtFSRESTAdapter(CachedObject):
 
         return self.bc_conn.last_request_log
 
-    def is_linked(self):
+    def is_linked(self, refresh=False):
         """Return if this ButtFSRESTAdapter can currently make requests.
-        Does not use up an API request.
+        The answer is cached: a token is trusted from when the server accepts it, or the session is resumed,
+        until a request is refused. Only then, or with refresh, is a ping sent.
+
+        :param refresh: If true, send a ping to check the token.
 
         :returns:       True if this is authenticated to the server. False otherwise.
 
         """
-        if self.bc_conn.auth_token != '':
-            self._prepare_to_read()
-
+        if self.bc_conn.auth_token == '':
+            return self.linked
+
+        stats = self._cache_stats()
+        if refresh or self.bc_conn.token_verified is False:
+            if stats:
+                stats.miss()
+            self._update_self()
+        else:
+            if stats:
+                stats.hit()
+            self.linked = True
         return self.linked
 
+    def set_reauthentication(self, username=None, password=None, get_token=None):
+        """Retry a request once when the server refuses its access token, after getting a new token.
+        Copies of this rest adapter share the new token, so it is only fetched once.
+        Call without arguments to stop retrying.
+
+        :param username:    Username to authenticate again with.
+        :param password:    Password to authenticate again with. Kept in memory.
+        :param get_token:   Function returning a new access token, used instead of a username and password.
+
+        :returns:   None
+        :raises MissingArgument: Only one of username and password.
+        """
+        if get_token is None and (username or password):
+            if not username:
+                raise missing_argument('username')
+            if not password:
+                raise missing_argument('password')
+
+            def get_token():
+                # a separate copy, so this copy keeps its caches and refused token until it retries
+                copy = self.get_copy()
+                copy._make_request('get oauth token', data={'username': username, 'password': password},
+                                   oauth_request=True)
+                return copy.bc_conn.auth_token
+
+        self.bc_conn.authentication.reauthenticate = get_token
+
+    def resume(self, auth_token):
+        """Use the access token of an earlier session without checking it.
+        The first request checks the token. is_linked does not ping until then.
+
+        :param auth_token:  Access token from an authenticated session.
+
+        :returns:           None
+
+        """
+        self.path_cache.clear()
+        self.profile_cache.clear()
+        self.bc_conn.auth_token = auth_token
+        self.bc_conn.token_verified = None
+        self.linked = True
+        self.last_update = time.time()
+
     def unlink(self):
         """Clear current authentication information associated with this ButtFSRESTAdapter
 
@@ -98,18 +179,21 @@ class ButtFSRESTAdapter(CachedObject):
         """
         self.bc_conn.auth_token = ''
         self.linked = False
+        self.path_cache.clear()
+        self.profile_cache.clear()
 
     def get_latest_header_info(self):
         """Return the latest version if the information encoded in response headers.
         Currently, this is some storage quota information (number of bytes stored, current limit).
         It's reflected in the Account object of the SDK.
+        Shared by all copies of this ButtFSRESTAdapter, so any request keeps it current.
 
         :returns:   Dictionary with information encoded in the headers.
 
         """
-        return self.bc_conn.header_information
+        return self.profile_cache.header_information()
 
-    def _make_request(self, request_name, path=None, data={}, params={}, headers={}, response_processor=None, files=None, oauth_request=False, background=False):
+    def _make_request(self, request_name, path=None, data={}, params={}, headers={}, response_processor=None, files=None, oauth_request=False, background=False, stream=False, transfer=None, priority=None):
         """Makes a request after merging standard request parameters with user-supplied data
 
         :param request_name:        Index into the rest_endpoints table in buttfs_paths.py.
@@ -121,6 +205,9 @@ class ButtFSRESTAdapter(CachedObject):
         :param files:               Files to post. Optional.
         :param oauth_request:       Flag to indicate if this is an 'oauth' request (does not follow strict oauth flow, see ButtFS docs). Optional.
         :param background:          Flag to indicate if this request should return before completing the entire body
+        :param stream:              Flag to return the unread requests.Response instead of the decoded body. Optional.
+        :param transfer:            bandwidth.UPLOAD to apply the upload limits to the request body, bandwidth.DOWNLOAD to apply the download limits to the response body. Optional.
+        :param priority:            TransferPriority of the transfer. Defaults to the priority set with the limits.
 
         :returns:   Dictionary of JSON request or string of response body. True or False for oauth_request.
         :raises ValueError:             request_name is not found in rest_endpoints.
@@ -152,9 +239,33 @@ class ButtFSRESTAdapter(CachedObject):
             self.debug_count -= 1
 
         if oauth_request:
-            return self.bc_conn.oauth_request(url, merged_data, merged_params, request_data['method'])
+            return self.bc_conn.oauth_request(url, merged_data, merged_params, request_data['method'], request_name)
         else:
-            return self.bc_conn.request(url, merged_data, merged_params, files, request_data['method'], response_processor, headers, background)
+            return self.bc_conn.request(url, merged_data, merged_params, files, request_data['method'], response_processor, headers, background, stream, request_name, transfer, priority)
+
+    def estimate_request(self, estimate, request_name, path=None, data={}, file_name=None, file_size=0):
+        """Add the request _make_request would send to a CostEstimate, without sending it.
+
+        :param estimate:        CostEstimate to add to.
+        :param request_name:    Index into the rest_endpoints table in buttfs_paths.py.
+        :param path:            Path in the ButtFS Filesystem. Optional.
+        :param data:            Post data in encoded in dictionary. Optional.
+        :param file_name:       Name of the uploaded file, for uploads.
+        :param file_size:       Size of the uploaded file, for uploads.
+
+        :returns:   estimate
+        """
+        request_data = rest_endpoints[request_name]
+        merged_data = dict(request_data['data'])
+        merged_data.update(data)
+        url = request_data['url']
+        if url.find('{path}') > 0:
+            url = url.format(path=str(path))
+        files = {'file': [file_name, '']} if file_name is not None else None
+
+        prepared = requests.Request(request_data['method'], 'https://{}{}'.format(self.bc_conn.url_root, url),
+                                    data=self.bc_conn._filter_arg_dictonary(merged_data), files=files).prepare()
+        return estimate.add(request_name, len(prepared.body or '') + file_size)
 
     def authenticate(self, username, password):
         """Authenticate to ButtFS using the provided user details.
@@ -171,6 +282,8 @@ class ButtFSRESTAdapter(CachedObject):
             'username':username,
             'password':password
         }
+        self.path_cache.clear()
+        self.profile_cache.clear()
         self._make_request('get oauth token', data=data, oauth_request=True)
 
     def ping(self):
@@ -210,6 +323,22 @@ class ButtFSRESTAdapter(CachedObject):
         """
         return self._make_request('get user profile')
 
+    def cached_user_profile(self, max_age=None, refresh=False):
+        """Returns the profile of the currently authenticated user from the session profile cache.
+        Concurrent requests for an expired profile share a single request.
+
+        :param max_age: Maximum age of a cached profile in seconds. Defaults to ProfileCache.CACHE_EXPIRE.
+        :param refresh: If true, always request a new profile.
+
+        :returns:   Dictionary encoding of the user profile information.
+        :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
+        :raises AuthenticatedError:     Based on ButtFS Error Code.
+
+        """
+        if refresh:
+            self.profile_cache.invalidate()
+        return self.profile_cache.get(self.user_profile, max_age)
+
     def change_user_profile(self, data):
         """Update the user profile.
         Currently mostly non-functional.
@@ -221,7 +350,9 @@ class ButtFSRESTAdapter(CachedObject):
         :raises AuthenticatedError:     Based on ButtFS Error Code.
 
         """
-        return self._make_request('change user profile', data=data)
+        result = self._make_request('change user profile', data=data)
+        self.profile_cache.invalidate()
+        return result
 
     def create_folder(self, path, name, exists=ExistValues.overwrite):
         """Create a folder.
@@ -241,7 +372,9 @@ class ButtFSRESTAdapter(CachedObject):
             'name':name,
             'exists':exists
         }
-        return self._make_request('create folder', path, data=data)
+        result = self._make_request('create folder', path, data=data)
+        self.path_cache.invalidate(path)
+        return result
 
     def delete_folder(self, path, commit=False, force=False):
         """Delete a folder.
@@ -262,7 +395,9 @@ class ButtFSRESTAdapter(CachedObject):
             'force':str(force),
         }
 
-        return self._make_request('delete folder', path, params=params)
+        result = self._make_request('delete folder', path, params=params)
+        self.path_cache.forget(path)
+        return result
 
     def delete_file(self, path, commit=False):
         """Delete a file.
@@ -281,7 +416,9 @@ class ButtFSRESTAdapter(CachedObject):
             'commit':str(commit),
         }
 
-        return self._make_request('delete file', path, params=params)
+        result = self._make_request('delete file', path, params=params)
+        self.path_cache.forget(path)
+        return result
 
     def _common_file_operation(self, verb, path, destination, destination_name, exists=None):
         data = {
@@ -294,7 +431,11 @@ class ButtFSRESTAdapter(CachedObject):
             else:
                 ExistValues.raise_exception(exists)
 
-        return self._make_request(verb, path, data=data)
+        result = self._make_request(verb, path, data=data)
+        if verb.startswith('move'):
+            self.path_cache.forget(path)
+        self.path_cache.invalidate(destination)
+        return result
 
     def move_file(self, path, destination, destination_name, exists=None):
         """Move a file to another location.
@@ -376,7 +517,10 @@ class ButtFSRESTAdapter(CachedObject):
         if 'version' not in data:
             raise missing_argument('data.version')
 
-        return self._make_request(verb, path, data=data)
+        result = self._make_request(verb, path, data=data)
+        if 'name' in data:
+            self.path_cache.invalidate(self.path_cache.parent_path(path))
+        return result
 
     def file_alter_meta(self, path, data, conflict=None):
         """Alter the meta data of a file.
@@ -440,7 +584,7 @@ class ButtFSRESTAdapter(CachedObject):
         """
         return self._make_request('get folder meta', path)
 
-    def upload(self, path, file, exists=None, reuse_fallback=None, reuse_attributes=None):
+    def upload(self, path, file, exists=None, reuse_fallback=None, reuse_attributes=None, priority=None):
         """Upload a file to Buttfs.
 
         REST Documentation: https://www.bitcasa.com/cloudfs-api-docs/api/Upload%20File.html
@@ -450,12 +594,16 @@ class ButtFSRESTAdapter(CachedObject):
         :param exists:              Determines behavior if a file of the same name exists. Default behavior is fail.
         :param reuse_fallback:      Not implemented.
         :param reuse_attributes:    Not implemented.
+        :param priority:            TransferPriority of the upload when bandwidth is limited. Defaults to the priority set with the limits.
 
         :returns:                       Dictionary of new file details.
         :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
         :raises AuthenticatedError:     Based on ButtFS Error Code.
+        :raises InvalidArgument:        priority is not a TransferPriority.
 
         """
+        if priority is not None and not TransferPriority.legal_value(priority):
+            TransferPriority.raise_exception(priority)
         data = {}
         if exists:
             data['exists'] = exists
@@ -467,9 +615,11 @@ class ButtFSRESTAdapter(CachedObject):
             #data['reuse-fallback'] = reuse_fallback
             #data['reuse-attributes'] = reuse_attributes
 
-        return self._make_request('upload file', path, data=data, files=file)
+        result = self._make_request('upload file', path, data=data, files=file, transfer=UPLOAD, priority=priority)
+        self.path_cache.invalidate(path)
+        return result
 
-    def download(self, path, save_data_function, range=None, background=False):
+    def download(self, path, save_data_function, range=None, background=False, priority=None):
         """Download a file.
         If background is set to true, the rest adapter will do its best to allow the download to finish. This means that __del__ will block more-or-less forever.
         See the finish_downloads method on session to deal with this.
@@ -480,19 +630,37 @@ class ButtFSRESTAdapter(CachedObject):
         :param save_data_function:  Function will be called with the response as an argument in order to process the requests' content. Used to save file in the background.
         :param range:               List or tuple with two values containing the range of the request. Second value may be an empty string, but must exist and not be none. Defaults to entire file.
         :param background:          If true, request will return immediately and save_data_function will run in a thread. Defaults to False.
+        :param priority:            TransferPriority of the download when bandwidth is limited. Defaults to the priority set with the limits.
 
         :returns:                       Empty string.
         :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
         :raises AuthenticatedError:     Based on ButtFS Error Code.
-        :raises InvalidArgument:        Based on ButtFS Error Code.
+        :raises InvalidArgument:        Based on ButtFS Error Code, or priority is not a TransferPriority.
 
         """
+        if priority is not None and not TransferPriority.legal_value(priority):
+            TransferPriority.raise_exception(priority)
         headers = {}
         if range:
             if not hasattr(range, '__iter__') or len(range) != 2:
                 raise invalid_argument('range argument', 'list type of length 2', range)
             headers['Range'] = 'bytes={}-{}'.format(range[0], range[1])
-        return self._make_request('download file', path, response_processor=save_data_function, headers=headers, background=background)
+        return self._make_request('download file', path, response_processor=save_data_function, headers=headers, background=background, transfer=DOWNLOAD, priority=priority)
+
+    def iter_folder(self, path, chunk_size=STREAM_CHUNK_SIZE):
+        """List the contents of the folder, parsing the response as it arrives.
+        Unlike list_folder, the listing is not recorded in the path cache.
+
+        REST Documentation: https://www.bitcasa.com/cloudfs-api-docs/api/List%20Folder.html
+
+        :param path:        Path to folder to list.
+        :param chunk_size:  Number of bytes read from the response at a time.
+
+        :returns:   Generator of dictionaries of the items in the folder.
+        :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
+        :raises AuthenticatedError:     Based on ButtFS Error Code.
+        """
+        return iter_response_items(self._make_request('list folder', path, stream=True), chunk_size)
 
     def list_trash(self, path):
         """List the contents of a folder in trash.
@@ -507,6 +675,20 @@ class ButtFSRESTAdapter(CachedObject):
         """
         return self._make_request('list trash', path)
 
+    def iter_trash(self, path, chunk_size=STREAM_CHUNK_SIZE):
+        """List the contents of a folder in trash, parsing the response as it arrives.
+
+        REST Documentation: https://www.bitcasa.com/cloudfs-api-docs/api/Browse%20Trash.html
+
+        :param path:        Path to folder to list.
+        :param chunk_size:  Number of bytes read from the response at a time.
+
+        :returns:   Generator of dictionaries of the items in the folder.
+        :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
+        :raises AuthenticatedError:     Based on ButtFS Error Code.
+        """
+        return iter_response_items(self._make_request('list trash', path, stream=True), chunk_size)
+
     def delete_trash_item(self, path):
         """Permanently remove an item from the users' filesystem.
 
@@ -521,6 +703,23 @@ class ButtFSRESTAdapter(CachedObject):
         """
         return self._make_request('delete trash item', path)
 
+    @staticmethod
+    def restore_data(restore_method, method_argument=None):
+        """
+        :return: Post data of a recover trash item request.
+        :raises InvalidArgument: restore_method is not a RestoreValue.
+        """
+        if not RestoreValue.legal_value(restore_method):
+            raise RestoreValue.raise_exception(restore_method)
+        data = {'restore': restore_method}
+        if restore_method == RestoreValue.rescue:
+            if hasattr(method_argument, 'path'):
+                method_argument = method_argument.path()
+            data['rescue-path'] = method_argument
+        elif restore_method == RestoreValue.recreate:
+            data['recreate-path'] = method_argument
+        return data
+
     def restore_trash_item(self, path, restore_method=RestoreValue.fail, method_argument=None):
         """Move an item from trash to the mail filesystem.
 
@@ -538,36 +737,68 @@ class ButtFSRESTAdapter(CachedObject):
         :raises SessionNotLinked:       ButtFSRESTAdapter is not authenticated.
         :raises AuthenticatedError:     Based on ButtFS Error Code.
         """
-        if not RestoreValue.legal_value(restore_method):
-            raise RestoreValue.raise_exception(restore_method)
-        data = {'restore': restore_method}
-        if restore_method == RestoreValue.rescue:
-            if hasattr(method_argument, 'path'):
-                method_argument = method_argument.path()
-            data['rescue-path'] = method_argument
-        elif restore_method == RestoreValue.recreate:
-            data['recreate-path'] = method_argument
-
-        return self._make_request('recover trash item', path, data=data)
+        data = self.restore_data(restore_method, method_argument)
+        result = self._make_request('recover trash item', path, data=data)
+        # the item can come back anywhere, including recreated folders
+        self.path_cache.clear()
+        return result
 
 
 class ButtFSConnection(object):
-    def __init__(self, url_root, client_id, secret,  auth_token=''):
+    def __init__(self, url_root, client_id, secret,  auth_token='', shared_with=None):
         super(ButtFSConnection, self).__init__()
         self.url_root = url_root.strip('/')
         self.client_id = client_id
         self.secret = secret
         self.auth_token = auth_token
+        self.authentication = _Authentication()
+        # uploaded content of this account, for uploads with dedupe
+        self.content_index = ContentIndex()
         self.header_information = {}
+        self.profile_cache = None
         self.debug_one_request = False
         self.threads = []
         self.threads_joined = False
-        self.last_request_log = ''
+        self._last_request_log = ''
+        self.budget = RequestBudget()
+        if shared_with is None:
+            # kept for the whole session so connections are reused, shared by every copy
+            self.http_session = requests.Session()
+            self.metrics = RequestMetrics()
+            self.tracer = Tracer()
+            self.log_policy = RequestLogPolicy()
+            self.bandwidth = BandwidthLimiter(parent=process_limiter)
+        else:
+            # another account, i.e. of a SessionPool: the transport is shared, the token, budget and cookies are not.
+            # The adapters hold the connection pools. Sharing their map also shares adapters mounted later
+            self.http_session = requests.Session()
+            self.http_session.adapters = shared_with.http_session.adapters
+            self.metrics = shared_with.metrics
+            self.tracer = shared_with.tracer
+            self.log_policy = shared_with.log_policy
+            self.bandwidth = shared_with.bandwidth
+
+    @property
+    def token_verified(self):
+        """True once the server accepted auth_token, False once it refused it, None before either."""
+        return self.authentication.verified.get(self.auth_token)
+
+    @token_verified.setter
+    def token_verified(self, verified):
+        if verified is None:
+            self.authentication.verified.pop(self.auth_token, None)
+        else:
+            self.authentication.verified[self.auth_token] = verified
 
     def __del__(self):
         if not self.threads_joined:
             self.join_threads()
 
+    @property
+    def last_request_log(self):
+        # formatted on first use, most requests are never logged
+        return str(self._last_request_log)
+
     def debug_next_request(self):
         self.debug_one_request = True
 
@@ -581,21 +812,40 @@ class ButtFSConnection(object):
 
         return all_threads_joined
 
-    def oauth_request(self, path, data={}, params={}, method='GET'):
-        result = self._request(path, method, data=data, params=params, oauth=True)
+    def oauth_request(self, path, data={}, params={}, method='GET', request_name=None):
+        result = self._request(path, method, data=data, params=params, oauth=True, request_name=request_name)
         if 'access_token' in result:
             self.auth_token = result['access_token']
+            self.token_verified = True
             return True
 
         return False
 
-    def request(self, path, data={}, params={}, files=None, method='GET', response_processor=None, headers={}, background=False):
-        default_headers = {'Authorization':'Bearer {}'.format(self.auth_token)}
+    def request(self, path, data={}, params={}, files=None, method='GET', response_processor=None, headers={}, background=False, stream=False, request_name=None, transfer=None, priority=None):
+        self.auth_token = self.authentication.current(self.auth_token)
         if self.auth_token != '':
-            default_headers.update(headers)
-            result = self._request(path, method, data, default_headers, params, files, response_processor, background=background)
-
-            if 'result' in result:
+            reauthenticate = self.authentication.reauthenticate
+            positions = _file_positions(files) if reauthenticate else None
+            try:
+                default_headers = {'Authorization':'Bearer {}'.format(self.auth_token)}
+                default_headers.update(headers)
+                result = self._request(path, method, data, default_headers, params, files, response_processor, background=background, stream=stream, request_name=request_name, transfer=transfer, priority=priority)
+            except AuthenticatedError as e:
+                if not reauthenticate or e.response.status_code != 401 or positions is False:
+                    raise
+                # once, with a new token
+                token = self.authentication.replace(self.auth_token)
+                if token == self.auth_token:
+                    raise
+                self.auth_token = token
+                _rewind_files(files, positions)
+                default_headers = {'Authorization':'Bearer {}'.format(self.auth_token)}
+                default_headers.update(headers)
+                result = self._request(path, method, data, default_headers, params, files, response_processor, background=background, stream=stream, request_name=request_name, transfer=transfer, priority=priority)
+
+            if stream:
+                return result
+            elif 'result' in result:
                 return result['result']
             else:
                 return result
@@ -682,6 +932,8 @@ class ButtFSConnection(object):
                     header_data[header_info[0]][header_info[2]] = None
 
         self.header_information = header_data
+        if self.profile_cache is not None:
+            self.profile_cache.update_headers(header_data)
 
     # must use string or unicode values, as urllib has
     # unpredictable behavior when dealing with objects
@@ -699,10 +951,63 @@ class ButtFSConnection(object):
 
         return filtered_dict
 
+    def _connection_pool(self, url):
+        # urllib3 pool the request will use, None if the transport does not pool connections
+        # or the request goes through a proxy
+        adapter = self.http_session.get_adapter(url)
+        if not isinstance(adapter, requests.adapters.HTTPAdapter):
+            return None
+        if self.http_session.proxies or (self.http_session.trust_env and requests.utils.get_environ_proxies(url)):
+            return None
+        return adapter.poolmanager.connection_from_url(url)
+
+    def _send(self, prepared_request, stream, measurement):
+        if measurement is None:
+            return self.http_session.send(prepared_request, stream=stream)
+
+        record = measurement.record
+        body = prepared_request.body
+        record.bytes_sent = int(prepared_request.headers.get('Content-Length') or
+                                (len(body) if isinstance(body, basestring) else 0))
+        pool = self._connection_pool(prepared_request.url)
+        opened = pool.num_connections if pool is not None else None
+        record.queue_wait = time.time() - measurement.started
+        try:
+            response = self.http_session.send(prepared_request, stream=stream)
+        except Exception as e:
+            measurement.finish(error=e)
+            raise
+        if pool is not None:
+            record.connection_reused = pool.num_connections == opened
+        record.status = response.status_code
+        record.time_to_first_byte = response.elapsed.total_seconds()
+        return response
+
+    @staticmethod
+    def _measured_processor(response_processor, measurement):
+        # background downloads are measured once the thread has read the body
+        def process(response):
+            error = None
+            try:
+                with use_span(measurement.span):
+                    response_processor(response)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                measurement.finish(getattr(response.raw, 'tell', lambda: 0)(), error)
+        return process
+
     # TODO: add streaming requests for downloads!
-    def _request(self, path, method, data={}, headers={}, params={}, files=None, response_processor=None, oauth=False, background=False):
+    def _request(self, path, method, data={}, headers={}, params={}, files=None, response_processor=None, oauth=False, background=False, stream=False, request_name=None, transfer=None, priority=None):
         single_debug = self.debug_one_request
         self.debug_one_request = False
+        self.budget.charge(request_name)
+
+        started = time.time()
+        measurement = None
+        if self.metrics.enabled or self.tracer.enabled:
+            measurement = _RequestMeasurement(self, request_name, method.upper(), path, started)
 
         data = self._filter_arg_dictonary(data)
         params = self._filter_arg_dictonary(params)
@@ -715,20 +1020,58 @@ class ButtFSConnection(object):
         base_request = requests.Request(method, url, headers, data=data, params=params, files=files)
         prepared_request = base_request.prepare()
 
-        response = requests.Session().send(prepared_request, stream=background)
-
-
-        self.last_request_log = 'Request:\n{}Response:\n{}'.format(request_to_string(prepared_request), response_to_string(response))
+        throttled = transfer is not None and self.bandwidth.limits(transfer)
+        body = prepared_request.body
+        if throttled and transfer == UPLOAD and body:
+            # only while sending, logs show the body itself
+            prepared_request.body = self.bandwidth.throttled_body(body, priority)
+        try:
+            # a limited download is read as it arrives, so it is sent as a stream
+            response = self._send(prepared_request, background or stream or (throttled and transfer == DOWNLOAD), measurement)
+        except Exception as e:
+            self.log_policy.log_exception(request_name, prepared_request, e, started)
+            raise
+        finally:
+            prepared_request.body = body
+        if throttled and transfer == DOWNLOAD:
+            self.bandwidth.throttle_response(response, priority)
+            if not (background or stream):
+                # read now, as it would have been without the limit
+                response.content
+        if not oauth:
+            # tokens are checked before anything else
+            self.token_verified = response.status_code != 401
+        streaming = (background or stream) and response.status_code == 200
+
+        # decode the body once and share it with the log and any error
+        is_json = 'application/json' in response.headers.get('Content-Type', '')
+        response_json = None
+        if response.status_code != 200:
+            response_json = codec.try_loads(response.content)
+        elif is_json and not stream:
+            response_json = codec.loads(response.content)
+
+        self._last_request_log = RequestLog(prepared_request, response, response_json,
+                                            include_body=not streaming or response_json is not None)
+        self.log_policy.log(request_name, prepared_request, response, response_json, started, streaming)
         if debug or single_debug:
             print self.last_request_log
 
-        if response.status_code == 200:
+        if response.status_code == 200 and stream:
+            self._save_x_headers(response.headers)
+            if measurement is not None:
+                measurement.record.streamed = True
+                measurement.finish(int(response.headers.get('Content-Length') or 0))
+            return response
+        elif response.status_code == 200:
             self._save_x_headers(response.headers)
 
             if response_processor:
+                if background and measurement is not None:
+                    response_processor = self._measured_processor(response_processor, measurement)
                 # clear out old threads if possible
                 if background:
-                    thread = threading.Thread(target=response_processor, args=(response,))
+                    thread = threading.Thread(target=wrap(response_processor), args=(response,))
                     # yolo!
                     thread.start()
                     self.threads.append(thread)
@@ -736,9 +1079,106 @@ class ButtFSConnection(object):
                 else:
                     response_processor(response)
 
-            if 'application/json' in response.headers['Content-Type']:
-                return json.loads(response.content)
+            if measurement is not None and not (background and response_processor):
+                received = getattr(response.raw, 'tell', lambda: 0)() if background else len(response.content)
+                measurement.finish(received)
+
+            if is_json:
+                return response_json
+            elif background:
+                # the body belongs to the thread streaming it
+                return ''
             else:
                 return response.content
         else:
-            raise error_from_response(prepared_request, response)
+            error = error_from_response(prepared_request, response, response_json)
+            if measurement is not None:
+                measurement.finish(len(response.content), error)
+            raise error
+
+
+class _Authentication(object):
+    # access tokens of a session, shared by every copy of its rest adapter
+    def __init__(self):
+        self._lock = threading.Lock()
+        # token: True once the server accepted it, False once it refused it
+        self.verified = {}
+        # refused token: token that replaced it
+        self.replacements = {}
+        # function returning a new token, None to not retry refused requests
+        self.reauthenticate = None
+
+    def current(self, token):
+        # a set of the tokens seen, so replacements that lead back to a token cannot loop
+        seen = set()
+        while token in self.replacements and token not in seen:
+            seen.add(token)
+            token = self.replacements[token]
+        return token
+
+    def replace(self, refused):
+        """
+        :return: Token to use instead of refused. Only the first copy to ask gets a new one.
+                 refused itself if no other token could be had.
+        """
+        with self._lock:
+            token = self.current(refused)
+            if token == refused:
+                token = self.reauthenticate()
+                # the refused token again, i.e. from a stale store, is not a replacement
+                if token == refused:
+                    return refused
+                self.replacements[refused] = token
+            return token
+
+
+def _file_positions(files):
+    # offsets to rewind uploads to before a retry, False if a file cannot be rewound
+    positions = {}
+    for key, value in (files or {}).iteritems():
+        fp = value[1] if isinstance(value, (list, tuple)) else value
+        if hasattr(fp, 'read'):
+            try:
+                positions[key] = fp.tell()
+            except (AttributeError, IOError):
+                return False
+    return positions
+
+
+def _rewind_files(files, positions):
+    for key, position in positions.iteritems():
+        value = files[key]
+        fp = value[1] if isinstance(value, (list, tuple)) else value
+        fp.seek(position)
+
+
+class _RequestMeasurement(object):
+    # timing of one request, reported to the metrics sinks and as a tracing span
+    def __init__(self, connection, request_name, method, path, started):
+        self.connection = connection
+        self.started = started
+        self.record = RequestRecord(request_name, method)
+        self.span = None
+        if connection.tracer.enabled:
+            self.span = connection.tracer.start_span('rest {}'.format(request_name or path), {
+                'buttfs.endpoint': request_name,
+                'http.method': method,
+                'http.target': path,
+            })
+
+    def finish(self, bytes_received=0, error=None):
+        record = self.record
+        record.total_time = time.time() - self.started
+        record.bytes_received = bytes_received
+        if error is not None:
+            record.error = type(error).__name__
+        if self.connection.metrics.enabled:
+            self.connection.metrics.emit(record)
+        if self.span is not None:
+            self.span.attributes.update({
+                'http.status_code': record.status,
+                'http.request_content_length': record.bytes_sent,
+                'http.response_content_length': bytes_received,
+                'buttfs.time_to_first_byte': record.time_to_first_byte,
+            })
+            self.span.end(error)
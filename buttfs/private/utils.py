@@ -1,6 +1,10 @@
+import os
+import re
 import urllib
 import pprint
-import json
+import fnmatch
+
+import codec
 
 def make_utf8(data_string):
     """Return utf8-encoded string
@@ -14,6 +18,38 @@ def make_utf8(data_string):
         return data_string.encode('utf8')
     return data_string
 
+def name_matcher(name=None, regex=None):
+    """Name filter shared by ItemTable and ItemIndex.
+
+    :param name:    Glob pattern matched against the whole name, i.e. '*.mov'.
+    :param regex:   Regular expression, or compiled pattern, searched for in the name.
+
+    :returns:       Function returning True for names that match every given pattern, None if none is given.
+
+    """
+    patterns = []
+    if name is not None:
+        patterns.append(re.compile(fnmatch.translate(name)).match)
+    if regex is not None:
+        patterns.append((re.compile(regex) if isinstance(regex, basestring) else regex).search)
+    if not patterns:
+        return None
+    return lambda item_name: all(pattern(item_name) is not None for pattern in patterns)
+
+def replace_file(source, target):
+    """Rename source over target.
+    Windows cannot rename over an existing file, so target is removed first there, and is briefly missing.
+
+    :param source:  Path of the new file.
+    :param target:  Path to move it to.
+
+    :returns:       None
+
+    """
+    if os.name != 'posix' and os.path.exists(target):
+        os.remove(target)
+    os.rename(source, target)
+
 def utf8_quote_plus(url, safe=''):
     """Return utf8-quoted string for query strings
 
@@ -81,10 +117,12 @@ def request_to_string(request):
         post_data=post_data,
     )
 
-def response_to_string(response):
+def response_to_string(response, response_json=None, include_body=True):
     """Return a string representation of Response object
 
-    :param response:    Requests.Response object to represent.
+    :param response:        Requests.Response object to represent.
+    :param response_json:   Already decoded body of the response. Decoded here if not given.
+    :param include_body:    If false, the body is not read. Used for streamed responses.
 
     :returns:           String representation of the provided response.
 
@@ -92,7 +130,8 @@ def response_to_string(response):
     code_and_message = ''
     content = ''
     try:
-        response_json = json.loads(response.content)
+        if response_json is None and include_body:
+            response_json = codec.loads(response.content)
 
         if 'error' in response_json and response_json['error'] and ('code' in response_json['error'] and 'message' in response_json['error']):
             code = int(response_json['error']['code'])
@@ -103,7 +142,9 @@ def response_to_string(response):
     except:
         pass
 
-    if len(content) == 0 and len(response.content) > 0:
+    if not include_body:
+        content = 'Body:\n<streamed>'
+    elif len(content) == 0 and len(response.content) > 0:
         content = 'Body:\n{}'.format(response.content)
 
 
@@ -113,3 +154,25 @@ def response_to_string(response):
         response_headers=dict_string(response.headers),
         content=content
     )
+
+class RequestLog(object):
+    """Request and response, formatted as a string only when it is first used."""
+    def __init__(self, request, response, response_json=None, include_body=True):
+        self.request = request
+        self.response = response
+        self.response_json = response_json
+        self.include_body = include_body
+        self._string = None
+
+    def __str__(self):
+        if self._string is None:
+            self._string = 'Request:\n{}Response:\n{}'.format(
+                request_to_string(self.request),
+                response_to_string(self.response, self.response_json, self.include_body))
+            # the log no longer needs to keep the response alive
+            self.request = self.response = self.response_json = None
+        return self._string
+
+    def __deepcopy__(self, memo):
+        # never changes once made, and copying it would copy the whole response for every item of a listing
+        return self
@@ -0,0 +1,47 @@
+import threading
+import Queue
+
+from ..tracing import wrap
+
+
+def run_concurrently(function, arguments, max_workers=8):
+    """Call function once per argument using at most max_workers threads.
+
+    :param function:    Function taking a single argument.
+    :param arguments:   List of arguments.
+    :param max_workers: Maximum number of threads to run at once.
+
+    :returns:   List of (argument, result, exception) tuples in the order of arguments.
+                exception is None when the call succeeded.
+    """
+    arguments = list(arguments)
+    results = [None] * len(arguments)
+    pending = Queue.Queue()
+    for index, argument in enumerate(arguments):
+        pending.put((index, argument))
+
+    def work():
+        while True:
+            try:
+                index, argument = pending.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                results[index] = (argument, function(argument), None)
+            except Exception as e:
+                results[index] = (argument, None, e)
+
+    # workers continue the caller's tracing span
+    work = wrap(work)
+    workers = [threading.Thread(target=work) for _ in range(max(1, min(max_workers, len(arguments))))]
+    if len(workers) == 1:
+        work()
+        return results
+
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    return results
@@ -0,0 +1,171 @@
+"""Cost of each SDK call and REST endpoint while a session is profiled.
+
+SessionProfiler is a tracing exporter: it adds up the spans of the public SDK calls and
+of the REST requests made under them. Times of calls include the calls they make, like
+cumulative times in cProfile. One operation can also be run under cProfile.
+"""
+import pstats
+import cProfile
+import StringIO
+import threading
+
+from errors import invalid_argument
+
+REST_PREFIX = 'rest '
+SORT_KEYS = ('wall_time', 'cpu_time', 'calls', 'requests', 'bytes_sent', 'bytes_received', 'errors')
+
+
+class _Totals(object):
+    __slots__ = ('calls', 'wall_time', 'cpu_time', 'requests', 'bytes_sent', 'bytes_received', 'errors')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def add_requests(self, other):
+        self.requests += other.requests
+        self.bytes_sent += other.bytes_sent
+        self.bytes_received += other.bytes_received
+
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+
+class SessionProfiler(object):
+    """Started by Session.profile. Use it as a context manager, or call stop when done.
+
+    :param tracer:          Tracer of the session.
+    :param cprofile:        Name of an operation to run under cProfile, i.e. 'Folder.upload'. Only calls on
+                            the thread that starts them are profiled, one at a time. Optional.
+    """
+    def __init__(self, tracer, cprofile=None):
+        self.tracer = tracer
+        self.cprofile_operation = cprofile
+        self._lock = threading.Lock()
+        self._operations = {}
+        self._endpoints = {}
+        # request totals of spans that have not ended yet, by span id
+        self._pending = {}
+        # names of ended operations with spans still open under them, for requests that end after them
+        self._ended = {}
+        # number of open spans under each span, by span id
+        self._open_children = {}
+        self._cprofile = cProfile.Profile() if cprofile else None
+        self._cprofile_span = None
+        self.running = False
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.tracer.add_exporter(self)
+        return self
+
+    def stop(self):
+        if self.running:
+            self.running = False
+            self.tracer.remove_exporter(self)
+        if self._cprofile_span is not None:
+            self._cprofile.disable()
+            self._cprofile_span = None
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    # tracing exporter
+
+    def start_span(self, span):
+        if span.parent_id is not None:
+            with self._lock:
+                self._open_children[span.parent_id] = self._open_children.get(span.parent_id, 0) + 1
+        if span.name == self.cprofile_operation and self._cprofile_span is None:
+            self._cprofile_span = span.span_id
+            self._cprofile.enable()
+
+    def export(self, span):
+        if span.span_id == self._cprofile_span:
+            self._cprofile.disable()
+            self._cprofile_span = None
+
+        with self._lock:
+            if span.name.startswith(REST_PREFIX):
+                name = span.attributes.get('buttfs.endpoint') or span.name[len(REST_PREFIX):]
+                totals = self._endpoints.setdefault(name, _Totals())
+                own = _Totals()
+                own.requests = 1
+                own.bytes_sent = span.attributes.get('http.request_content_length') or 0
+                own.bytes_received = span.attributes.get('http.response_content_length') or 0
+                totals.add_requests(own)
+            else:
+                totals = self._operations.setdefault(span.name, _Totals())
+                own = self._pending.pop(span.span_id, None) or _Totals()
+                totals.add_requests(own)
+                if self._open_children.get(span.span_id):
+                    self._ended[span.span_id] = span.name
+
+            totals.calls += 1
+            totals.wall_time += span.duration
+            totals.cpu_time += span.cpu_time
+            totals.errors += 1 if span.status == 'error' else 0
+
+            if span.parent_id in self._ended:
+                # a background request that outlived the call that started it
+                self._operations[self._ended[span.parent_id]].add_requests(own)
+            elif span.parent_id is not None:
+                self._pending.setdefault(span.parent_id, _Totals()).add_requests(own)
+
+            if span.parent_id is not None:
+                left = self._open_children.pop(span.parent_id, 0) - 1
+                if left > 0:
+                    self._open_children[span.parent_id] = left
+                else:
+                    self._ended.pop(span.parent_id, None)
+
+    # results
+
+    def stats(self):
+        """
+        :return: Dictionary with 'operations' and 'endpoints', each a dictionary of name to calls, wall_time,
+                 cpu_time, requests, bytes_sent, bytes_received and errors. Times are in seconds.
+        """
+        with self._lock:
+            return {
+                'operations': dict((name, totals.as_dict()) for name, totals in self._operations.iteritems()),
+                'endpoints': dict((name, totals.as_dict()) for name, totals in self._endpoints.iteritems()),
+            }
+
+    def report(self, sort='wall_time', limit=None, cprofile_lines=25):
+        """
+        :param sort:            Column to sort by, descending: wall_time, cpu_time, calls, requests,
+                                bytes_sent, bytes_received or errors.
+        :param limit:           Maximum rows per table. Defaults to all of them.
+        :param cprofile_lines:  Number of functions from cProfile to include, sorted by cumulative time.
+        :return:                String with a table of operations, a table of endpoints and the cProfile output.
+        :raises InvalidArgument: Unknown sort column.
+        """
+        if sort not in SORT_KEYS:
+            raise invalid_argument('sort', 'one of {}'.format(', '.join(SORT_KEYS)), sort)
+        stats = self.stats()
+        sections = []
+        for title, rows in (('SDK calls', stats['operations']), ('REST endpoints', stats['endpoints'])):
+            lines = ['{:<28} {:>7} {:>10} {:>10} {:>9} {:>12} {:>12} {:>7}'.format(
+                title, 'calls', 'wall s', 'cpu s', 'requests', 'sent', 'received', 'errors')]
+            ordered = sorted(rows.iteritems(), key=lambda row: (-row[1][sort], row[0]))
+            for name, row in ordered[:limit]:
+                lines.append('{:<28} {:>7} {:>10.4f} {:>10.4f} {:>9} {:>12} {:>12} {:>7}'.format(
+                    name, row['calls'], row['wall_time'], row['cpu_time'], row['requests'],
+                    row['bytes_sent'], row['bytes_received'], row['errors']))
+            sections.append('\n'.join(lines))
+
+        if self._cprofile is not None and cprofile_lines:
+            output = StringIO.StringIO()
+            try:
+                pstats.Stats(self._cprofile, stream=output).sort_stats('cumulative').print_stats(cprofile_lines)
+            except TypeError:
+                # no calls were profiled
+                output.write('No calls to {} were profiled.\n'.format(self.cprofile_operation))
+            sections.append('cProfile of {}:\n{}'.format(self.cprofile_operation, output.getvalue().strip('\n')))
+        return '\n\n'.join(sections)
@@ -0,0 +1,105 @@
+from path import Path
+from private.filesystem_common import create_items_from_json
+
+# field order of ItemRecord values, shared by every record
+FIELDS = ('id', 'name', 'type', 'version', 'size', 'extension', 'mime', 'date_created',
+          'date_meta_last_modified', 'date_content_last_modified', 'is_mirrored', 'application_data')
+_FIELD_INDEX = dict((field, index) for index, field in enumerate(FIELDS))
+
+
+class ItemRecord(object):
+    """Compact, read-only entry from a listing.
+
+    Fields are stored in a tuple in FIELDS order, the parent path is shared with the other
+    records of the listing and the rest interface is not copied. Reading the fields
+    listed in FIELDS never promotes a record.
+
+    Anything else, including setting a field or calling a File/Folder method such as save,
+    delete, move_to or download, promotes the record to a full File or Folder once and
+    forwards to it. promote() returns that item.
+    """
+    __slots__ = ('_values', '_extra', '_parent', '_in_trash', '_rest_interface', '_item')
+
+    def __init__(self, rest_interface, data, parent_path, in_trash=False):
+        if 'meta' in data:
+            data = data['meta']
+        object.__setattr__(self, '_values', tuple(data.get(field) for field in FIELDS))
+        extra = None
+        if len(data) > len(FIELDS) or any(key not in _FIELD_INDEX for key in data):
+            extra = dict((key, value) for key, value in data.iteritems() if key not in _FIELD_INDEX)
+        object.__setattr__(self, '_extra', extra)
+        object.__setattr__(self, '_parent', parent_path if parent_path is not None else Path.root())
+        object.__setattr__(self, '_in_trash', in_trash)
+        object.__setattr__(self, '_rest_interface', rest_interface)
+        object.__setattr__(self, '_item', None)
+
+    @property
+    def data(self):
+        """
+        :return: Dictionary in the same format as Item.data. Changes to it are not saved.
+        """
+        if self._item is not None:
+            return self._item.data
+        data = dict((field, value) for field, value in zip(FIELDS, self._values)
+                    if value is not None or field in ('id', 'name', 'type'))
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    @property
+    def in_trash(self):
+        if self._item is not None:
+            return self._item.in_trash
+        return self._in_trash
+
+    def path(self):
+        if self._item is not None:
+            return self._item.path()
+        return self._parent.child(self._values[0])
+
+    def url(self):
+        return str(self.path())
+
+    def is_promoted(self):
+        """
+        :return: True if a full item has been created for this record.
+        """
+        return self._item is not None
+
+    def promote(self):
+        """
+        :return: File or Folder for this record. Created on first call, the same object afterwards.
+        """
+        if self._item is None:
+            parent = self._parent if str(self._parent) != '/' else None
+            item = create_items_from_json(self._rest_interface, self.data, parent, self._in_trash)[0]
+            object.__setattr__(self, '_item', item)
+        return self._item
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        index = _FIELD_INDEX.get(name)
+        if index is not None and self._item is None:
+            return self._values[index]
+        return getattr(self.promote(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.promote(), name, value)
+
+    def __eq__(self, other):
+        if hasattr(other, 'data') and 'id' in getattr(other, 'data'):
+            return self.id == getattr(other, 'data')['id']
+        return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __str__(self):
+        if self._item is not None:
+            return str(self._item)
+        trash = 'trash' if self._in_trash else ''
+        return 'Record[{}{}]:{}({})'.format(trash, self.url(), self.name.encode('utf-8'), self.type)
+
+    def __repr__(self):
+        return str(self)
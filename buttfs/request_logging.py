@@ -0,0 +1,195 @@
+"""Request logging through the buttfs.requests logger.
+
+Every request can be logged with the standard logging module. Messages are only
+formatted when a handler emits them, and nothing is built for requests whose level
+is disabled. Each record carries a buttfs attribute with the endpoint, method,
+status, error code, duration and sizes for structured handlers.
+
+Authorization headers, cookies, passwords, secrets and tokens are redacted, and
+bodies are left out or truncated. debug=True arguments still print the full,
+unredacted request and response.
+"""
+import time
+import logging
+import urlparse
+import threading
+import itertools
+
+from private import codec
+from errors import invalid_argument
+
+LOGGER_NAME = 'buttfs.requests'
+logger = logging.getLogger(LOGGER_NAME)
+# applications without logging configured should not see warnings about missing handlers
+logging.getLogger('buttfs').addHandler(logging.NullHandler())
+
+REDACTED = '<redacted>'
+REDACTED_HEADERS = ('authorization', 'cookie', 'set-cookie')
+REDACTED_FIELDS = ('password', 'secret', 'client_secret', 'access_token', 'refresh_token', 'token')
+SETTINGS = ('level', 'error_level', 'endpoint_levels', 'sample_rate', 'include_headers', 'max_body',
+            'redact_headers', 'redact_fields')
+
+
+class RequestLogPolicy(object):
+    """How requests are logged. Shared by every copy of a session's rest adapter.
+
+    level:              Level of successful requests.
+    error_level:        Level of failed requests. Failures are never sampled out.
+    endpoint_levels:    Dictionary of endpoint name from rest_endpoints to the level of its successful requests.
+    sample_rate:        Log 1 in sample_rate successful requests.
+    include_headers:    If true, request and response headers are part of the message.
+    max_body:           Characters of each body to include. 0 for none, None for all of it.
+    redact_headers:     Names of headers whose values are replaced. Not case sensitive.
+    redact_fields:      Names of form and JSON fields whose values are replaced, at any depth.
+    """
+    def __init__(self, level=logging.DEBUG, error_level=logging.WARNING, endpoint_levels=None, sample_rate=1,
+                 include_headers=False, max_body=0, redact_headers=REDACTED_HEADERS, redact_fields=REDACTED_FIELDS):
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.configure(level=level, error_level=error_level, endpoint_levels=endpoint_levels or {},
+                       sample_rate=sample_rate, include_headers=include_headers, max_body=max_body,
+                       redact_headers=redact_headers, redact_fields=redact_fields)
+
+    def configure(self, **settings):
+        """Change some of the settings, i.e. configure(sample_rate=100). Takes the same arguments as the constructor.
+
+        :raises InvalidArgument: Unknown setting.
+        """
+        with self._lock:
+            for name, value in settings.iteritems():
+                if name not in SETTINGS:
+                    raise invalid_argument(name, 'one of {}'.format(', '.join(SETTINGS)), value)
+                if name == 'endpoint_levels':
+                    value = dict(value)
+                elif name == 'sample_rate':
+                    value = max(1, int(value))
+                elif name in ('redact_headers', 'redact_fields'):
+                    value = frozenset(v.lower() for v in value)
+                setattr(self, name, value)
+
+    def level_for(self, endpoint, failed):
+        """
+        :return: Level to log the request at, None to skip it.
+        """
+        if failed:
+            return self.error_level if logger.isEnabledFor(self.error_level) else None
+        level = self.endpoint_levels.get(endpoint, self.level)
+        if not logger.isEnabledFor(level):
+            return None
+        if self.sample_rate > 1 and next(self._counter) % self.sample_rate:
+            return None
+        return level
+
+    def log(self, endpoint, request, response, response_json, started, streamed=False):
+        """Log a request that got a response."""
+        failed = response.status_code != 200
+        level = self.level_for(endpoint, failed)
+        if level is None:
+            return
+        if streamed:
+            received = int(response.headers.get('Content-Length') or 0)
+        else:
+            received = len(response.content)
+        error_code = None
+        if failed and isinstance(response_json, dict) and isinstance(response_json.get('error'), dict):
+            error_code = response_json['error'].get('code')
+        fields = _fields(endpoint, request, started, response.status_code, error_code, received)
+        logger.log(level, '%s', _RequestMessage(self, fields, request, response, response_json, streamed),
+                   extra={'buttfs': fields})
+
+    def log_exception(self, endpoint, request, error, started):
+        """Log a request that failed without a response."""
+        level = self.level_for(endpoint, True)
+        if level is None:
+            return
+        fields = _fields(endpoint, request, started, None, None, 0)
+        fields['exception'] = type(error).__name__
+        logger.log(level, '%s', _RequestMessage(self, fields, request, error=error), extra={'buttfs': fields})
+
+    def redact_headers_of(self, headers):
+        return dict((key, REDACTED if key.lower() in self.redact_headers else value)
+                    for key, value in headers.iteritems())
+
+    def redact_value(self, value):
+        if isinstance(value, dict):
+            return dict((key, REDACTED if key.lower() in self.redact_fields else self.redact_value(item))
+                        for key, item in value.iteritems())
+        if isinstance(value, list):
+            return [self.redact_value(item) for item in value]
+        return value
+
+    def truncate(self, text):
+        if self.max_body is None or len(text) <= self.max_body:
+            return text
+        return '{}... ({} more characters)'.format(text[:self.max_body], len(text) - self.max_body)
+
+
+def _fields(endpoint, request, started, status, error_code, received):
+    body = request.body
+    return {
+        'endpoint': endpoint,
+        'method': request.method,
+        'path': urlparse.urlsplit(request.url).path,
+        'status': status,
+        'error_code': error_code,
+        'duration': time.time() - started,
+        'bytes_sent': int(request.headers.get('Content-Length') or (len(body) if isinstance(body, basestring) else 0)),
+        'bytes_received': received,
+    }
+
+
+class _RequestMessage(object):
+    # formatted only if a handler emits the record
+    def __init__(self, policy, fields, request, response=None, response_json=None, streamed=False, error=None):
+        self.policy = policy
+        self.fields = fields
+        self.request = request
+        self.response = response
+        self.response_json = response_json
+        self.streamed = streamed
+        self.error = error
+
+    def __str__(self):
+        fields = self.fields
+        if self.error is not None:
+            outcome = '{}: {}'.format(type(self.error).__name__, self.error)
+        else:
+            outcome = str(fields['status'])
+            if fields['error_code'] is not None:
+                outcome += ' (error {})'.format(fields['error_code'])
+        lines = ['{} {} {} -> {} in {:.1f}ms, {} bytes sent, {} received'.format(
+            fields['method'], fields['endpoint'] or '', fields['path'], outcome, fields['duration'] * 1000,
+            fields['bytes_sent'], fields['bytes_received'])]
+
+        policy = self.policy
+        if policy.include_headers:
+            lines.append('request headers: {}'.format(policy.redact_headers_of(self.request.headers)))
+            if self.response is not None:
+                lines.append('response headers: {}'.format(policy.redact_headers_of(self.response.headers)))
+        if policy.max_body != 0:
+            lines.append('request body: {}'.format(policy.truncate(self._request_body())))
+            if self.response is not None:
+                lines.append('response body: {}'.format(policy.truncate(self._response_body())))
+        return '\n'.join(lines)
+
+    def _request_body(self):
+        body = self.request.body
+        if not body:
+            return ''
+        if not isinstance(body, basestring):
+            return '<streamed>'
+        if self.request.headers.get('Content-Type', '').startswith('multipart/form-data'):
+            return '<{} bytes of multipart form data>'.format(len(body))
+        fields = urlparse.parse_qsl(body, keep_blank_values=True)
+        return '&'.join('{}={}'.format(key, REDACTED if key.lower() in self.policy.redact_fields else value)
+                        for key, value in fields)
+
+    def _response_body(self):
+        if self.streamed:
+            return '<streamed>'
+        if self.response_json is not None:
+            return codec.dumps(self.policy.redact_value(self.response_json))
+        if 'application/json' not in self.response.headers.get('Content-Type', ''):
+            return '<{} bytes of {}>'.format(len(self.response.content),
+                                             self.response.headers.get('Content-Type', 'data'))
+        return self.response.content
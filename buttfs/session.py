@@ -3,24 +3,84 @@ from private.rest_api_adapter import ButtFSRESTAdapter
 from user import User
 from account import Account
 from filesystem import Filesystem
-from errors import session_not_linked_error
+from errors import session_not_linked_error, invalid_argument
+from tracing import traced
+from profiler import SessionProfiler
+from token_store import TokenStore, FIELDS
+from private.buttfs_paths import OverBudgetValue, TransferPriority
 
 class Session(object):
-    def __init__(self, endpoint, client_id, client_secret):
-        self.rest_interface = ButtFSRESTAdapter(endpoint, client_id, client_secret)
+    def __init__(self, endpoint, client_id, client_secret, shared_with=None):
+        """
+        :param shared_with: Session to share connections, metrics, tracing, request logging and bandwidth limits
+                            with, i.e. in a SessionPool. Credentials, caches and the request budget are not shared.
+        """
+        self.rest_interface = ButtFSRESTAdapter(endpoint, client_id, client_secret,
+                                                shared_with=shared_with.rest_interface if shared_with else None)
         self.endpoint = endpoint
         self.client_id = client_id
         self.client_secret = client_secret
 
+    @classmethod
+    def resume(cls, credentials, client_secret=None):
+        """Continue a session from export_credentials or TokenStore.load without authenticating.
+        Nothing is sent: the token is checked by the first request, and is_linked does not ping before it.
+        :param credentials:     Dictionary with endpoint, client_id and auth_token.
+        :param client_secret:   Secret of the client. Only needed to authenticate again.
+        :return:                Linked Session.
+        :raises InvalidArgument: credentials is missing a field.
+        """
+        if not credentials or not all(credentials.get(field) for field in FIELDS):
+            raise invalid_argument('credentials', 'dictionary with {}'.format(', '.join(FIELDS)), credentials)
+        session = cls(credentials['endpoint'], credentials['client_id'], client_secret)
+        session.rest_interface.resume(credentials['auth_token'])
+        return session
+
+    def export_credentials(self):
+        """Credentials to continue this session in another process with Session.resume.
+        Keep them secret, they give access to the account until the token expires.
+        :return:                    Dictionary with endpoint, client_id and auth_token.
+        :raises SessionNotLinked:   Session has no access token.
+        """
+        bc_conn = self.rest_interface.bc_conn
+        # the token that replaced it, if it was refused and the session authenticated again
+        auth_token = bc_conn.authentication.current(bc_conn.auth_token)
+        if not auth_token:
+            raise session_not_linked_error()
+        return {'endpoint': self.endpoint, 'client_id': self.client_id, 'auth_token': auth_token}
+
+    def save_credentials(self, store=None, name=None):
+        """Save export_credentials to a token store.
+        :param store:   TokenStore. Defaults to the one in ~/.buttfs/tokens.json.
+        :param name:    Name to save them under. Defaults to client id and endpoint.
+        :return:        Name they were saved under, for TokenStore.load.
+        :raises SessionNotLinked:   Session has no access token.
+        :raises InsecureTokenStore: The store can be read by other users.
+        """
+        return (store or TokenStore()).save(self.export_credentials(), name)
+
     # are we associated with an account?
-    def is_linked(self, debug=False):
+    def is_linked(self, debug=False, refresh=False):
         """ Can this session make requests?
+        The token is trusted until a request is refused, so this only pings after that, or with refresh.
         :param debug:   If true, will print the the request and response to stdout.
+        :param refresh: If true, ping the server to check the token.
         :return:        True if this session is currently authenticated, false otherwise.
         """
         if debug:
             self.rest_interface.debug_requests(1)
-        return self.rest_interface.is_linked()
+        return self.rest_interface.is_linked(refresh)
+
+    def set_reauthentication(self, username=None, password=None, get_token=None):
+        """ Authenticate again when the server refuses the access token, i.e. after it expires, and retry the
+        request once. The password is kept in memory. Call without arguments to stop.
+        :param username:    Username of the user.
+        :param password:    Password of the user.
+        :param get_token:   Function returning a new access token. Used instead of username and password.
+        :return:            None
+        :raises MissingArgument: Only one of username and password.
+        """
+        self.rest_interface.set_reauthentication(username, password, get_token)
 
     # set any account credentials to nil
     def unlink(self):
@@ -30,6 +90,7 @@ class Session(object):
         self.rest_interface.unlink()
 
     # link this session to an account
+    @traced('Session.authenticate')
     def authenticate(self, username, password, debug=False):
         """ Attempt to log into the given users' filesystem.
         :param username:    Username of the user.
@@ -41,25 +102,35 @@ class Session(object):
             self.rest_interface.debug_requests(1)
         return self.rest_interface.authenticate(username, password)
 
-    def get_user(self, debug=False):
+    @traced('Session.get_user')
+    def get_user(self, debug=False, max_age=None):
         """Get an object describing the current user.
+        The profile is cached by the session and shared with get_account.
         :param debug:   If true, will print the the request and response to stdout.
+        :param max_age: Maximum age of a cached profile in seconds. Defaults to ProfileCache.CACHE_EXPIRE.
         :return:        User object representing the current user.
         """
         if debug:
             self.rest_interface.debug_requests(1)
 
         return User(self.rest_interface.get_copy(),
-                    self.rest_interface.user_profile())
+                    self.rest_interface.cached_user_profile(max_age))
 
 
-    def get_account(self, debug=False):
+    @traced('Session.get_account')
+    def get_account(self, debug=False, max_age=None):
         """Get an object describing the current users account.
+        The profile is cached by the session and shared with get_user. Storage usage and limit
+        are updated from the headers of every response, so they stay current without a request.
         :param debug:   If true, will print the the request and response to stdout.
+        :param max_age: Maximum age of a cached profile in seconds. Defaults to ProfileCache.CACHE_EXPIRE.
         :return:        Account object representing the current user account.
         """
+        if debug:
+            self.rest_interface.debug_requests(1)
+
         return Account(self.rest_interface.get_copy(),
-                       self.rest_interface.user_profile())
+                       self.rest_interface.cached_user_profile(max_age))
 
 
     def get_filesystem(self):
@@ -67,3 +138,129 @@ class Session(object):
         :return: Filesystem object linked to this session.
         """
         return Filesystem(self.rest_interface.get_copy())
+
+    def cache_stats(self):
+        """Counters for every cache used by this session: hits, misses, stale serves, evictions,
+        approximate bytes held and refresh latency. Items, the user and the account only count their refreshes.
+        :return: Dictionary of cache name to a dictionary of counters.
+        """
+        return self.rest_interface.cache_stats.snapshot()
+
+    def set_cache_stats_sink(self, sink):
+        """Receive cache events as they happen.
+        :param sink:    Function called as sink(cache_name, event, value), where event is one of 'hit', 'miss',
+                        'stale', 'eviction' or 'refresh'. Value is a count, or seconds for 'refresh'. None to disable.
+        :return:        None
+        """
+        self.rest_interface.cache_stats.sink = sink
+
+    def add_metrics_sink(self, sink):
+        """Receive the timing and size of every request made by this session.
+        :param sink:    HistogramSink, PrometheusSink, CallbackSink or a function called with a RequestRecord
+                        once each request is complete. Called on the thread that made the request.
+        :return:        sink
+        """
+        self.rest_interface.bc_conn.metrics.add_sink(sink)
+        return sink
+
+    def remove_metrics_sink(self, sink):
+        """
+        :param sink:    Sink added with add_metrics_sink.
+        :return:        None
+        """
+        self.rest_interface.bc_conn.metrics.remove_sink(sink)
+
+    def add_span_exporter(self, exporter):
+        """Trace the operations of this session. Each high-level operation and REST request becomes a span,
+        nested under the span that was current when it started.
+        :param exporter:    SpanCollector, or a function called with each Span as it ends.
+        :return:            exporter
+        """
+        self.rest_interface.bc_conn.tracer.add_exporter(exporter)
+        return exporter
+
+    def remove_span_exporter(self, exporter):
+        """
+        :param exporter:    Exporter added with add_span_exporter.
+        :return:            None
+        """
+        self.rest_interface.bc_conn.tracer.remove_exporter(exporter)
+
+    def configure_request_logging(self, **settings):
+        """Change how requests are logged to the buttfs.requests logger, i.e. configure_request_logging(sample_rate=100).
+        Levels, sampling, truncation and redaction are described in RequestLogPolicy.
+        :return:                    None
+        :raises InvalidArgument:    Unknown setting.
+        """
+        self.rest_interface.bc_conn.log_policy.configure(**settings)
+
+    def profile(self, cprofile=None):
+        """Start adding up the wall time, CPU time, requests and bytes of each SDK call and REST endpoint.
+        Use the result as a context manager, or call its stop method, then its report method:
+
+            with session.profile(cprofile='Folder.upload') as profiler:
+                ...
+            print profiler.report()
+
+        :param cprofile:    Name of an SDK call to also run under cProfile, i.e. 'Folder.upload'. Optional.
+        :return:            Running SessionProfiler.
+        """
+        return SessionProfiler(self.rest_interface.bc_conn.tracer, cprofile).start()
+
+    def request_counts(self):
+        """Requests made by this session since it was created or the counts were reset.
+        :return: Dictionary of endpoint name from rest_endpoints to number of requests.
+        """
+        return self.rest_interface.bc_conn.budget.snapshot()
+
+    def set_request_budget(self, limit=None, endpoint_limits=None, over_budget=OverBudgetValue.fail):
+        """Limit the requests this session can make, counting from the requests already made.
+        Dry runs of bulk operations return a CostEstimate that get_request_budget().allows can check.
+        :param limit:           Maximum number of requests in total. None for no limit.
+        :param endpoint_limits: Dictionary of endpoint name to maximum number of requests. Optional.
+        :param over_budget:     OverBudgetValue.fail to raise RequestBudgetExceeded instead of sending a request past
+                                a limit, OverBudgetValue.warn to send it and issue a RequestBudgetWarning.
+        :return:                None
+        :raises InvalidArgument: over_budget is not an OverBudgetValue.
+        """
+        self.rest_interface.bc_conn.budget.configure(limit, endpoint_limits, over_budget)
+
+    def get_request_budget(self):
+        """
+        :return: RequestBudget with the counts and limits of this session.
+        """
+        return self.rest_interface.bc_conn.budget
+
+    def set_bandwidth_limits(self, upload=None, download=None, burst=None, priority=TransferPriority.normal):
+        """Limit the rate of uploads and downloads of this session. Transfers of every session are also limited
+        by bandwidth.set_process_bandwidth_limits.
+        :param upload:      Bytes per second for uploads. None for no limit.
+        :param download:    Bytes per second for downloads. None for no limit.
+        :param burst:       Bytes a transfer can take at once. Defaults to a tenth of a second of the rate.
+        :param priority:    TransferPriority of transfers that do not set one. Waiting transfers of higher priority
+                            go first.
+        :return:            None
+        :raises InvalidArgument: priority is not a TransferPriority.
+        """
+        self.rest_interface.bc_conn.bandwidth.configure(upload, download, burst, priority)
+
+    def get_bandwidth_limiter(self):
+        """
+        :return: BandwidthLimiter with the limits and transfer totals of this session.
+        """
+        return self.rest_interface.bc_conn.bandwidth
+
+    def keep_content_index(self, path):
+        """Keep the index of content uploaded with dedupe in a file, so later sessions of the account copy it too.
+        :param path:    File to keep the index in. Files indexed there are added to the ones this session indexed.
+        :return:        ContentIndex of this session.
+        """
+        index = self.get_content_index()
+        index.open(path)
+        return index
+
+    def get_content_index(self):
+        """
+        :return: ContentIndex of the files uploaded with dedupe by this session.
+        """
+        return self.rest_interface.bc_conn.content_index
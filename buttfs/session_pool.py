@@ -0,0 +1,173 @@
+"""Sessions of many accounts of the same client.
+
+A service acting for many users keeps one Session per user in a SessionPool instead
+of creating one per request. Pooled sessions share the HTTP connection pool, request
+metrics, tracing, request logging and bandwidth limits of the pool, while each keeps
+its own access token, cookies, caches and request budget. Once the pool is full, or a session
+has been idle too long, the least recently used sessions are dropped.
+"""
+import time
+import threading
+import collections
+
+from session import Session
+from token_store import default_name
+from errors import invalid_argument, missing_argument
+from private.buttfs_paths import TransferPriority
+
+DEFAULT_MAX_SESSIONS = 1000
+
+
+class SessionPool(object):
+    """Linked sessions by key, i.e. the id of the user a service acts for.
+
+    :param endpoint:        Endpoint of every session.
+    :param client_id:       Client id of every session.
+    :param client_secret:   Client secret, needed to authenticate with a username and password.
+    :param max_sessions:    Most sessions kept. Adding one more drops the least recently used.
+    :param idle_timeout:    Seconds a session is kept without being used. None to keep it until the pool is full.
+    """
+    def __init__(self, endpoint, client_id, client_secret=None, max_sessions=DEFAULT_MAX_SESSIONS, idle_timeout=None):
+        if max_sessions < 1:
+            raise invalid_argument('max_sessions', 'at least 1', max_sessions)
+        self.endpoint = endpoint
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.evictions = 0
+        # never linked, holds what the sessions share
+        self._shared = Session(endpoint, client_id, client_secret)
+        # rest adapter of the shared connections, i.e. for StandInServer.mount
+        self.rest_interface = self._shared.rest_interface
+        self._lock = threading.Lock()
+        # key: (session, time last used), least recently used first
+        self._sessions = collections.OrderedDict()
+
+    def _new_session(self):
+        return Session(self.endpoint, self.client_id, self.client_secret, shared_with=self._shared)
+
+    def add(self, key, credentials=None, username=None, password=None):
+        """Link a session for key, replacing any session it had.
+
+        :param key:         Key to get the session with.
+        :param credentials: Dictionary from Session.export_credentials or TokenStore.load. Resumed without a request.
+        :param username:    Username to authenticate with instead of credentials.
+        :param password:    Password to authenticate with instead of credentials.
+        :return:            Linked Session.
+        :raises MissingArgument:    Neither credentials nor a username and password.
+        :raises InvalidArgument:    credentials are missing a field, or are for another client.
+        :raises AuthenticatedError: Username or password is not valid.
+        """
+        if credentials is not None:
+            if not credentials.get('auth_token') or credentials.get('client_id') != self.client_id or \
+                    credentials.get('endpoint') != self.endpoint:
+                raise invalid_argument('credentials', 'credentials of {}'.format(default_name({'client_id': self.client_id, 'endpoint': self.endpoint})),
+                                       credentials)
+            session = self._new_session()
+            session.rest_interface.resume(credentials['auth_token'])
+        elif username and password:
+            session = self._new_session()
+            session.authenticate(username, password)
+        else:
+            raise missing_argument('credentials')
+
+        with self._lock:
+            self._sessions.pop(key, None)
+            self._sessions[key] = (session, time.time())
+            self._evict()
+        return session
+
+    def get(self, key):
+        """
+        :param key: Key the session was added with.
+        :return:    Session of key, None if it was never added or has been dropped.
+        """
+        with self._lock:
+            self._evict()
+            entry = self._sessions.pop(key, None)
+            if entry is None:
+                return None
+            self._sessions[key] = (entry[0], time.time())
+            return entry[0]
+
+    def remove(self, key):
+        """Drop the session of key. Its access token stays valid.
+
+        :return: True if there was a session to drop.
+        """
+        with self._lock:
+            return self._sessions.pop(key, None) is not None
+
+    def keys(self):
+        """
+        :return: Keys of the sessions kept, least recently used first.
+        """
+        with self._lock:
+            self._evict()
+            return list(self._sessions)
+
+    def evict_idle(self):
+        """Drop the sessions idle longer than idle_timeout now, instead of on the next use of the pool.
+
+        :return: Number of sessions dropped.
+        """
+        with self._lock:
+            return self._evict()
+
+    def _evict(self):
+        dropped = 0
+        if self.idle_timeout is not None:
+            oldest = time.time() - self.idle_timeout
+            while self._sessions and next(self._sessions.itervalues())[1] < oldest:
+                self._sessions.popitem(last=False)
+                dropped += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            dropped += 1
+        self.evictions += dropped
+        return dropped
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._sessions
+
+    def add_metrics_sink(self, sink):
+        """Receive the timing and size of every request made by the sessions of this pool.
+        Sinks added to a pooled session are shared in the same way.
+        :param sink:    Sink as for Session.add_metrics_sink.
+        :return:        sink
+        """
+        return self._shared.add_metrics_sink(sink)
+
+    def remove_metrics_sink(self, sink):
+        """
+        :param sink:    Sink added with add_metrics_sink.
+        :return:        None
+        """
+        self._shared.remove_metrics_sink(sink)
+
+    def configure_request_logging(self, **settings):
+        """Change how the requests of every session of this pool are logged, as Session.configure_request_logging.
+        :return:                    None
+        :raises InvalidArgument:    Unknown setting.
+        """
+        self._shared.configure_request_logging(**settings)
+
+    def set_bandwidth_limits(self, upload=None, download=None, burst=None, priority=TransferPriority.normal):
+        """Limit the rate of uploads and downloads of every session of this pool together.
+        Arguments are as for Session.set_bandwidth_limits.
+        :return:                    None
+        :raises InvalidArgument:    priority is not a TransferPriority.
+        """
+        self._shared.set_bandwidth_limits(upload, download, burst, priority)
+
+    def get_bandwidth_limiter(self):
+        """
+        :return: BandwidthLimiter shared by the sessions of this pool.
+        """
+        return self._shared.get_bandwidth_limiter()
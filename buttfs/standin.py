@@ -0,0 +1,621 @@
+import io
+import os
+import cgi
+import time
+import uuid
+import urlparse
+import mimetypes
+import threading
+import collections
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from private import codec
+from private.rest_api_adapter import ButtFSRESTAdapter, ButtFSConnection
+
+
+class StandInError(Exception):
+    # error response, status code and ButtFS error code or OAuth error string
+    def __init__(self, status, code, message=''):
+        super(StandInError, self).__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+    def body(self):
+        if isinstance(self.code, basestring):
+            return {'error': self.code, 'error_description': self.message}
+        return {'error': {'code': self.code, 'message': self.message}, 'result': None}
+
+
+def _fail(code, message, status=400):
+    raise StandInError(status, code, message)
+
+
+class _Node(object):
+    __slots__ = ('id', 'type', 'name', 'parent', 'children', 'version', 'date_created',
+                 'date_meta_last_modified', 'date_content_last_modified', 'application_data',
+                 'content', 'mime', 'extension', 'restore_parent')
+
+    def __init__(self, type, name, parent):
+        now = time.time()
+        self.id = uuid.uuid4().hex
+        self.type = type
+        self.name = name
+        self.parent = parent
+        self.children = [] if type == 'folder' else None
+        self.version = 1
+        self.date_created = now
+        self.date_meta_last_modified = now
+        self.date_content_last_modified = now
+        self.application_data = {}
+        self.content = ''
+        self.mime = None
+        self.extension = None
+        # folder the item was in before it was moved to the trash
+        self.restore_parent = None
+
+    def meta(self):
+        meta = {
+            'id': self.id,
+            'type': self.type,
+            'name': self.name,
+            'parent_id': self.parent.id if self.parent is not None else None,
+            'version': self.version,
+            'date_created': self.date_created,
+            'date_meta_last_modified': self.date_meta_last_modified,
+            'date_content_last_modified': self.date_content_last_modified,
+            'is_mirrored': False,
+            'application_data': self.application_data,
+        }
+        if self.type == 'file':
+            meta['size'] = len(self.content)
+            meta['extension'] = self.extension
+            meta['mime'] = self.mime
+        return meta
+
+    def set_name(self, name, mime=None):
+        self.name = name
+        if self.type == 'file':
+            self.extension = os.path.splitext(name)[1][1:]
+            self.mime = mime or mimetypes.guess_type(name.encode('utf-8'))[0] or 'application/octet-stream'
+
+
+class StandInServer(BaseAdapter):
+    """In-process stand-in for the ButtFS REST API.
+
+    The server is a requests transport adapter: mounting it on a session's HTTP session
+    routes every request of that session to it instead of the network. It implements
+    the endpoints in rest_endpoints with the same JSON shapes, X-BCS-Account-Storage-*
+    headers and error codes as the live API, keeping the filesystem in memory.
+
+        server = StandInServer()
+        session = server.session()
+        session.authenticate(server.username, server.password)
+
+    requests counts the requests made to each endpoint, by its rest_endpoints name.
+    latency adds a delay to every request, to approximate a remote server.
+    """
+    def __init__(self, host='standin.buttfs.local', client_id='standin-id', secret='standin-secret',
+                 username='standin@buttfs.local', password='password', storage_limit=None, latency=0):
+        super(StandInServer, self).__init__()
+        self.host = host
+        self.client_id = client_id
+        self.secret = secret
+        self.username = username
+        self.password = password
+        self.storage_limit = storage_limit
+        self.latency = latency
+        self.requests = collections.Counter()
+        self.profile = {
+            'id': uuid.uuid4().hex,
+            'account_id': uuid.uuid4().hex,
+            'username': username,
+            'email': '',
+            'first_name': '',
+            'last_name': '',
+            'created_at': int(time.time() * 1000),
+            'last_login': None,
+            'locale': 'en',
+            'session': {'locale': 'en'},
+            'account_state': {'display_name': 'Active', 'id': 'AS_ACTIVE'},
+            'account_plan': {'display_name': 'ButtFS End User', 'id': 'ButtFSEndUser'},
+        }
+
+        self._lock = threading.RLock()
+        self._tokens = set()
+        self._root = _Node('folder', 'ROOT', None)
+        self._root.id = ''
+        self._trash = _Node('folder', 'TRASH', None)
+        self._trash.id = ''
+        self._nodes = {}
+
+    # setup
+
+    def session(self, client_id=None, secret=None, host=None):
+        """
+        :param client_id:   Client id used by the session. Defaults to the server's.
+        :param secret:      Secret used by the session. Defaults to the server's.
+        :param host:        Host used by the session. Defaults to the server's.
+        :return:            Session connected to this server. Not yet authenticated.
+        """
+        from session import Session
+        session = Session(host or self.host, client_id or self.client_id, secret or self.secret)
+        self.mount(session)
+        return session
+
+    def mount(self, target):
+        """Send all requests made by target to this server.
+
+        :param target:  Session, ButtFSRESTAdapter or requests.Session.
+        :return:        None
+        """
+        if hasattr(target, 'rest_interface'):
+            target = target.rest_interface
+        if isinstance(target, ButtFSRESTAdapter):
+            target = target.bc_conn.http_session
+        target.mount('https://', self)
+        target.mount('http://', self)
+
+    def revoke_tokens(self):
+        """Invalidate every access token, as if they had expired.
+        :return: None
+        """
+        with self._lock:
+            self._tokens.clear()
+
+    def usage(self):
+        """
+        :return: Bytes stored, including the trash.
+        """
+        with self._lock:
+            return sum(len(node.content) for node in self._nodes.itervalues())
+
+    # transport
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if self.latency:
+            time.sleep(self.latency)
+        url = urlparse.urlsplit(request.url)
+        headers = {}
+        try:
+            if url.hostname != self.host:
+                return self._response(request, 404, 'Not Found', content_type='text/plain')
+            with self._lock:
+                status, body, content_type = self._dispatch(request, url)
+                if url.path != '/v2/oauth2/token':
+                    headers = self._storage_headers()
+        except StandInError as e:
+            status, body, content_type = e.status, e.body(), 'application/json'
+
+        if content_type == 'application/json':
+            body = codec.dumps(body)
+        return self._response(request, status, body, headers, content_type)
+
+    def close(self):
+        pass
+
+    def _response(self, request, status, body, headers=None, content_type='application/json'):
+        response = requests.Response()
+        response.status_code = status
+        response.reason = requests.status_codes._codes.get(status, ('',))[0].upper()
+        response.headers = CaseInsensitiveDict(headers or {})
+        response.headers['Content-Type'] = content_type
+        response.headers['Content-Length'] = str(len(body))
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.encoding = 'utf-8'
+        response.connection = self
+        return response
+
+    def _storage_headers(self):
+        return {
+            'X-BCS-Account-Storage-Usage': str(self.usage()),
+            'X-BCS-Account-Storage-Limit': str(self.storage_limit),
+        }
+
+    @staticmethod
+    def _body(request):
+        body = request.body or ''
+        if hasattr(body, 'read'):
+            body = body.read()
+        elif not isinstance(body, basestring):
+            body = ''.join(body)
+        return body
+
+    def _form(self, request, decode=True):
+        content_type = request.headers.get('Content-Type', '')
+        body = self._body(request)
+        if content_type.startswith('multipart/form-data'):
+            form = cgi.FieldStorage(fp=io.BytesIO(body), keep_blank_values=True, environ={
+                'REQUEST_METHOD': 'POST', 'CONTENT_TYPE': content_type, 'CONTENT_LENGTH': str(len(body))})
+            data = {}
+            for key in form.keys():
+                field = form[key]
+                if field.filename is not None:
+                    data[key] = field
+                else:
+                    data[key] = field.value.decode('utf-8')
+            return data
+        fields = urlparse.parse_qsl(body, keep_blank_values=True)
+        return dict((k, v.decode('utf-8') if decode else v) for k, v in fields)
+
+    def _dispatch(self, request, url):
+        method = request.method
+        path = url.path
+        params = dict(urlparse.parse_qsl(url.query, keep_blank_values=True))
+
+        if path == '/v2/oauth2/token' and method == 'POST':
+            self.requests['get oauth token'] += 1
+            return self._oauth(request, url)
+
+        self._check_token(request)
+        if path == '/v2/ping':
+            self.requests['ping'] += 1
+            return 200, '', 'text/plain'
+        if path.rstrip('/') == '/v2/user/profile':
+            if method == 'GET':
+                self.requests['get user profile'] += 1
+                return 200, {'result': self._profile()}, 'application/json'
+            self.requests['change user profile'] += 1
+            return 200, {'result': self._change_profile(self._form(request))}, 'application/json'
+
+        for prefix in ('/v2/folders', '/v2/files', '/v2/trash'):
+            if path.startswith(prefix):
+                kind = prefix[4:]
+                rest = path[len(prefix):]
+                break
+        else:
+            _fail('invalid_request', 'Unknown endpoint {}'.format(path))
+
+        meta = rest.endswith('/meta')
+        if meta:
+            rest = rest[:-len('/meta')]
+        ids = [segment for segment in rest.split('/') if segment]
+        operation = params.get('operation')
+
+        if kind == 'trash':
+            name, result = {
+                'GET': ('list trash', self._list_trash),
+                'DELETE': ('delete trash item', self._delete_trash_item),
+                'POST': ('recover trash item', self._recover),
+            }[method]
+            self.requests[name] += 1
+            return 200, {'result': result(ids, request)}, 'application/json'
+
+        kind_name = kind[:-1]
+        if method == 'GET' and meta:
+            name, handler = 'get {} meta'.format(kind_name), self._get_meta
+        elif method == 'POST' and meta:
+            name, handler = 'alter {} meta'.format(kind_name), self._alter_meta
+        elif method == 'DELETE':
+            name, handler = 'delete {}'.format(kind_name), self._delete
+        elif method == 'POST' and operation in ('move', 'copy'):
+            name, handler = '{} {}'.format(operation, kind_name), self._move_or_copy
+        elif method == 'POST' and operation == 'create' and kind == 'folders':
+            name, handler = 'create folder', self._create_folder
+        elif method == 'POST' and kind == 'files':
+            name, handler = 'upload file', self._upload
+        elif method == 'GET' and kind == 'folders':
+            name, handler = 'list folder', self._list_folder
+        elif method == 'GET' and kind == 'files':
+            self.requests['download file'] += 1
+            return self._download(ids, request)
+        else:
+            _fail('invalid_request', 'Unsupported {} on {}'.format(method, path))
+
+        self.requests[name] += 1
+        return 200, {'result': handler(kind_name, ids, request, params)}, 'application/json'
+
+    # authentication
+
+    def _oauth(self, request, url):
+        # signed with the same code the SDK uses, over the undecoded form values
+        data = self._form(request, decode=False)
+        authorization = request.headers.get('Authorization', '')
+        signer = ButtFSConnection(self.host, self.client_id, self.secret)
+        signed_headers = dict((k, request.headers[k]) for k in ('Content-Type', 'Date') if k in request.headers)
+        expected = signer._sign_request(request.method, url.path, data, signed_headers)['Authorization']
+        if authorization != expected:
+            _fail('invalid_request', 'Client id or signature is not valid.')
+        if data.get('grant_type') != 'password':
+            _fail('unsupported_grant_type', 'Only password grants are supported.')
+        if data.get('username') != self.username or data.get('password') != self.password:
+            _fail('invalid_grant', 'Username or password is not valid.')
+
+        token = uuid.uuid4().hex
+        self._tokens.add(token)
+        self.profile['last_login'] = int(time.time() * 1000)
+        return 200, {'access_token': token, 'token_type': 'bearer'}, 'application/json'
+
+    def _check_token(self, request):
+        authorization = request.headers.get('Authorization', '')
+        if not authorization.startswith('Bearer ') or authorization[len('Bearer '):] not in self._tokens:
+            _fail('invalid_token', 'The access token is not valid.', 401)
+
+    def _profile(self):
+        profile = dict(self.profile)
+        usage = self.usage()
+        limit = self.storage_limit
+        profile['storage'] = {'usage': usage, 'limit': limit, 'otl': limit is not None and usage > limit}
+        return profile
+
+    def _change_profile(self, data):
+        if 'locale' in data:
+            self.profile['locale'] = data['locale']
+        if 'session_locale' in data:
+            self.profile['session'] = {'locale': data['session_locale']}
+        return {'success': True}
+
+    # filesystem helpers
+
+    def _resolve(self, ids, base=None, missing=None):
+        node = base or self._root
+        for id in ids:
+            child = self._nodes.get(id)
+            if child is None or child.parent is not node:
+                if missing is not None:
+                    _fail(missing[0], missing[1], 404)
+                return None
+            node = child
+        return node
+
+    def _resolve_item(self, kind, ids):
+        if not ids:
+            _fail(2003, 'Folder not found.', 404)
+        node = self._resolve(ids)
+        if node is None or node.type != kind:
+            if kind == 'folder':
+                _fail(2003, 'Folder not found.', 404)
+            _fail(3001, 'File not found.', 404)
+        return node
+
+    def _resolve_folder_path(self, path_string, missing):
+        node = self._resolve([id for id in path_string.split('/') if id], missing=missing)
+        if node.type != 'folder':
+            _fail(missing[0], missing[1], 404)
+        return node
+
+    @staticmethod
+    def _child_named(folder, name):
+        for child in folder.children:
+            if child.name == name:
+                return child
+
+    @staticmethod
+    def _renamed(folder, name):
+        base, extension = os.path.splitext(name)
+        names = set(child.name for child in folder.children)
+        count = 1
+        while name in names:
+            name = u'{} ({}){}'.format(base, count, extension)
+            count += 1
+        return name
+
+    def _place(self, folder, name, exists, conflict_code=2042):
+        """
+        :return: Tuple of (name to use, existing item to reuse or None).
+        """
+        existing = self._child_named(folder, name)
+        if existing is None:
+            return name, None
+        if exists == 'overwrite':
+            self._remove(existing)
+            return name, None
+        if exists == 'rename':
+            return self._renamed(folder, name), None
+        if exists == 'reuse':
+            return name, existing
+        _fail(conflict_code, 'An item named {} already exists.'.format(name.encode('utf-8')), 409)
+
+    def _attach(self, node, folder):
+        node.parent = folder
+        folder.children.append(node)
+        self._nodes[node.id] = node
+
+    def _detach(self, node):
+        node.parent.children.remove(node)
+
+    def _remove(self, node):
+        self._detach(node)
+        pending = [node]
+        while pending:
+            node = pending.pop()
+            self._nodes.pop(node.id, None)
+            if node.children:
+                pending.extend(node.children)
+
+    def _copy(self, node, folder, name):
+        copy = _Node(node.type, name, None)
+        copy.application_data = dict(node.application_data)
+        copy.content = node.content
+        copy.mime = node.mime
+        copy.extension = node.extension
+        self._attach(copy, folder)
+        for child in list(node.children or []):
+            self._copy(child, copy, child.name)
+        return copy
+
+    @staticmethod
+    def _is_inside(node, folder):
+        while folder is not None:
+            if folder is node:
+                return True
+            folder = folder.parent
+        return False
+
+    def _is_live(self, node):
+        while node is not None:
+            if node is self._root:
+                return True
+            node = node.parent
+        return False
+
+    # filesystem endpoints
+
+    def _list_folder(self, kind, ids, request, params):
+        folder = self._resolve(ids) if ids else self._root
+        if folder is None or folder.type != 'folder':
+            _fail(2002, 'Folder does not exist.', 404)
+        return {'meta': folder.meta(), 'items': [child.meta() for child in folder.children]}
+
+    def _create_folder(self, kind, ids, request, params):
+        data = self._form(request)
+        parent = self._resolve(ids)
+        if parent is None or parent.type != 'folder':
+            _fail(2039, 'Path does not exist.', 404)
+        name = data.get('name')
+        if not name:
+            _fail(2047, 'Name is required.')
+        name, existing = self._place(parent, name, data.get('exists', 'fail'))
+        if existing is None:
+            existing = _Node('folder', name, None)
+            self._attach(existing, parent)
+        return {'items': [existing.meta()]}
+
+    def _get_meta(self, kind, ids, request, params):
+        return {'meta': self._resolve_item(kind, ids).meta()}
+
+    def _alter_meta(self, kind, ids, request, params):
+        data = self._form(request)
+        node = self._resolve_item(kind, ids)
+        version_code = 2044 if kind == 'folder' else 3021
+        if 'version' not in data:
+            _fail(version_code, 'Version is missing or incorrect.')
+        if int(data['version']) != node.version:
+            if data.get('version-conflict') == 'ignore':
+                _fail(8002, 'Version mismatch ignored.', 409)
+            _fail(version_code, 'Version is missing or incorrect.', 409)
+
+        if 'name' in data:
+            if not data['name']:
+                _fail(2047 if kind == 'folder' else 3018, 'Name is required.')
+            # a new name also sets the mime type, unless it is changed at the same time
+            node.set_name(data['name'], data.get('mime'))
+        elif 'mime' in data and kind == 'file':
+            node.mime = data['mime']
+        for key in ('date_created', 'date_meta_last_modified'):
+            if key in data:
+                setattr(node, key, float(data[key]))
+        if 'date_meta_last_modified' not in data:
+            node.date_meta_last_modified = time.time()
+        node.version += 1
+        return {'meta': node.meta()}
+
+    def _delete(self, kind, ids, request, params):
+        node = self._resolve_item(kind, ids)
+        if node.type == 'folder' and node.children and params.get('force', 'false').lower() != 'true':
+            _fail(2052, 'Directory is not empty.', 409)
+        version = node.version
+        if params.get('commit', 'false').lower() == 'true':
+            self._remove(node)
+        else:
+            self._detach(node)
+            node.restore_parent = node.parent
+            node.parent = self._trash
+            self._trash.children.append(node)
+        return {'success': True, 'last_version': version}
+
+    def _move_or_copy(self, kind, ids, request, params):
+        data = self._form(request)
+        node = self._resolve_item(kind, ids)
+        if not data.get('to'):
+            _fail(2028, 'Missing to parameter.')
+        destination = self._resolve_folder_path(data['to'], (2039, 'Path does not exist.'))
+        operation = params['operation']
+        if operation == 'move' and self._is_inside(node, destination):
+            _fail(2043, 'Cannot move a folder into itself.')
+
+        name, existing = self._place(destination, data.get('name') or node.name, data.get('exists', 'rename'))
+        if existing is not None:
+            return {'meta': existing.meta()}
+        if operation == 'copy':
+            return {'meta': self._copy(node, destination, name).meta()}
+
+        self._detach(node)
+        self._attach(node, destination)
+        if name != node.name:
+            node.set_name(name, node.mime)
+        return {'meta': node.meta()}
+
+    def _upload(self, kind, ids, request, params):
+        data = self._form(request)
+        folder = self._resolve(ids)
+        if folder is None or folder.type != 'folder':
+            _fail(2039, 'Path does not exist.', 404)
+        upload = data.get('file')
+        if upload is None:
+            _fail(2047, 'No file was uploaded.')
+
+        name = upload.filename.decode('utf-8') if isinstance(upload.filename, str) else upload.filename
+        mime = upload.headers.get('content-type')
+        existing = self._child_named(folder, name)
+        if existing is not None and existing.type == 'file' and data.get('exists') == 'overwrite':
+            node = existing
+            node.version += 1
+        else:
+            name, node = self._place(folder, name, data.get('exists', 'fail'))
+            if node is None:
+                node = _Node('file', name, None)
+                self._attach(node, folder)
+        node.set_name(name, mime)
+        node.content = upload.value
+        node.date_content_last_modified = time.time()
+        return node.meta()
+
+    def _download(self, ids, request):
+        node = self._resolve_item('file', ids)
+        content = node.content
+        ranged = request.headers.get('Range', '')
+        if ranged.startswith('bytes='):
+            start, _, end = ranged[len('bytes='):].partition('-')
+            start = int(start or 0)
+            # inclusive end, as in HTTP
+            content = content[start:int(end) + 1] if end else content[start:]
+        return 200, content, 'application/octet-stream'
+
+    # trash endpoints
+
+    def _list_trash(self, ids, request):
+        folder = self._resolve(ids, self._trash) if ids else self._trash
+        if folder is None or folder.type != 'folder':
+            _fail(2002, 'Folder does not exist.', 404)
+        return {'items': [child.meta() for child in folder.children]}
+
+    def _delete_trash_item(self, ids, request):
+        node = self._resolve(ids, self._trash) if ids else None
+        if node is None:
+            _fail(2003, 'Item not found in trash.', 404)
+        self._remove(node)
+        return {'success': True}
+
+    def _recover(self, ids, request):
+        data = self._form(request)
+        node = self._resolve(ids[:1], self._trash) if len(ids) == 1 else None
+        if node is None:
+            _fail(2003, 'Item not found in trash.', 404)
+
+        method = data.get('restore', 'fail')
+        if method == 'rescue':
+            destination = self._resolve([id for id in data.get('rescue-path', '').split('/') if id])
+        elif method == 'recreate':
+            name = data.get('recreate-path', '').strip('/')
+            if not name or self._child_named(self._root, name) is not None:
+                _fail(9999, 'Could not recreate {}.'.format(name.encode('utf-8')), 500)
+            destination = _Node('folder', name, None)
+            self._attach(destination, self._root)
+        else:
+            destination = node.restore_parent
+
+        if destination is None or destination.type != 'folder' or not self._is_live(destination):
+            _fail(9999, 'Restore destination does not exist.', 500)
+        if self._child_named(destination, node.name) is not None:
+            _fail(9999, 'An item named {} already exists.'.format(node.name.encode('utf-8')), 500)
+
+        self._detach(node)
+        node.restore_parent = None
+        self._attach(node, destination)
+        return {'success': True, 'meta': node.meta()}
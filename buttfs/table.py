@@ -0,0 +1,306 @@
+from array import array
+
+from path import Path
+from private.filesystem_common import create_items_from_json
+from private.utils import name_matcher
+
+FOLDER = 0
+FILE = 1
+
+# numeric columns and their numpy / array module types
+# 'l' is 32 bits on Windows, so sizes and versions are doubles there, exact up to 2 ** 53, as in ItemIndex
+NUMERIC_COLUMNS = (
+    ('kind', 'i1', 'b'),
+    ('version', 'i8', 'd'),
+    ('size', 'i8', 'd'),
+    ('date_created', 'f8', 'd'),
+    ('date_meta_last_modified', 'f8', 'd'),
+    ('date_content_last_modified', 'f8', 'd'),
+    ('parent', 'i8', 'l'),
+)
+STRING_COLUMNS = ('id', 'name', 'extension', 'mime')
+
+# imported by load_numpy, as it is slow to import and most programs never build a table
+numpy = None
+_numpy_loaded = False
+
+
+def load_numpy():
+    """
+    :return: The numpy module, None if it is not installed.
+    """
+    global numpy, _numpy_loaded
+    if not _numpy_loaded:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy_loaded = True
+    return numpy
+
+
+class ItemTable(object):
+    """Listing stored as columns instead of objects.
+
+    Numeric columns (kind, version, size, dates and parent) live in a NumPy structured
+    array when NumPy is installed and in array module arrays otherwise. id, name,
+    extension and mime are object columns. parent is an index into folder_paths, the id
+    paths of the folders that contain the rows.
+
+    Filters, sorting and aggregates run over whole columns. Rows are turned into
+    File and Folder objects only when item() or items() is called.
+    """
+    def __init__(self, rest_interface, folder_paths, columns, in_trash=False):
+        self.rest_interface = rest_interface
+        self.folder_paths = folder_paths
+        self.in_trash = in_trash
+        self._columns = columns
+
+    @staticmethod
+    def from_rows(rest_interface, listings, in_trash=False, use_numpy=None):
+        """Build a table.
+
+        :param rest_interface:  Rest interface used for items created from the table.
+        :param listings:        Iterable of (folder id path, list of item dictionaries) tuples.
+        :param in_trash:        If the listings are from the trash.
+        :param use_numpy:       Force NumPy on or off. Defaults to using it when installed.
+        :return:                ItemTable
+        """
+        if use_numpy is None:
+            use_numpy = load_numpy() is not None
+        elif use_numpy:
+            load_numpy()
+        folder_paths = []
+        values = dict((name, []) for name in STRING_COLUMNS)
+        values.update((name, []) for name, _, _ in NUMERIC_COLUMNS)
+        for folder_path, rows in listings:
+            parent = len(folder_paths)
+            folder_paths.append(str(folder_path))
+            for data in rows:
+                values['id'].append(data['id'])
+                values['name'].append(data['name'])
+                values['extension'].append(data.get('extension'))
+                values['mime'].append(data.get('mime'))
+                values['kind'].append(FOLDER if data['type'] == 'folder' else FILE)
+                values['version'].append(data.get('version') or 0)
+                values['size'].append(data.get('size') or 0)
+                values['date_created'].append(data.get('date_created') or 0)
+                values['date_meta_last_modified'].append(data.get('date_meta_last_modified') or 0)
+                values['date_content_last_modified'].append(data.get('date_content_last_modified') or 0)
+                values['parent'].append(parent)
+
+        if use_numpy:
+            count = len(values['id'])
+            numbers = numpy.zeros(count, dtype=[(name, dtype) for name, dtype, _ in NUMERIC_COLUMNS])
+            for name, _, _ in NUMERIC_COLUMNS:
+                numbers[name] = values[name]
+            columns = {'numbers': numbers}
+            for name in STRING_COLUMNS:
+                column = numpy.empty(count, dtype=object)
+                column[:] = values[name]
+                columns[name] = column
+        else:
+            columns = dict((name, values[name]) for name in STRING_COLUMNS)
+            for name, _, typecode in NUMERIC_COLUMNS:
+                columns[name] = array(typecode, values[name])
+
+        return ItemTable(rest_interface, folder_paths, columns, in_trash)
+
+    @property
+    def uses_numpy(self):
+        return 'numbers' in self._columns
+
+    def column(self, name):
+        """
+        :param name: One of id, name, extension, mime, kind, version, size, date_created,
+                     date_meta_last_modified, date_content_last_modified or parent.
+        :return:     The column. A NumPy array when NumPy is used, a list or array otherwise.
+        """
+        if self.uses_numpy and name not in STRING_COLUMNS:
+            return self._columns['numbers'][name]
+        return self._columns[name]
+
+    def __len__(self):
+        return len(self._columns['id'])
+
+    def __getitem__(self, column_name):
+        return self.column(column_name)
+
+    def take(self, rows):
+        """
+        :param rows: Row numbers, or a mask with one boolean per row.
+        :return:     New table with only the given rows, in that order.
+        """
+        if self.uses_numpy:
+            rows = numpy.asarray(rows)
+            if rows.dtype != bool:
+                rows = rows.astype(int)
+            columns = dict((name, column[rows]) for name, column in self._columns.iteritems())
+        else:
+            rows = list(rows)
+            if rows and isinstance(rows[0], bool) and len(rows) == len(self):
+                rows = [row for row, keep in enumerate(rows) if keep]
+            columns = {}
+            for name, column in self._columns.iteritems():
+                taken = [column[row] for row in rows]
+                columns[name] = array(column.typecode, taken) if isinstance(column, array) else taken
+        return ItemTable(self.rest_interface, self.folder_paths, columns, self.in_trash)
+
+    def mask(self, item_type=None, name=None, regex=None, extension=None, mime=None, min_size=None, max_size=None,
+             created_after=None, created_before=None, modified_after=None, modified_before=None):
+        """
+        :return: One boolean per row, true where every given condition matches. See filter for the arguments.
+        """
+        conditions = []
+        if item_type is not None:
+            conditions.append((self.column('kind'), '==', FOLDER if item_type == 'folder' else FILE))
+        if extension is not None:
+            conditions.append((self.column('extension'), '==', extension))
+        if mime is not None:
+            conditions.append((self.column('mime'), '==', mime))
+        for column, low, high in (('size', min_size, max_size),
+                                  ('date_created', created_after, created_before),
+                                  ('date_content_last_modified', modified_after, modified_before)):
+            if low is not None:
+                conditions.append((self.column(column), '>=', low))
+            if high is not None:
+                conditions.append((self.column(column), '<=', high))
+
+        pattern = name_matcher(name, regex)
+
+        if self.uses_numpy:
+            result = numpy.ones(len(self), dtype=bool)
+            for column, operation, value in conditions:
+                if operation == '==':
+                    result &= column == value
+                elif operation == '>=':
+                    result &= column >= value
+                else:
+                    result &= column <= value
+            if pattern is not None:
+                names = self.column('name')
+                result &= numpy.fromiter((pattern(n) for n in names), dtype=bool, count=len(names))
+            return result
+
+        result = [True] * len(self)
+        for column, operation, value in conditions:
+            if operation == '==':
+                result = [keep and v == value for keep, v in zip(result, column)]
+            elif operation == '>=':
+                result = [keep and v >= value for keep, v in zip(result, column)]
+            else:
+                result = [keep and v <= value for keep, v in zip(result, column)]
+        if pattern is not None:
+            result = [keep and pattern(n) for keep, n in zip(result, self.column('name'))]
+        return result
+
+    def filter(self, item_type=None, name=None, regex=None, extension=None, mime=None, min_size=None, max_size=None,
+               created_after=None, created_before=None, modified_after=None, modified_before=None):
+        """Rows matching every given condition. Ranges are inclusive.
+
+        :param item_type:       'file' or 'folder'.
+        :param name:            Glob pattern matched against the whole name, i.e. '*.mov'.
+        :param regex:           Regular expression searched for in the name.
+        :param extension:       File extension without the dot.
+        :param mime:            Mime type.
+        :param min_size:        Minimum size in bytes.
+        :param max_size:        Maximum size in bytes.
+        :param created_after:   Earliest date_created. In seconds.
+        :param created_before:  Latest date_created. In seconds.
+        :param modified_after:  Earliest date_content_last_modified. In seconds.
+        :param modified_before: Latest date_content_last_modified. In seconds.
+        :return:                New table.
+        """
+        return self.take(self.mask(item_type, name, regex, extension, mime, min_size, max_size,
+                                   created_after, created_before, modified_after, modified_before))
+
+    def sort(self, column, reverse=False):
+        """
+        :param column:  Name of the column to sort by.
+        :param reverse: If true, sort in descending order.
+        :return:        New table.
+        """
+        values = self.column(column)
+        if self.uses_numpy:
+            order = numpy.argsort(values, kind='mergesort')
+            if reverse:
+                order = order[::-1]
+        else:
+            order = sorted(xrange(len(values)), key=values.__getitem__, reverse=reverse)
+        return self.take(order)
+
+    def total_size(self):
+        """
+        :return: Sum of the size column.
+        """
+        sizes = self.column('size')
+        return int(sizes.sum()) if self.uses_numpy else int(sum(sizes))
+
+    def total_size_by(self, column='extension'):
+        """
+        :param column:  Column to group by.
+        :return:        Dictionary of column value to the total size of the rows with that value.
+        """
+        totals = {}
+        keys = self.column(column)
+        sizes = self.column('size')
+        if self.uses_numpy and column not in STRING_COLUMNS:
+            unique, inverse = numpy.unique(keys, return_inverse=True)
+            sums = numpy.bincount(inverse, weights=sizes)
+            return dict((key.item(), int(total)) for key, total in zip(unique, sums))
+        for key, size in zip(keys, sizes):
+            totals[key] = totals.get(key, 0) + int(size)
+        return totals
+
+    def count_by(self, column='extension'):
+        """
+        :param column:  Column to group by.
+        :return:        Dictionary of column value to number of rows with that value.
+        """
+        counts = {}
+        for key in self.column(column):
+            key = key.item() if hasattr(key, 'item') else key
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def row(self, row):
+        """
+        :param row: Row number.
+        :return:    Dictionary of the row in the format of Item.data.
+        """
+        data = {
+            'id': self.column('id')[row],
+            'name': self.column('name')[row],
+            'type': 'folder' if self.column('kind')[row] == FOLDER else 'file',
+            'version': int(self.column('version')[row]),
+            'date_created': float(self.column('date_created')[row]),
+            'date_meta_last_modified': float(self.column('date_meta_last_modified')[row]),
+            'date_content_last_modified': float(self.column('date_content_last_modified')[row]),
+        }
+        if data['type'] == 'file':
+            data['size'] = int(self.column('size')[row])
+            data['extension'] = self.column('extension')[row]
+            data['mime'] = self.column('mime')[row]
+        return data
+
+    def item(self, row):
+        """
+        :param row: Row number.
+        :return:    File or Folder for the row.
+        """
+        parent_path = self.folder_paths[int(self.column('parent')[row])]
+        parent_path = Path.path_from_string(parent_path) if parent_path != '/' else None
+        return create_items_from_json(self.rest_interface, self.row(row), parent_path, self.in_trash)[0]
+
+    def items(self, rows=None):
+        """
+        :param rows: Row numbers. Defaults to every row.
+        :return:     List of Files and Folders.
+        """
+        if rows is None:
+            rows = xrange(len(self))
+        return [self.item(row) for row in rows]
+
+    def __iter__(self):
+        for row in xrange(len(self)):
+            yield self.item(row)
@@ -0,0 +1,107 @@
+"""Saved session credentials.
+
+Session.export_credentials returns the access token of a linked session with the
+endpoint and client id it belongs to. A TokenStore keeps credentials in a file only
+its owner can read, so later processes can continue with Session.resume instead of
+authenticating again. The client secret is never saved.
+"""
+import os
+import stat
+import threading
+
+from private import codec
+from private.utils import replace_file
+from errors import insecure_token_store, invalid_argument
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.buttfs', 'tokens.json')
+FIELDS = ('endpoint', 'client_id', 'auth_token')
+
+
+def default_name(credentials):
+    """
+    :return: Name credentials are saved under when none is given, i.e. 'client-id@example.cloudfs.io'.
+    """
+    return '{}@{}'.format(credentials['client_id'], credentials['endpoint'])
+
+
+class TokenStore(object):
+    """File of named credentials, readable and writable by its owner only.
+
+    :param path:    Path of the file. Defaults to ~/.buttfs/tokens.json. Folders are created when saving.
+    """
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            mode = os.stat(self.path).st_mode
+        except OSError:
+            return {}
+        if os.name == 'posix' and mode & (stat.S_IRWXG | stat.S_IRWXO):
+            raise insecure_token_store(self.path, stat.S_IMODE(mode))
+        with open(self.path, 'rb') as fp:
+            return codec.try_loads(fp.read(), None) or {}
+
+    def _write(self, entries):
+        folder = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.isdir(folder):
+            os.makedirs(folder, 0700)
+        # written next to the store and renamed over it, so readers never see part of a file
+        temporary = '{}.{}.tmp'.format(self.path, os.getpid())
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(codec.dumps(entries))
+            replace_file(temporary, self.path)
+        except Exception:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    def save(self, credentials, name=None):
+        """
+        :param credentials: Dictionary from Session.export_credentials.
+        :param name:        Name to save them under, i.e. to keep several accounts. Defaults to default_name.
+        :return:            Name they were saved under.
+        :raises InvalidArgument:    credentials is missing a field.
+        :raises InsecureTokenStore: The file can be read by other users.
+        """
+        for field in FIELDS:
+            if not credentials.get(field):
+                raise invalid_argument('credentials', 'dictionary with {}'.format(', '.join(FIELDS)), credentials)
+        name = name or default_name(credentials)
+        with self._lock:
+            entries = self._read()
+            entries[name] = dict((field, credentials[field]) for field in FIELDS)
+            self._write(entries)
+        return name
+
+    def load(self, name):
+        """
+        :param name:    Name the credentials were saved under.
+        :return:        Credentials for Session.resume, None if none are saved under name.
+        :raises InsecureTokenStore: The file can be read by other users.
+        """
+        with self._lock:
+            return self._read().get(name)
+
+    def remove(self, name):
+        """Forget the credentials saved under name, i.e. after the token stops working.
+
+        :return: True if there were credentials to remove.
+        """
+        with self._lock:
+            entries = self._read()
+            if name not in entries:
+                return False
+            del entries[name]
+            self._write(entries)
+            return True
+
+    def names(self):
+        """
+        :return: Sorted names of the saved credentials.
+        """
+        with self._lock:
+            return sorted(self._read())
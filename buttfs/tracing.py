@@ -0,0 +1,286 @@
+"""Nested timing spans for SDK operations.
+
+Spans follow OpenTelemetry naming: each has a trace id shared with its root, its own
+span id, the id of its parent, attributes and a status. OpenTelemetry is not needed;
+spans go to the exporters added with Session.add_span_exporter, and can be forwarded
+to any tracing system from there.
+
+The current span is kept per thread. Threads started by the SDK, such as background
+downloads, continue the span that was current when they were started.
+"""
+import os
+import time
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+import functools
+import threading
+import contextlib
+
+_context = threading.local()
+
+
+def process_cpu_time():
+    """
+    :return: User and system CPU seconds used by this process, by every thread.
+    """
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+    times = os.times()
+    return times[0] + times[1]
+
+
+def current_span():
+    """
+    :return: Span that is current on this thread, None outside of any span.
+    """
+    return getattr(_context, 'span', None)
+
+
+@contextlib.contextmanager
+def use_span(span):
+    """Make span current on this thread until the block ends. The span is not ended."""
+    previous = current_span()
+    _context.span = span
+    try:
+        yield span
+    finally:
+        _context.span = previous
+
+
+def wrap(function):
+    """
+    :param function:    Function that will run on another thread.
+    :return:            Function that runs with the span that is current now.
+    """
+    span = current_span()
+
+    @functools.wraps(function)
+    def run_in_context(*args, **kwargs):
+        with use_span(span):
+            return function(*args, **kwargs)
+    return run_in_context
+
+
+def _new_id(size):
+    return os.urandom(size).encode('hex')
+
+
+class Span(object):
+    """A timed operation.
+
+    name:           Operation, i.e. 'Folder.upload' or 'rest upload file'.
+    trace_id:       Id shared by every span under the same root.
+    span_id:        Id of this span.
+    parent_id:      span_id of the parent, None for a root span.
+    start_time:     Seconds since the epoch.
+    end_time:       Seconds since the epoch, None until the span ends.
+    attributes:     Dictionary of details, i.e. http.status_code.
+    status:         'unset' until the span ends, then 'ok' or 'error'.
+    error:          Description of the exception that ended the span.
+    thread:         Name of the thread that started the span.
+    cpu_time:       Process CPU seconds used while the span was open, by every thread.
+    """
+    def __init__(self, tracer, name, parent=None, attributes=None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else _new_id(16)
+        self.span_id = _new_id(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self.end_time = None
+        self._cpu_start = process_cpu_time()
+        self._cpu_end = None
+        self.status = 'unset'
+        self.error = None
+        self.thread = threading.current_thread().name
+
+    @property
+    def duration(self):
+        """
+        :return: Seconds the span took, or has taken so far.
+        """
+        return (self.end_time or time.time()) - self.start_time
+
+    @property
+    def cpu_time(self):
+        return (self._cpu_end or process_cpu_time()) - self._cpu_start
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self, error=None):
+        """Finish the span and export it. Later calls do nothing.
+
+        :param error: Exception that ended the operation. Optional.
+        """
+        if self.end_time is not None:
+            return
+        self.end_time = time.time()
+        self._cpu_end = process_cpu_time()
+        if error is not None:
+            self.status = 'error'
+            self.error = '{}: {}'.format(type(error).__name__, error).split('\n')[0]
+        else:
+            self.status = 'ok'
+        self.tracer.export(self)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_id,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'cpu_time': self.cpu_time,
+            'attributes': self.attributes,
+            'status': self.status,
+            'error': self.error,
+            'thread': self.thread,
+        }
+
+    def __repr__(self):
+        return 'Span({}, {:.3f}s, {})'.format(self.name, self.duration, self.status)
+
+
+class Tracer(object):
+    """Exporters of a session, shared by every copy of its rest adapter.
+
+    Spans are only created while the tracer has exporters.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._exporters = ()
+
+    @property
+    def enabled(self):
+        return bool(self._exporters)
+
+    def add_exporter(self, exporter):
+        """
+        :param exporter: Function called with each Span as it ends, or any object with an export method.
+                         An exporter with a start_span method is also called with each span as it starts.
+        """
+        with self._lock:
+            self._exporters += (exporter,)
+
+    def remove_exporter(self, exporter):
+        with self._lock:
+            self._exporters = tuple(e for e in self._exporters if e != exporter)
+
+    def export(self, span):
+        for exporter in self._exporters:
+            if hasattr(exporter, 'export'):
+                exporter.export(span)
+            else:
+                exporter(span)
+
+    def start_span(self, name, attributes=None, parent=None):
+        """Start a span without making it current. It must be ended with Span.end.
+
+        :param name:        Name of the operation.
+        :param attributes:  Dictionary of details. Optional.
+        :param parent:      Parent span. Defaults to the current span.
+        :return:            Span
+        """
+        span = Span(self, name, parent if parent is not None else current_span(), attributes)
+        for exporter in self._exporters:
+            if hasattr(exporter, 'start_span'):
+                exporter.start_span(span)
+        return span
+
+    @contextlib.contextmanager
+    def span(self, name, attributes=None):
+        """Run a block in a new span that is current on this thread. Nothing is created while the
+        tracer has no exporters, and None is given to the block.
+        """
+        if not self.enabled:
+            yield None
+            return
+        span = self.start_span(name, attributes)
+        with use_span(span):
+            try:
+                yield span
+            except BaseException as e:
+                span.end(e)
+                raise
+        span.end()
+
+
+def traced(name, attributes=None):
+    """Decorator running a method of an object with a rest_interface in a span.
+
+    :param name:        Name of the span.
+    :param attributes:  Function called with the same arguments as the method, returning a dictionary
+                        of span attributes. Optional.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def traced_method(self, *args, **kwargs):
+            tracer = getattr(getattr(self.rest_interface, 'bc_conn', None), 'tracer', None)
+            if tracer is None or not tracer.enabled:
+                return method(self, *args, **kwargs)
+            with tracer.span(name, attributes(self, *args, **kwargs) if attributes else None):
+                return method(self, *args, **kwargs)
+        return traced_method
+    return decorate
+
+
+def item_attributes(item, *args, **kwargs):
+    """Span attributes for methods of Files and Folders."""
+    return {'buttfs.path': str(item.path()), 'buttfs.name': item.data.get('name')}
+
+
+def items_attributes(filesystem, items, *args, **kwargs):
+    """Span attributes for Filesystem methods taking a list of items."""
+    return {'buttfs.item_count': len(items) if hasattr(items, '__len__') else None}
+
+
+class SpanCollector(object):
+    """Keeps every finished span in memory."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans = []
+
+    def export(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def clear(self):
+        with self._lock:
+            self.spans = []
+
+    def children(self, span):
+        """
+        :return: Finished spans whose parent is span, in the order they started.
+        """
+        return sorted((s for s in self.spans if s.parent_id == span.span_id and s.trace_id == span.trace_id),
+                      key=lambda s: s.start_time)
+
+    def roots(self):
+        """
+        :return: Finished spans whose parent was not collected, in the order they started.
+        """
+        ids = set(s.span_id for s in self.spans)
+        return sorted((s for s in self.spans if s.parent_id not in ids), key=lambda s: s.start_time)
+
+    def format_tree(self):
+        """
+        :return: String with one line per span, indented under its parent, with its duration.
+        """
+        lines = []
+
+        def add(span, depth):
+            status = '' if span.status == 'ok' else ' [{}]'.format(span.error or span.status)
+            lines.append('{}{} {:.1f}ms{}'.format('  ' * depth, span.name, span.duration * 1000, status))
+            for child in self.children(span):
+                add(child, depth + 1)
+
+        for root in self.roots():
+            add(root, 0)
+        return '\n'.join(lines)
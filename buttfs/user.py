@@ -6,6 +6,8 @@ class User(CachedObject):
     """
     REST Documentation: https://www.bitcasa.com/cloudfs-api-docs/api/Get%20Profile.html
     """
+    CACHE_NAME = 'user'
+
     def __init__(self, rest_interface, account_info):
         super(User, self).__init__()
         self.rest_interface = rest_interface
@@ -14,7 +16,7 @@ class User(CachedObject):
     def _refresh_request(self, debug=False):
         if debug:
             self.rest_interface.debug_requests(1)
-        result = self.rest_interface.user_profile()
+        result = self.rest_interface.cached_user_profile(refresh=True)
         return result, {}
 
     def _initialize_self(self, request_info, x_headers):
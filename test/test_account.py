@@ -11,9 +11,7 @@ class AccountTest(ButtFSTestCase):
                            'limit', 'plan']
 
     def setUp(self):
-        self.s = Session(self.BUTTFS_BASE,
-                self.BUTTFS_ID,
-                self.BUTTFS_SECRET)
+        self.s = self.create_session(self.BUTTFS_BASE, self.BUTTFS_ID, self.BUTTFS_SECRET)
 
         self.assertRaises(
             errors.ButtFSError,
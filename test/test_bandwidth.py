@@ -0,0 +1,91 @@
+import time
+import threading
+import unittest
+
+from test_settings import ButtFSTestCase
+from buttfs.standin import StandInServer
+from buttfs.bandwidth import TokenBucket, UPLOAD, DOWNLOAD, process_limiter, set_process_bandwidth_limits
+from buttfs.private.buttfs_paths import TransferPriority
+from buttfs import errors
+
+
+class TokenBucketTests(ButtFSTestCase):
+    def test_rate(self):
+        bucket = TokenBucket(100000, burst=10000)
+        started = time.time()
+        for _ in range(4):
+            bucket.consume(10000)
+        # the first block comes out of the full bucket
+        self.assertGreaterEqual(time.time() - started, 0.25)
+        self.assertEqual(bucket.snapshot()['bytes'], 40000)
+
+        bucket.configure(None)
+        started = time.time()
+        bucket.consume(10 ** 9)
+        self.assertLess(time.time() - started, 0.05)
+
+    def test_priority(self):
+        bucket = TokenBucket(20000, burst=1000)
+        bucket.consume(1000)
+        finished = []
+
+        def transfer(priority):
+            bucket.consume(1000, priority)
+            finished.append(priority)
+
+        low = threading.Thread(target=transfer, args=(TransferPriority.low,))
+        low.start()
+        time.sleep(0.01)
+        high = threading.Thread(target=transfer, args=(TransferPriority.high,))
+        high.start()
+        low.join()
+        high.join()
+        self.assertEqual(finished, [TransferPriority.high, TransferPriority.low])
+
+
+class BandwidthLimitTests(ButtFSTestCase):
+    def setUp(self):
+        self.server = StandInServer()
+        self.s = self.server.session()
+        self.s.authenticate(self.server.username, self.server.password)
+        self.root = self.s.get_filesystem().root_container()
+
+    def tearDown(self):
+        set_process_bandwidth_limits()
+
+    def test_session_limits(self):
+        self.s.set_bandwidth_limits(upload=200000, download=200000, burst=16384)
+        content = 'x' * 60000
+        started = time.time()
+        new_file = self.root.upload(content, custom_name='x.txt', data_inline=True, priority=TransferPriority.low)
+        self.assertGreaterEqual(time.time() - started, 0.2)
+
+        started = time.time()
+        self.assertEqual(new_file.read(), content)
+        self.assertGreaterEqual(time.time() - started, 0.2)
+
+        snapshot = self.s.get_bandwidth_limiter().snapshot()
+        self.assertGreater(snapshot[UPLOAD]['bytes'], len(content))
+        self.assertEqual(snapshot[DOWNLOAD]['bytes'], len(content))
+        # copies of the session share its limits
+        self.assertIs(self.s.rest_interface.get_copy().bc_conn.bandwidth, self.s.get_bandwidth_limiter())
+        self.assertRaises(errors.InvalidArgument, new_file.read, None, priority='urgent')
+
+    def test_process_limits(self):
+        set_process_bandwidth_limits(download=100000, burst=16384)
+        new_file = self.root.upload('y' * 30000, custom_name='y.txt', data_inline=True)
+        before = process_limiter.download.snapshot()['bytes']
+        started = time.time()
+        self.assertEqual(new_file.read(), 'y' * 30000)
+        self.assertGreaterEqual(time.time() - started, 0.1)
+        self.assertEqual(process_limiter.download.snapshot()['bytes'] - before, 30000)
+
+    def test_positional_debug(self):
+        # priority comes after debug, so calls written before it still work
+        new_file = self.root.upload('positional', custom_name='p.txt', data_inline=True)
+        self.assertEqual(new_file.read(None, False), 'positional')
+        self.assertEqual(new_file.read(None, False, TransferPriority.high), 'positional')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+from test_settings import ButtFSTestCase
+from buttfs.batch import MetaBatch
+from buttfs.standin import StandInServer
+from buttfs.errors import VersionMissingOrIncorrect, FileVersionMissingOrIncorrect, FileNotFound
+from buttfs.private.buttfs_paths import VersionConflictValue
+import unittest
+
+
+class SaveRecorder(object):
+    # stands in for a File, only save() is used by the batch
+    def __init__(self, name, error=None):
+        self.name = name
+        self.error = error
+        self.changed_meta = set(['name'])
+        self.saved_with = None
+
+    def save(self, if_conflict=VersionConflictValue.fail, debug=False):
+        self.changed_meta.clear()
+        if self.error:
+            raise self.error
+        self.saved_with = if_conflict
+        return self
+
+
+class MetaBatchTests(ButtFSTestCase):
+    def test_commit_report(self):
+        ok = SaveRecorder('ok')
+        conflict = SaveRecorder('conflict', VersionMissingOrIncorrect(None, None))
+        failed = SaveRecorder('failed', FileNotFound(None, None))
+        unchanged = SaveRecorder('unchanged')
+        unchanged.changed_meta.clear()
+
+        batch = MetaBatch(max_workers=2)
+        for item in (ok, conflict, failed, unchanged):
+            batch.add(item)
+        report = batch.commit()
+
+        self.assertEqual(report.applied, [ok], "Wrong applied items!")
+        self.assertEqual([item for item, error in report.conflicted], [conflict], "Wrong conflicted items!")
+        self.assertEqual([item for item, error in report.failed], [failed], "Wrong failed items!")
+        self.assertEqual(conflict.changed_meta, set(['name']), "Failed items should keep their changes!")
+        self.assertEqual(len(batch), 0, "Batch should be empty after commit!")
+
+    def test_conflict_policy(self):
+        default = SaveRecorder('default')
+        ignore = SaveRecorder('ignore')
+        with MetaBatch() as batch:
+            batch.add(default)
+            batch.add(ignore, VersionConflictValue.ignore)
+        self.assertEqual(default.saved_with, VersionConflictValue.fail, "Batch policy not applied!")
+        self.assertEqual(ignore.saved_with, VersionConflictValue.ignore, "Item policy not applied!")
+        self.assertTrue(batch.report.success, "Context manager did not commit!")
+
+    def test_file_version_conflict(self):
+        server = StandInServer()
+        session = server.session()
+        session.authenticate(server.username, server.password)
+        root = session.get_filesystem().root_container()
+        stale = root.upload('content', custom_name='stale.txt', data_inline=True)
+        current = root.list()[0]
+        current.name = 'renamed.txt'
+        current.save()
+
+        stale.name = 'conflict.txt'
+        batch = MetaBatch()
+        batch.add(stale)
+        report = batch.commit()
+        self.assertEqual([item for item, error in report.conflicted], [stale], "File conflict not reported!")
+        self.assertIsInstance(report.conflicted[0][1], FileVersionMissingOrIncorrect)
+
+if __name__ == '__main__':
+    unittest.main()
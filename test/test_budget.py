@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import warnings
+import unittest
+
+from test_settings import ButtFSTestCase
+from buttfs.standin import StandInServer
+from buttfs.budget import RequestBudgetWarning
+from buttfs.private.buttfs_paths import OverBudgetValue
+from buttfs import errors
+
+
+class BudgetTests(ButtFSTestCase):
+    def setUp(self):
+        self.server = StandInServer()
+        self.s = self.server.session()
+        self.s.authenticate(self.server.username, self.server.password)
+        self.fs = self.s.get_filesystem()
+        self.root = self.fs.root_container()
+
+    def test_counts_and_limits(self):
+        self.root.list()
+        self.assertEqual(self.s.request_counts(), {'get oauth token': 1, 'list folder': 1})
+
+        self.s.set_request_budget(limit=3, endpoint_limits={'create folder': 1})
+        self.root.create_folder('a')
+        self.assertEqual(self.s.get_request_budget().remaining(), 0)
+        self.assertRaises(errors.RequestBudgetExceeded, self.root.create_folder, 'b')
+        self.assertEqual(self.server.requests['create folder'], 1, "Refused request was sent!")
+        self.assertEqual(self.s.request_counts()['create folder'], 1)
+
+        self.s.set_request_budget(limit=3, over_budget=OverBudgetValue.warn)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.root.list()
+        self.assertEqual([w.category for w in caught], [RequestBudgetWarning])
+        self.assertRaises(errors.InvalidArgument, self.s.set_request_budget, 3, None, 'ignore')
+
+    def test_dry_runs(self):
+        folder = self.root.create_folder('a')
+        new_file = self.root.upload('0123456789', custom_name='b.txt', data_inline=True)
+        sent = self.server.requests.copy()
+
+        moves = self.fs.move([folder, new_file], folder, dry_run=True)
+        self.assertEqual(dict(moves.requests_by_endpoint), {'move folder': 1, 'move file': 1})
+        self.assertGreater(moves.bytes_sent, 0)
+
+        new_file.name = 'c.txt'
+        batch = self.fs.batch().add(new_file)
+        self.assertEqual(batch.commit(dry_run=True).requests, 1)
+        self.assertEqual(len(batch), 1)
+        self.assertEqual(self.fs.restore([new_file], dry_run=True).requests_by_endpoint['recover trash item'], 1)
+
+        local = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(local, 'tree', 'sub'))
+            for name, size in (('one', 100), (os.path.join('sub', 'two'), 5000)):
+                with open(os.path.join(local, 'tree', name), 'wb') as fp:
+                    fp.write('x' * size)
+            estimate = self.root.upload_tree(os.path.join(local, 'tree'), dry_run=True)
+            self.assertEqual(self.server.requests, sent, "Dry run sent requests!")
+            self.assertEqual(dict(estimate.requests_by_endpoint), {'create folder': 2, 'upload file': 2})
+            self.assertTrue(5100 < estimate.bytes_by_endpoint['upload file'] < 6000)
+            self.assertTrue(self.s.get_request_budget().allows(estimate))
+
+            tree = self.root.upload_tree(os.path.join(local, 'tree'))
+            self.assertEqual(self.server.requests['upload file'] - sent['upload file'], 2)
+            one, sub = sorted(tree.list(), key=lambda item: item.name)
+            self.assertEqual((one.name, sub.name), ('one', 'sub'))
+            self.assertEqual(sub.list()[0].read(), 'x' * 5000)
+        finally:
+            shutil.rmtree(local)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+from test_settings import ButtFSTestCase
+from buttfs.standin import StandInServer
+from buttfs.private.cached_object import CachedObject
+from buttfs.private.cache_stats import CacheStatsRegistry
+import unittest
+
+
+class CountedObject(CachedObject):
+    CACHE_EXPIRE = 60
+    CACHE_NAME = 'counted'
+
+    def __init__(self):
+        super(CountedObject, self).__init__()
+        self.cache_stats = CacheStatsRegistry()
+        self.refreshes = 0
+
+    def _refresh_request(self, debug=False):
+        self.refreshes += 1
+        return {}, {}
+
+
+class CachedObjectStatsTests(ButtFSTestCase):
+    def setUp(self):
+        self.item = CountedObject()
+
+    def stats(self):
+        return self.item.cache_stats.snapshot()['counted']
+
+    def test_refreshes(self):
+        self.item.refresh()
+        self.item._mark_dirty()
+        self.item._prepare_to_read()
+        self.item._prepare_to_read()
+
+        stats = self.stats()
+        self.assertEqual(self.item.refreshes, 2)
+        self.assertEqual(stats['refreshes'], 2)
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_ratio']), (0, 0, None))
+
+
+class SessionCacheStatsTests(ButtFSTestCase):
+    def setUp(self):
+        self.server = StandInServer()
+        self.s = self.server.session()
+        self.s.authenticate(self.server.username, self.server.password)
+
+    def test_snapshot_and_sink(self):
+        events = []
+        self.s.set_cache_stats_sink(lambda name, event, value: events.append((name, event)))
+        self.s.get_user()
+        self.s.get_user()
+        self.assertEqual(events, [('profile', 'miss'), ('profile', 'refresh'), ('profile', 'hit')])
+
+        stats = self.s.cache_stats()
+        self.assertEqual((stats['profile']['hits'], stats['profile']['misses']), (1, 1))
+        self.assertTrue(stats['profile']['bytes_held'] > 0, "Size was not reported!")
+        self.assertIn('path', stats)
+
+        self.s.set_cache_stats_sink(None)
+        self.s.get_user()
+        self.assertEqual(len(events), 3, "Removed sink was called!")
+        self.assertEqual(self.s.cache_stats()['profile']['hits'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
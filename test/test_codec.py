@@ -0,0 +1,45 @@
+from test_settings import ButtFSTestCase
+from buttfs.private import codec
+from buttfs.private.utils import RequestLog
+from buttfs.errors import error_from_response, FileNotFound
+import unittest
+
+
+class UnreadableResponse(object):
+    status_code = 404
+    headers = {'Content-Type': 'application/json'}
+
+    @property
+    def content(self):
+        raise AssertionError("Response body was decoded again!")
+
+
+class FakeRequest(object):
+    method = 'GET'
+    url = 'https://example.com/v2/files/a'
+    headers = {}
+
+
+class CodecTests(ButtFSTestCase):
+    def tearDown(self):
+        codec.use()
+
+    def test_fallback(self):
+        self.assertEqual(codec.use('json').__name__, 'json')
+        self.assertEqual(codec.name(), 'json')
+        self.assertEqual(codec.loads('{"a": [1]}'), {'a': [1]})
+        self.assertEqual(codec.try_loads('not json', 'default'), 'default')
+
+    def test_decoded_once(self):
+        body = {'error': {'code': 3001, 'message': 'Not found'}}
+        error = error_from_response(FakeRequest(), UnreadableResponse(), body)
+        self.assertTrue(isinstance(error, FileNotFound), "Wrong error for code!")
+        self.assertEqual(error.json(), body)
+        self.assertTrue('ButtFS Error Code: 3001' in str(error))
+
+        log = RequestLog(FakeRequest(), UnreadableResponse(), body)
+        self.assertTrue('Not found' in str(log))
+        self.assertTrue(str(log) is str(log), "Log was formatted twice!")
+
+if __name__ == '__main__':
+    unittest.main()
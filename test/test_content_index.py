@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from test_settings import ButtFSTestCase
+from buttfs.standin import StandInServer
+from buttfs.content_index import ContentIndex, hash_content
+
+
+class DedupeUploadTests(ButtFSTestCase):
+    def setUp(self):
+        self.server = StandInServer()
+        self.s = self.server.session()
+        self.s.authenticate(self.server.username, self.server.password)
+        self.root = self.s.get_filesystem().root_container()
+        self.folder = tempfile.mkdtemp()
+        self.local = os.path.join(self.folder, 'asset.bin')
+        with open(self.local, 'wb') as fp:
+            fp.write('large asset' * 1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_copies_uploaded_content(self):
+        first = self.root.create_folder('first')
+        second = self.root.create_folder('second')
+        self.server.requests.clear()
+
+        uploaded = first.upload(self.local, dedupe=True)
+        copied = second.upload(self.local, dedupe=True)
+        reused = first.upload(self.local, dedupe=True)
+        self.assertEqual(self.server.requests['upload file'], 1)
+        self.assertEqual(self.server.requests['copy file'], 1)
+        self.assertEqual(str(copied.path().parent), str(second.path()))
+        self.assertEqual(copied.read(), 'large asset' * 1000)
+        self.assertEqual(reused.path(), uploaded.path())
+
+        uploaded.delete(commit=True)
+        first.upload(self.local, dedupe=True)
+        self.assertEqual(self.server.requests['upload file'], 2, "Deleted content should be uploaded again!")
+
+        self.root.upload(self.local, custom_name='other.bin', data_inline=False)
+        self.assertEqual(self.server.requests['upload file'], 3)
+
+    def test_kept_between_sessions(self):
+        path = os.path.join(self.folder, 'index', 'content.json')
+        index = self.s.keep_content_index(path)
+        uploaded = self.root.upload('inline content', custom_name='inline.txt', data_inline=True, dedupe=True)
+        self.assertEqual(len(index), 1)
+
+        later = self.server.session()
+        later.authenticate(self.server.username, self.server.password)
+        later.keep_content_index(path)
+        self.assertEqual(later.get_content_index().lookup(hash_content('inline content', True))['path'],
+                         str(uploaded.path()))
+        copy = later.get_filesystem().root_container().create_folder('later').upload(
+            'inline content', custom_name='inline.txt', data_inline=True, dedupe=True)
+        self.assertEqual(copy.read(), 'inline content')
+        self.assertEqual(self.server.requests['upload file'], 1)
+        self.assertEqual(len(ContentIndex(path)), 1)
+
+    def test_batched_writes(self):
+        path = os.path.join(self.folder, 'content.json')
+        index = self.s.keep_content_index(path)
+        tree = os.path.join(self.folder, 'tree')
+        os.mkdir(tree)
+        for number in range(3):
+            with open(os.path.join(tree, '{}.txt'.format(number)), 'wb') as fp:
+                fp.write('file {}'.format(number))
+
+        with index.batch():
+            self.root.upload_tree(tree, dedupe=True)
+            self.assertEqual(len(index), 3)
+            self.assertEqual(len(ContentIndex(path)), 0, "Index was written during the batch!")
+            index.flush()
+            self.assertEqual(len(ContentIndex(path)), 3)
+            index.discard(hash_content('file 0', True))
+        self.assertEqual(len(ContentIndex(path)), 2)
+
+        # debug, priority and dedupe come after the arguments that were there before them
+        self.root.upload('positional', 'p.txt', None, 'fail', True, False)
+
+
+if __name__ == '__main__':
+    unittest.main()
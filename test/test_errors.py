@@ -1,8 +1,24 @@
-from test_settings import SessionTestCase
+from test_settings import SessionTestCase, ButtFSTestCase
 from buttfs import errors
+import inspect
 import unittest
 
 
+class ErrorIndexTests(ButtFSTestCase):
+    def test_index_matches_classes(self):
+        # how the index used to be built at import time, in order of name
+        expected = {}
+        for name in sorted(vars(errors)):
+            excpt = getattr(errors, name)
+            if not (inspect.isclass(excpt) and issubclass(excpt, errors.AuthenticatedError)):
+                continue
+            codes = excpt.INTERNAL_CODE if type(excpt.INTERNAL_CODE) is tuple else (excpt.INTERNAL_CODE,)
+            for code in codes:
+                if code is not None and code % 1000 != 0:
+                    expected[code] = excpt
+        self.assertEqual(errors._error_index, expected)
+
+
 class FolderErrorTests(SessionTestCase):
     # There are some errors that are defined. but are never returned
     # by the REST interface.
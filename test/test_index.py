@@ -0,0 +1,69 @@
+from test_settings import ButtFSTestCase
+from buttfs.index import ItemIndex
+from buttfs.private.path_cache import PathCache
+import unittest
+
+
+class ListingInterface(object):
+    # answers listings from a dictionary instead of the server
+    def __init__(self, tree):
+        self.tree = tree
+        self.path_cache = PathCache()
+        self.listed = []
+
+    def list_folder(self, path):
+        self.listed.append(str(path))
+        return {'items': self.tree.get(str(path), [])}
+
+    def list_trash(self, path):
+        return {'items': []}
+
+    def get_copy(self):
+        return self
+
+
+def folder(id, name):
+    return {'id': id, 'name': name, 'type': 'folder', 'version': 1, 'date_created': 10,
+            'date_meta_last_modified': 10, 'date_content_last_modified': 10, 'is_mirrored': False}
+
+def file(id, name, size, modified):
+    extension = name.rsplit('.', 1)[-1]
+    return {'id': id, 'name': name, 'type': 'file', 'version': 1, 'size': size, 'extension': extension,
+            'mime': 'video/quicktime' if extension == 'mov' else 'image/jpeg', 'date_created': 10,
+            'date_meta_last_modified': modified, 'date_content_last_modified': modified, 'is_mirrored': False}
+
+
+class ItemIndexTests(ButtFSTestCase):
+    def setUp(self):
+        self.rest = ListingInterface({
+            '/': [folder('a', 'Videos'), file('p', 'photo.jpg', 10, 100)],
+            '/a': [file('m', 'big.mov', 2 * 1024 ** 3, 500), file('n', 'small.mov', 10, 500)],
+        })
+        self.index = ItemIndex(self.rest).build()
+
+    def test_build(self):
+        self.assertEqual(len(self.index), 4, "Wrong number of indexed items!")
+        self.assertEqual(self.rest.listed, ['/', '/a'], "Each folder should be listed once!")
+
+    def test_find(self):
+        found = self.index.find(extension='mov', min_size=1024 ** 3, modified_after=400)
+        self.assertEqual([item.name for item in found], ['big.mov'], "Wrong search results!")
+        self.assertEqual(str(found[0].path()), '/a/m', "Result has the wrong path!")
+        self.assertEqual(found[0].size, 2 * 1024 ** 3, "Result has the wrong size!")
+        self.assertEqual(len(self.index.find(name='*.mov')), 2, "Glob matched wrong items!")
+        self.assertEqual(len(self.index.find(regex='^photo')), 1, "Regex matched wrong items!")
+        self.assertEqual([item.name for item in self.index.find(name='*.mov', regex='^s')], ['small.mov'])
+        self.assertEqual(len(self.index.find(mime='image/jpeg')), 1, "Mime matched wrong items!")
+        self.assertEqual(len(self.index.find(item_type='folder')), 1, "Type matched wrong items!")
+        self.assertEqual(self.index.find(extension='txt'), [], "Unknown extension should not match!")
+
+    def test_refresh(self):
+        self.rest.tree['/a'] = [file('o', 'other.mov', 5, 600)]
+        self.rest.tree['/'].append(folder('b', 'New'))
+        self.rest.tree['/b'] = [file('q', 'new.jpg', 5, 600)]
+        self.index.refresh('/a', '/')
+        names = sorted(item.name for item in self.index.find())
+        self.assertEqual(names, ['New', 'Videos', 'new.jpg', 'other.mov', 'photo.jpg'], "Refresh did not update index!")
+
+if __name__ == '__main__':
+    unittest.main()
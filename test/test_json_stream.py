@@ -0,0 +1,42 @@
+from test_settings import ButtFSTestCase
+from buttfs.private.json_stream import ArrayParser, iter_array
+import json
+import random
+import unittest
+
+
+class ArrayParserTests(ButtFSTestCase):
+    def setUp(self):
+        items = [{'id': str(i), 'name': u'n\xe4me {}"[}}\\'.format(i) * (i % 3 + 1), 'type': 'file',
+                  'application_data': {'items': [i, {'x': '{'}]}} for i in range(50)]
+        self.items = json.loads(json.dumps(items))
+        self.document = json.dumps({'result': {'meta': {'name': 'items', 'items': 1},
+                                               'items': items}})
+
+    def chunks(self, size):
+        return [self.document[i:i + size] for i in range(0, len(self.document), size)]
+
+    def test_chunk_sizes(self):
+        for size in (1, 2, 3, 7, 64, len(self.document)):
+            self.assertEqual(list(iter_array(self.chunks(size))), self.items,
+                             "Parse failed with chunk size {}!".format(size))
+
+    def test_random_chunks(self):
+        random.seed(4)
+        chunks = []
+        position = 0
+        while position < len(self.document):
+            size = random.randint(1, 40)
+            chunks.append(self.document[position:position + size])
+            position += size
+        self.assertEqual(list(iter_array(chunks)), self.items)
+
+    def test_incremental(self):
+        parser = ArrayParser()
+        first = self.document.index('"items": [') + len('"items": [') + len(json.dumps(self.items[0]))
+        self.assertEqual(len(parser.feed(self.document[:first - 1])), 0)
+        self.assertEqual(parser.feed(self.document[first - 1:first + 1]), self.items[:1], "First item not yielded early!")
+        self.assertRaises(ValueError, parser.close)
+
+if __name__ == '__main__':
+    unittest.main()
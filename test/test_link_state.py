@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from test_settings import ButtFSTestCase
+from buttfs.standin import StandInServer
+from buttfs import errors
+
+
+class LinkStateTests(ButtFSTestCase):
+    def setUp(self):
+        self.server = StandInServer()
+        self.s = self.server.session()
+        self.s.authenticate(self.server.username, self.server.password)
+        self.root = self.s.get_filesystem().root_container()
+
+    def test_link_state_is_cached(self):
+        self.server.requests.clear()
+        for _ in range(3):
+            self.assertTrue(self.s.is_linked())
+        self.assertEqual(len(self.server.requests), 0, "is_linked should not ping a verified token!")
+        self.assertTrue(self.s.is_linked(refresh=True))
+        self.assertEqual(dict(self.server.requests), {'ping': 1})
+
+        self.server.revoke_tokens()
+        self.assertRaises(errors.AuthenticatedError, self.root.list)
+        self.assertFalse(self.s.is_linked())
+
+    def test_reauthenticate_once(self):
+        self.s.set_reauthentication(self.server.username, self.server.password)
+        old_credentials = self.s.export_credentials()
+        self.server.revoke_tokens()
+        self.server.requests.clear()
+
+        self.root.create_folder('first')
+        self.root.create_folder('second')
+        self.assertEqual(self.server.requests['get oauth token'], 1)
+        self.assertEqual(self.server.requests['create folder'], 2)
+        self.assertNotEqual(self.s.export_credentials(), old_credentials)
+        self.assertTrue(self.s.is_linked())
+
+        calls = []
+        self.s.set_reauthentication(get_token=lambda: calls.append(1) or 'refused')
+        self.server.revoke_tokens()
+        self.assertRaises(errors.AuthenticatedError, self.root.list)
+        self.assertEqual(len(calls), 1, "Should retry only once!")
+
+        self.s.set_reauthentication()
+        self.assertRaises(errors.MissingArgument, self.s.set_reauthentication, self.server.username)
+
+    def test_reauthenticate_with_refused_token(self):
+        refused = self.s.export_credentials()['auth_token']
+        self.s.set_reauthentication(get_token=lambda: refused)
+        self.server.revoke_tokens()
+        self.assertRaises(errors.AuthenticatedError, self.root.list)
+        self.assertRaises(errors.AuthenticatedError, self.root.list)
+        self.assertEqual(self.s.export_credentials()['auth_token'], refused)
+
+        authentication = self.s.rest_interface.bc_conn.authentication
+        authentication.replacements.update({'first': 'second', 'second': 'first'})
+        self.assertIn(authentication.current('first'), ('first', 'second'))
+
+    def test_retried_upload_keeps_content(self):
+        self.s.set_reauthentication(self.server.username, self.server.password)
+        self.server.revoke_tokens()
+        fd, path = tempfile.mkstemp()
+        try:
+            os.write(fd, 'content of the upload')
+            os.close(fd)
+            uploaded = self.root.upload(path, custom_name='retried.txt')
+        finally:
+            os.remove(path)
+        self.assertEqual(uploaded.read(), 'content of the upload')
+
+
+if __name__ == '__main__':
+    unittest.main()
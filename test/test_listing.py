@@ -0,0 +1,49 @@
+from test_settings import ButtFSTestCase
+from buttfs.private.filesystem_common import create_listing
+from buttfs.private.buttfs_paths import ListFormat
+from buttfs.container import Folder
+from buttfs.file import File
+import unittest
+
+
+class CountingInterface(object):
+    def __init__(self):
+        self.copies = 0
+
+    def get_copy(self):
+        self.copies += 1
+        return self
+
+
+class LazyItemListTests(ButtFSTestCase):
+    def setUp(self):
+        self.rest = CountingInterface()
+        rows = [{'id': str(i), 'name': 'file{}'.format(i), 'type': 'file', 'version': 1, 'size': i}
+                for i in range(100)]
+        rows.append({'id': 'd', 'name': 'docs', 'type': 'folder', 'version': 1})
+        self.items = create_listing(self.rest, {'items': rows}, '/p', list_format=ListFormat.lazy)
+
+    def test_created_on_access(self):
+        self.assertEqual(len(self.items), 101)
+        self.assertEqual(self.items.names()[:2], ['file0', 'file1'])
+        self.assertEqual(self.rest.copies, 0, "Listing created items eagerly!")
+
+        folder = self.items.find('docs')
+        self.assertTrue(isinstance(folder, Folder), "Found the wrong type!")
+        self.assertEqual(str(folder.path()), '/p/d', "Item path incorrect!")
+        self.assertTrue(self.items[-1] is folder, "Item created twice!")
+        self.assertEqual(self.items.created_count(), 1)
+        self.assertTrue(self.items.find('missing') is None)
+
+    def test_slices(self):
+        tail = self.items[95:]
+        self.assertEqual(len(tail), 6)
+        self.assertEqual(self.rest.copies, 0, "Slicing created items!")
+        self.assertTrue(isinstance(tail[0], File))
+        self.assertTrue(tail[0] is self.items[95], "Slice does not share items!")
+        self.assertEqual(tail[::2].names(), ['file95', 'file97', 'file99'])
+        self.assertEqual(list(tail), self.items.materialize()[95:])
+        self.assertRaises(IndexError, lambda: tail[6])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from test_settings import ButtFSTestCase
+from buttfs.standin import StandInServer
+from buttfs.metrics import HistogramSink, PrometheusSink, CallbackSink, RequestRecord
+from buttfs import errors
+
+
+class MetricsTests(ButtFSTestCase):
+    def setUp(self):
+        self.server = StandInServer()
+        self.s = self.server.session()
+        self.records = []
+        self.s.add_metrics_sink(self.records.append)
+        self.s.authenticate(self.server.username, self.server.password)
+        self.root = self.s.get_filesystem().root_container()
+
+    def test_records(self):
+        new_file = self.root.upload('0123456789', custom_name='digits.txt', data_inline=True)
+        new_file.read()
+        self.assertRaises(errors.FolderDoesNotExist, self.s.get_filesystem().list, '/missing')
+
+        by_endpoint = dict((record.endpoint, record) for record in self.records)
+        self.assertEqual(by_endpoint['get oauth token'].method, 'POST')
+
+        upload = by_endpoint['upload file']
+        self.assertEqual((upload.status, upload.error), (200, None))
+        self.assertGreater(upload.bytes_sent, 10)
+        self.assertGreater(upload.bytes_received, 0)
+        self.assertIsNone(upload.connection_reused, "Stand-in does not pool connections!")
+        self.assertTrue(0 <= upload.queue_wait <= upload.time_to_first_byte + upload.queue_wait <= upload.total_time)
+
+        self.assertEqual(by_endpoint['download file'].bytes_received, 10)
+        failed = by_endpoint['list folder']
+        self.assertEqual((failed.status, failed.error), (404, 'FolderDoesNotExist'))
+
+    def test_background_download(self):
+        new_file = self.root.upload('x' * 1000, custom_name='x.txt', data_inline=True)
+        folder = tempfile.mkdtemp()
+        try:
+            new_file.download(folder)
+            new_file.wait_for_downloads()
+        finally:
+            shutil.rmtree(folder)
+        self.assertEqual(self.records[-1].endpoint, 'download file')
+        self.assertEqual(self.records[-1].bytes_received, 1000)
+
+    def test_sinks(self):
+        histogram = self.s.add_metrics_sink(PrometheusSink(buckets=(1.0,)))
+        listed = []
+        self.s.add_metrics_sink(CallbackSink(listed.append, endpoints=['list folder']))
+        self.root.list()
+        self.root.list()
+        self.root.create_folder('a')
+        self.s.remove_metrics_sink(self.records.append)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot[('list folder', 'GET', 200)]['count'], 2)
+        self.assertEqual(snapshot[('list folder', 'GET', 200)]['buckets'], [2, 2])
+        self.assertEqual(len(listed), 2)
+        self.assertEqual(histogram.quantile(0.5), 1.0)
+
+        text = histogram.exposition()
+        self.assertIn('buttfs_request_duration_seconds_bucket{endpoint="list folder",method="GET",status="200",le="+Inf"} 2',
+                      text)
+        self.assertIn('# TYPE buttfs_request_sent_bytes_total counter', text)
+
+        count = len(self.records)
+        self.root.list()
+        self.assertEqual(len(self.records), count, "Removed sink was called!")
+
+    def test_label_escaping(self):
+        sink = PrometheusSink()
+        record = RequestRecord('odd "name"\n', 'GET')
+        record.status = 200
+        sink.record(record)
+        self.assertIn('endpoint="odd \\"name\\"\\n"', sink.exposition())
+
+    def test_write_replaces_file(self):
+        sink = PrometheusSink()
+        folder = tempfile.mkdtemp()
+        try:
+            target = os.path.join(folder, 'buttfs.prom')
+            sink.write(target)
+            record = RequestRecord('list folder', 'GET')
+            record.status = 200
+            sink.record(record)
+            sink.write(target)
+            with open(target) as fp:
+                self.assertEqual(fp.read(), sink.exposition())
+            self.assertEqual(os.listdir(folder), ['buttfs.prom'])
+        finally:
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    unittest.main()
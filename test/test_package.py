@@ -0,0 +1,31 @@
+import os
+import sys
+import subprocess
+import unittest
+
+from test_settings import ButtFSTestCase
+import buttfs
+from buttfs import errors
+from buttfs.session import Session
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class LazyPackageTests(ButtFSTestCase):
+    def test_names(self):
+        self.assertIs(buttfs.Session, Session)
+        self.assertIs(buttfs.FolderNotFound, errors.FolderNotFound)
+        self.assertIn('ItemTable', dir(buttfs))
+        for name in buttfs.__all__:
+            self.assertTrue(hasattr(buttfs, name), name)
+        self.assertRaises(AttributeError, getattr, buttfs, 'NotAName')
+
+    def test_import_is_light(self):
+        code = 'import sys, buttfs; print(sorted(m for m in ("requests", "numpy", "buttfs.session") if m in sys.modules))'
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        output = subprocess.check_output([sys.executable, '-c', code], env=env)
+        self.assertEqual(output.strip(), '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
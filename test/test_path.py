@@ -39,6 +39,40 @@ class PathTests(ButtFSTestCase):
         self.assertEqual(len(p), 6, "Path length not at 6.")
         self.assertEqual(p[5], 'e', "5th item in path not d.")
         self.assertEqual(str(p), '/a/b/c/d/e', "Path string incorrect.")
+    def test_path_child_shares_parent(self):
+        p = Path.path_from_string('/a/b')
+        c = p.child('c')
+        self.assertEqual(str(p), '/a/b', "Parent path was modified!")
+        self.assertEqual(str(c), '/a/b/c', "Child path string incorrect.")
+        self.assertEqual(c.parent, p, "Child parent is not the original path.")
+        self.assertEqual(c.name, 'c', "Child name incorrect.")
+        self.assertEqual(Path.root().parent, None, "Root should not have a parent.")
+
+    def test_path_copy_is_independent(self):
+        p = Path.path_from_string('/a')
+        c = p.copy()
+        c.append('b')
+        self.assertEqual(str(p), '/a', "Appending to a copy changed the original!")
+        self.assertEqual(str(c), '/a/b', "Copy did not append.")
+
+    def test_path_equality(self):
+        self.assertEqual(Path.path_from_string('/a/b'), Path.root().child('a').child('b'))
+        self.assertEqual(Path.path_from_string('/a/b'), '/a/b', "Path should equal its string.")
+        self.assertNotEqual(Path.path_from_string('/a/b'), Path.path_from_string('/a/c'))
+        self.assertEqual(len(set([Path.path_from_string('/a'), Path.root().child('a')])), 1, "Equal paths hash differently!")
+
+    def test_path_is_ancestor(self):
+        a = Path.path_from_string('/a')
+        self.assertTrue(Path.root().is_ancestor(a))
+        self.assertTrue(a.is_ancestor(a.child('b').child('c')))
+        self.assertTrue(a.is_ancestor('/a/b'))
+        self.assertFalse(a.is_ancestor(a))
+        self.assertFalse(a.is_ancestor('/ab'))
+        self.assertFalse(a.child('b').is_ancestor(a))
+
+    def test_item_path_from_string(self):
+        a = Item(None)._create_from_json({'id':'c', 'name':'c'}, '/a/b')
+        self.assertEqual(str(a.path()), '/a/b/c', "Item path from a string parent incorrect.")
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,73 @@
+from test_settings import ButtFSTestCase
+from buttfs.private.path_cache import PathCache
+from buttfs.private.cache_stats import CacheStatsRegistry
+import unittest
+
+
+class PathCacheTests(ButtFSTestCase):
+    TREE = {
+        '/': [{'id': 'a', 'name': 'Photos', 'type': 'folder'}],
+        '/a': [{'id': 'b', 'name': '2014', 'type': 'folder'}],
+        '/a/b': [{'id': 'c', 'name': 'a.jpg', 'type': 'file'}],
+    }
+
+    def setUp(self):
+        self.listed = []
+        self.cache = PathCache()
+
+    def list_folder(self, path):
+        self.listed.append(path)
+        return self.TREE.get(path, [])
+
+    def test_resolve_lists_each_level_once(self):
+        data, parent = self.cache.resolve(['Photos', '2014', 'a.jpg'], self.list_folder)
+        self.assertEqual(data['id'], 'c', "Resolved the wrong item!")
+        self.assertEqual(parent, '/a/b', "Wrong parent path!")
+        self.assertEqual(self.listed, ['/', '/a', '/a/b'], "Wrong folders listed!")
+
+        self.cache.resolve(['Photos', '2014', 'a.jpg'], self.list_folder)
+        self.assertEqual(len(self.listed), 3, "Repeat lookup should not list any folders!")
+
+    def test_resolve_missing(self):
+        self.assertEqual(self.cache.resolve(['Photos', 'nope'], self.list_folder), None)
+        self.assertEqual(self.cache.resolve(['Photos', '2014', 'a.jpg', 'x'], self.list_folder), None)
+
+    def test_invalidate(self):
+        self.cache.resolve(['Photos', '2014', 'a.jpg'], self.list_folder)
+        self.cache.invalidate('/a')
+        self.cache.resolve(['Photos', '2014', 'a.jpg'], self.list_folder)
+        self.assertEqual(self.listed[3:], ['/a'], "Only the invalidated folder should be listed!")
+
+    def test_forget(self):
+        self.cache.resolve(['Photos', '2014', 'a.jpg'], self.list_folder)
+        self.cache.forget('/a/b')
+        self.cache.resolve(['Photos', '2014', 'a.jpg'], self.list_folder)
+        self.assertEqual(self.listed[3:], ['/a', '/a/b'], "Forgotten folders should be listed again!")
+
+    def test_expire(self):
+        self.cache.CACHE_EXPIRE = -1
+        self.cache.resolve(['Photos'], self.list_folder)
+        self.cache.resolve(['Photos'], self.list_folder)
+        self.assertEqual(self.listed, ['/', '/'], "Expired listing should be refreshed!")
+
+    def test_stats(self):
+        events = []
+        registry = CacheStatsRegistry()
+        registry.sink = lambda name, event, value: events.append(event)
+        cache = PathCache(stats=registry.get('path'))
+        cache.resolve(['Photos', '2014', 'a.jpg'], self.list_folder)
+        cache.resolve(['Photos', '2014', 'a.jpg'], self.list_folder)
+        stats = registry.snapshot()['path']
+        self.assertEqual((stats['hits'], stats['misses'], stats['refreshes']), (3, 3, 3))
+        self.assertTrue(stats['bytes_held'] > 0, "Size was not reported!")
+
+        # the listing was fresh, but did not have the name
+        cache.resolve(['Photos', 'new'], self.list_folder)
+        cache.forget('/a')
+        stats = registry.snapshot()['path']
+        self.assertEqual((stats['misses'], stats['stale_serves']), (4, 1))
+        self.assertEqual(stats['evictions'], 3, "Forgotten folder and its children should be evicted!")
+        self.assertEqual(events.count('eviction'), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+from test_settings import ButtFSTestCase
+from buttfs.private.profile_cache import ProfileCache
+from buttfs.private.cache_stats import CacheStatsRegistry
+import unittest
+import threading
+import time
+
+
+class ProfileCacheTests(ButtFSTestCase):
+    def setUp(self):
+        self.cache = ProfileCache()
+        self.fetches = 0
+
+    def fetch(self):
+        self.fetches += 1
+        time.sleep(0.05)
+        return {'fetch': self.fetches}
+
+    def test_cached(self):
+        self.assertEqual(self.cache.get(self.fetch), {'fetch': 1})
+        self.assertEqual(self.cache.get(self.fetch), {'fetch': 1}, "Profile was not cached!")
+        self.assertEqual(self.cache.get(self.fetch, max_age=-1), {'fetch': 2}, "max_age was ignored!")
+        self.cache.invalidate()
+        self.assertEqual(self.cache.get(self.fetch), {'fetch': 3}, "Invalidated profile was reused!")
+
+    def test_coalesced(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get(self.fetch))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.fetches, 1, "Concurrent requests were not coalesced!")
+        self.assertEqual(results, [{'fetch': 1}] * 5)
+
+    def test_invalidated_during_fetch(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_fetch():
+            started.set()
+            release.wait()
+            return {'fetch': 'stale'}
+
+        results = []
+        thread = threading.Thread(target=lambda: results.append(self.cache.get(slow_fetch)))
+        thread.start()
+        started.wait()
+        self.cache.invalidate()
+        self.assertEqual(self.cache.get(self.fetch), {'fetch': 1}, "Waited for the invalidated fetch!")
+        release.set()
+        thread.join()
+        self.assertEqual(results, [{'fetch': 'stale'}])
+        self.assertEqual(self.cache.get(self.fetch), {'fetch': 1}, "Invalidated fetch was kept!")
+
+    def test_stats(self):
+        events = []
+        registry = CacheStatsRegistry()
+        registry.sink = lambda name, event, value: events.append((name, event))
+        cache = ProfileCache(stats=registry.get('profile'))
+        cache.get(self.fetch)
+        cache.get(self.fetch)
+        cache.invalidate()
+        stats = registry.snapshot()['profile']
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions'], stats['refreshes']), (1, 1, 1, 1))
+        self.assertTrue(stats['bytes_held'] > 0, "Size was not reported!")
+        self.assertEqual(events, [('profile', 'miss'), ('profile', 'refresh'), ('profile', 'hit'), ('profile', 'eviction')])
+
+    def test_headers(self):
+        self.cache.update_headers({'storage': {'limit': None, 'usage': '10'}})
+        self.cache.update_headers({'storage': {'usage': '20'}})
+        self.assertEqual(self.cache.header_information(), {'storage': {'limit': None, 'usage': '20'}})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import shutil
+import tempfile
+import unittest
+
+from test_settings import ButtFSTestCase
+from buttfs.standin import StandInServer
+from buttfs import errors
+
+
+class ProfilerTests(ButtFSTestCase):
+    def setUp(self):
+        self.server = StandInServer()
+        self.s = self.server.session()
+        self.s.authenticate(self.server.username, self.server.password)
+        self.root = self.s.get_filesystem().root_container()
+
+    def test_totals(self):
+        with self.s.profile() as profiler:
+            folder = self.root.create_folder('a')
+            folder.upload('0123456789', custom_name='digits.txt', data_inline=True)
+            folder.upload('0123456789', custom_name='more.txt', data_inline=True)
+            self.root.list()
+        self.root.list()
+
+        stats = profiler.stats()
+        upload = stats['operations']['Folder.upload']
+        self.assertEqual((upload['calls'], upload['requests'], upload['errors']), (2, 2, 0))
+        self.assertGreater(upload['bytes_sent'], 20)
+        self.assertGreaterEqual(upload['wall_time'], 0)
+        self.assertEqual(stats['operations']['Container.list']['calls'], 1, "Profiled after stop!")
+        self.assertEqual(stats['endpoints']['upload file']['requests'], 2)
+
+        report = profiler.report(sort='requests')
+        self.assertLess(report.index('Folder.upload'), report.index('Container.list'))
+        self.assertIn('REST endpoints', report)
+        self.assertRaises(errors.InvalidArgument, profiler.report, sort='size')
+
+    def test_background_requests(self):
+        uploaded = self.root.upload('0123456789', custom_name='digits.txt', data_inline=True)
+        folder = tempfile.mkdtemp()
+        try:
+            with self.s.profile() as profiler:
+                for _ in range(3):
+                    uploaded.download(folder)
+                    uploaded.wait_for_downloads()
+        finally:
+            shutil.rmtree(folder)
+        self.assertEqual(profiler.stats()['operations']['File.download']['requests'], 3)
+        # nothing is kept for operations once their requests have ended
+        self.assertEqual((profiler._ended, profiler._open_children, profiler._pending), ({}, {}, {}))
+
+    def test_cprofile(self):
+        profiler = self.s.profile(cprofile='Container.list')
+        self.root.list()
+        profiler.stop()
+        report = profiler.report(cprofile_lines=5)
+        self.assertIn('cProfile of Container.list', report)
+        self.assertIn('list_items_from_path', report)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+from test_settings import ButtFSTestCase
+from buttfs.private.filesystem_common import create_records_from_json
+from buttfs.file import File
+from buttfs.path import Path
+import unittest
+
+
+class RecordInterface(object):
+    def __init__(self):
+        self.copies = 0
+        self.altered = []
+
+    def get_copy(self):
+        self.copies += 1
+        return self
+
+    def file_alter_meta(self, path, changes, conflict):
+        self.altered.append((str(path), changes))
+        return {'meta': dict(changes, id='f', type='file', extension='txt', mime='text/plain', size=1)}
+
+
+class ItemRecordTests(ButtFSTestCase):
+    def setUp(self):
+        self.rest = RecordInterface()
+        listing = {'items': [
+            {'id': 'f', 'name': 'a.txt', 'type': 'file', 'version': 2, 'size': 1, 'extension': 'txt',
+             'mime': 'text/plain', 'date_created': 1, 'parent_id': 'p'},
+            {'id': 'd', 'name': 'docs', 'type': 'folder', 'version': 1},
+        ]}
+        self.records = create_records_from_json(self.rest, listing, Path.path_from_string('/p'))
+
+    def test_read_without_promotion(self):
+        record = self.records[0]
+        self.assertEqual((record.name, record.size, record.mime), ('a.txt', 1, 'text/plain'))
+        self.assertEqual(str(record.path()), '/p/f', "Record path incorrect!")
+        self.assertEqual(record.data['parent_id'], 'p', "Extra fields were not kept!")
+        self.assertFalse(record.is_promoted(), "Reading a field promoted the record!")
+        self.assertEqual(self.rest.copies, 0, "Records should share the rest interface!")
+        self.assertTrue(self.records[0].path().parent is not None)
+
+    def test_promote_on_change(self):
+        record = self.records[0]
+        record.name = 'b.txt'
+        self.assertTrue(record.is_promoted(), "Setting a field did not promote the record!")
+        self.assertTrue(isinstance(record.promote(), File), "Promoted to the wrong type!")
+        self.assertEqual(record.name, 'b.txt', "Record does not read from its item!")
+        record.save()
+        self.assertEqual(self.rest.altered, [('/p/f', {'name': 'b.txt', 'version': 2})], "Save sent wrong changes!")
+        self.assertEqual(record, self.records[0].promote(), "Record and item should be equal!")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import logging
+import unittest
+
+from test_settings import ButtFSTestCase
+from buttfs.standin import StandInServer
+from buttfs.request_logging import LOGGER_NAME, REDACTED
+from buttfs import errors
+
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class RequestLoggingTests(ButtFSTestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(LOGGER_NAME)
+        self.capture = _Capture()
+        self.logger.addHandler(self.capture)
+        self.logger.setLevel(logging.DEBUG)
+        self.server = StandInServer(password='hunter2')
+        self.s = self.server.session()
+
+    def tearDown(self):
+        self.logger.removeHandler(self.capture)
+        self.logger.setLevel(logging.NOTSET)
+
+    def test_redaction(self):
+        self.s.configure_request_logging(include_headers=True, max_body=None)
+        self.s.authenticate(self.server.username, self.server.password)
+        self.s.get_filesystem().root_container().list()
+
+        token, listing = [record.getMessage() for record in self.capture.records]
+        self.assertNotIn(self.server.password, token)
+        self.assertIn('password=' + REDACTED, token)
+        self.assertIn('"access_token": "{}"'.format(REDACTED), token)
+        self.assertIn("'Authorization': '{}'".format(REDACTED), listing)
+        self.assertNotIn(self.s.rest_interface.bc_conn.auth_token, listing)
+
+        fields = self.capture.records[1].buttfs
+        self.assertEqual((fields['endpoint'], fields['method'], fields['status']), ('list folder', 'GET', 200))
+
+    def test_levels_sampling_and_truncation(self):
+        self.s.authenticate(self.server.username, self.server.password)
+        root = self.s.get_filesystem().root_container()
+        self.s.configure_request_logging(sample_rate=3, endpoint_levels={'create folder': logging.INFO}, max_body=10)
+        self.logger.setLevel(logging.INFO)
+        del self.capture.records[:]
+
+        for name in 'abcdef':
+            root.create_folder(name)
+            root.list()
+        self.assertEqual(len(self.capture.records), 2)
+        self.assertTrue(all(record.buttfs['endpoint'] == 'create folder' for record in self.capture.records))
+        self.assertIn('more characters)', self.capture.records[0].getMessage())
+
+        self.assertRaises(errors.NameConflictInOperation, root.create_folder, 'a')
+        failure = self.capture.records[-1]
+        self.assertEqual((failure.levelno, failure.buttfs['error_code']), (logging.WARNING, 2042))
+
+    def test_disabled_level(self):
+        self.logger.setLevel(logging.INFO)
+        self.s.authenticate(self.server.username, self.server.password)
+        self.s.get_filesystem().root_container().list()
+        self.assertEqual(self.capture.records, [])
+
+    def test_last_request_log_not_copied(self):
+        self.s.authenticate(self.server.username, self.server.password)
+        root = self.s.get_filesystem().root_container()
+        root.create_folder('listed')
+        rest_interface = root.rest_interface
+        rest_interface.list_folder(root.path())
+        log = rest_interface.bc_conn._last_request_log
+        # every listed item gets a copy, so the response must not be copied with it
+        self.assertIs(rest_interface.get_copy().bc_conn._last_request_log, log)
+        self.assertIn('listed', str(rest_interface.get_copy().get_last_request_log()))
+
+    def test_unknown_setting(self):
+        self.assertRaises(errors.InvalidArgument, self.s.configure_request_logging, sampling=2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import time
+import unittest
+
+from test_settings import ButtFSTestCase
+from buttfs.standin import StandInServer
+from buttfs.session_pool import SessionPool
+from buttfs import errors
+
+
+class SessionPoolTests(ButtFSTestCase):
+    def setUp(self):
+        self.server = StandInServer()
+        self.pool = SessionPool(self.server.host, self.server.client_id, self.server.secret, max_sessions=2)
+        self.server.mount(self.pool)
+
+    def add(self, key):
+        return self.pool.add(key, username=self.server.username, password=self.server.password)
+
+    def test_shared_transport_and_isolated_credentials(self):
+        records = []
+        self.pool.add_metrics_sink(records.append)
+        first, second = self.add('first'), self.add('second')
+
+        first_http, second_http = first.rest_interface.bc_conn.http_session, second.rest_interface.bc_conn.http_session
+        self.assertIs(first_http.get_adapter('https://' + self.server.host), second_http.get_adapter('https://' + self.server.host))
+        first_http.cookies.set('tenant', 'first')
+        self.assertNotIn('tenant', second_http.cookies, "Cookies are shared between accounts!")
+        self.assertIs(first.get_bandwidth_limiter(), self.pool.get_bandwidth_limiter())
+        self.assertNotEqual(first.export_credentials(), second.export_credentials())
+        self.assertIsNot(first.rest_interface.path_cache, second.rest_interface.path_cache)
+        self.assertIsNot(first.get_request_budget(), second.get_request_budget())
+
+        first.get_user()
+        self.assertEqual(first.cache_stats()['profile']['misses'], 1)
+        self.assertEqual(second.cache_stats()['profile']['misses'], 0)
+        self.assertEqual([record.endpoint for record in records], ['get oauth token'] * 2 + ['get user profile'])
+
+        resumed = self.pool.add('resumed', credentials=first.export_credentials())
+        self.assertTrue(resumed.is_linked())
+        self.assertRaises(errors.InvalidArgument, self.pool.add, 'other', {'endpoint': 'x', 'client_id': 'y'})
+        self.assertRaises(errors.MissingArgument, self.pool.add, 'other')
+
+    def test_lru_eviction(self):
+        first = self.add('first')
+        self.add('second')
+        self.assertIs(self.pool.get('first'), first)
+        self.add('third')
+        self.assertEqual(self.pool.keys(), ['first', 'third'])
+        self.assertIsNone(self.pool.get('second'))
+        self.assertEqual(self.pool.evictions, 1)
+
+        self.pool.idle_timeout = 0.01
+        time.sleep(0.02)
+        self.assertEqual(self.pool.evict_idle(), 2)
+        self.assertEqual(len(self.pool), 0)
+        self.assertFalse(self.pool.remove('first'))
+
+
+if __name__ == '__main__':
+    unittest.main()
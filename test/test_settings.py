@@ -6,6 +6,7 @@ if __package__ is None:
 import unittest
 import datetime
 from buttfs.session import Session
+from buttfs.standin import StandInServer
 from buttfs.errors import OperationNotAllowed, MethodNotImplemented
 
 
@@ -26,6 +27,21 @@ class ButtFSTestCase(unittest.TestCase):
 
     UNIMPLEMENTED_SETTERS = []
     FORBIDDEN_SETTERS = []
+    standin = None
+
+    def create_session(self, base=None, client_id=None, secret=None):
+        """Session for the test account, not yet authenticated.
+        Without a live account configured, every test gets a fresh StandInServer.
+        """
+        session = Session(self.BUTTFS_BASE if base is None else base,
+                          self.BUTTFS_ID if client_id is None else client_id,
+                          self.BUTTFS_SECRET if secret is None else secret)
+        if USE_STANDIN:
+            if self.standin is None:
+                self.standin = StandInServer(self.BUTTFS_BASE, self.BUTTFS_ID, self.BUTTFS_SECRET,
+                                             self.TEST_USER_EMAIL, self.TEST_USER_PASSWORD)
+            self.standin.mount(session)
+        return session
 
     def get_example_object(self):
         return None
@@ -60,11 +76,16 @@ class ButtFSTestCase(unittest.TestCase):
         now = datetime.datetime.now()
         return now - datetime.timedelta(microseconds=now.microsecond)
 
+# no live account configured: run the functional tests against an in-process stand-in
+USE_STANDIN = not ButtFSTestCase.BUTTFS_BASE
+if USE_STANDIN:
+    ButtFSTestCase.BUTTFS_BASE = 'standin.buttfs.local'
+    ButtFSTestCase.TEST_USER_EMAIL = 'standin@buttfs.local'
+    ButtFSTestCase.TEST_USER_PASSWORD = 'password'
+
 class SessionTestCase(ButtFSTestCase):
     def setUp(self):
-        self.s = Session(self.BUTTFS_BASE,
-                self.BUTTFS_ID,
-                self.BUTTFS_SECRET)
+        self.s = self.create_session()
 
         self.s.authenticate(self.TEST_USER_EMAIL, self.TEST_USER_PASSWORD)
         self.assertEqual(True, self.s.is_linked(), "Authentication failed.")
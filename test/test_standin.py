@@ -0,0 +1,33 @@
+from test_settings import ButtFSTestCase
+from buttfs.standin import StandInServer
+from buttfs import errors
+import unittest
+
+
+class StandInServerTests(ButtFSTestCase):
+    def setUp(self):
+        self.server = StandInServer(storage_limit=1000)
+        self.s = self.server.session()
+        self.s.authenticate(self.server.username, self.server.password)
+        self.root = self.s.get_filesystem().root_container()
+
+    def test_headers_and_ranges(self):
+        new_file = self.root.upload('0123456789', custom_name='digits.txt', data_inline=True)
+        self.assertEqual(new_file.read(3), '0123', "Range end should be inclusive!")
+        account = self.s.get_account()
+        self.assertEqual((account.usage, account.limit), (10, '1000'), "Storage headers incorrect!")
+        self.assertEqual(self.server.requests['upload file'], 1)
+        self.assertEqual(self.server.requests['download file'], 1)
+
+    def test_errors(self):
+        self.root.create_folder('a')
+        self.assertRaises(errors.NameConflictInOperation, self.root.create_folder, 'a')
+        self.server.revoke_tokens()
+        try:
+            self.root.list()
+            self.fail("Revoked token was accepted!")
+        except errors.AuthenticatedError as e:
+            self.assertEqual(e.status(), 401)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+from test_settings import ButtFSTestCase
+from buttfs.table import ItemTable
+from buttfs import table
+from buttfs.container import Folder
+import unittest
+
+
+class TableInterface(object):
+    def get_copy(self):
+        return self
+
+
+LISTINGS = [
+    ('/', [
+        {'id': 'd', 'name': 'docs', 'type': 'folder', 'version': 1, 'date_created': 10},
+        {'id': 'm', 'name': 'b.mov', 'type': 'file', 'version': 1, 'size': 300, 'extension': 'mov',
+         'mime': 'video/quicktime', 'date_created': 20},
+    ]),
+    ('/d', [
+        {'id': 't', 'name': 'a.txt', 'type': 'file', 'version': 3, 'size': 5, 'extension': 'txt',
+         'mime': 'text/plain', 'date_created': 30},
+        {'id': 'u', 'name': 'c.txt', 'type': 'file', 'version': 1, 'size': 7, 'extension': 'txt',
+         'mime': 'text/plain', 'date_created': 40},
+    ]),
+]
+
+
+class ItemTableTests(ButtFSTestCase):
+    use_numpy = None
+
+    def setUp(self):
+        self.table = ItemTable.from_rows(TableInterface(), LISTINGS, use_numpy=self.use_numpy)
+
+    def test_filters(self):
+        self.assertEqual(len(self.table), 4)
+        self.assertEqual(list(self.table.filter(extension='txt')['id']), ['t', 'u'])
+        self.assertEqual(list(self.table.filter(name='*.mov', min_size=100)['id']), ['m'])
+        self.assertEqual(list(self.table.filter(item_type='folder')['name']), ['docs'])
+        self.assertEqual(list(self.table.filter(created_after=25, max_size=6)['id']), ['t'])
+        self.assertEqual(len(self.table.filter(regex='^z')), 0)
+        self.assertEqual(list(self.table.filter(name='*.txt', regex='^c')['id']), ['u'], "Both patterns should apply!")
+
+    def test_sort_and_aggregates(self):
+        self.assertEqual(list(self.table.sort('size', reverse=True)['id'])[:2], ['m', 'u'])
+        self.assertEqual(self.table.total_size(), 312)
+        self.assertEqual(self.table.total_size_by('extension'), {None: 0, 'mov': 300, 'txt': 12})
+        self.assertEqual(self.table.count_by('extension'), {None: 1, 'mov': 1, 'txt': 2})
+
+    def test_items(self):
+        text = self.table.filter(name='a.txt').item(0)
+        self.assertEqual(str(text.path()), '/d/t', "Item path incorrect!")
+        self.assertEqual((text.size, text.data['version'], text.mime), (5, 3, 'text/plain'))
+        folder = self.table.item(0)
+        self.assertTrue(isinstance(folder, Folder), "Row created the wrong type!")
+        self.assertEqual(str(folder.path()), '/d', "Root item path incorrect!")
+
+
+class ArrayItemTableTests(ItemTableTests):
+    use_numpy = False
+
+    def test_uses_arrays(self):
+        self.assertFalse(self.table.uses_numpy)
+
+    def test_large_sizes(self):
+        large = [('/', [{'id': 'l', 'name': 'l.iso', 'type': 'file', 'version': 1, 'size': 5 * 2 ** 30}])]
+        self.assertEqual(ItemTable.from_rows(TableInterface(), large, use_numpy=False).total_size(), 5 * 2 ** 30)
+
+
+@unittest.skipIf(table.load_numpy() is None, "NumPy is not installed")
+class NumpyItemTableTests(ItemTableTests):
+    use_numpy = True
+
+    def test_uses_numpy(self):
+        self.assertTrue(self.table.uses_numpy)
+
+if __name__ == '__main__':
+    unittest.main()
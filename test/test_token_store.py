@@ -0,0 +1,68 @@
+import os
+import stat
+import shutil
+import tempfile
+import unittest
+
+from test_settings import ButtFSTestCase
+from buttfs.standin import StandInServer
+from buttfs.session import Session
+from buttfs.token_store import TokenStore
+from buttfs import errors
+
+
+class TokenStoreTests(ButtFSTestCase):
+    def setUp(self):
+        self.server = StandInServer()
+        self.s = self.server.session()
+        self.s.authenticate(self.server.username, self.server.password)
+        self.folder = tempfile.mkdtemp()
+        self.store = TokenStore(os.path.join(self.folder, 'config', 'tokens.json'))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def resume(self, credentials):
+        session = Session.resume(credentials)
+        self.server.mount(session)
+        return session
+
+    def test_save_and_load(self):
+        name = self.s.save_credentials(self.store)
+        self.assertEqual(self.store.names(), [name])
+        self.assertEqual(stat.S_IMODE(os.stat(self.store.path).st_mode), 0600)
+        self.assertEqual(self.store.load(name), self.s.export_credentials())
+        self.assertIsNone(self.store.load('missing'))
+
+        self.store.save(self.s.export_credentials(), 'second')
+        self.assertTrue(self.store.remove(name))
+        self.assertEqual(self.store.names(), ['second'])
+
+        os.chmod(self.store.path, 0644)
+        self.assertRaises(errors.InsecureTokenStore, self.store.load, 'second')
+        self.assertRaises(errors.InvalidArgument, self.store.save, {'endpoint': 'x'})
+
+    def test_resume(self):
+        self.server.requests.clear()
+        resumed = self.resume(self.store.load(self.s.save_credentials(self.store)))
+        self.assertTrue(resumed.is_linked())
+        self.assertEqual(len(self.server.requests), 0, "Resuming should not make requests!")
+
+        resumed.get_filesystem().root_container().create_folder('resumed')
+        self.assertEqual(dict(self.server.requests), {'create folder': 1})
+        self.assertRaises(errors.InvalidArgument, Session.resume, {'endpoint': 'x', 'client_id': 'y'})
+
+    def test_resume_revoked(self):
+        credentials = self.s.export_credentials()
+        self.server.revoke_tokens()
+        resumed = self.resume(credentials)
+        self.assertTrue(resumed.is_linked())
+        self.assertRaises(errors.AuthenticatedError, resumed.get_filesystem().root_container().list)
+        self.assertFalse(resumed.is_linked())
+
+        self.s.unlink()
+        self.assertRaises(errors.SessionNotLinked, self.s.export_credentials)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import shutil
+import tempfile
+import threading
+import unittest
+
+from test_settings import ButtFSTestCase
+from buttfs.standin import StandInServer
+from buttfs.tracing import SpanCollector, Tracer, current_span, wrap
+from buttfs import errors
+
+
+class TracingTests(ButtFSTestCase):
+    def setUp(self):
+        self.server = StandInServer()
+        self.s = self.server.session()
+        self.s.authenticate(self.server.username, self.server.password)
+        self.fs = self.s.get_filesystem()
+        self.root = self.fs.root_container()
+        self.collector = self.s.add_span_exporter(SpanCollector())
+
+    def named(self, name):
+        return [span for span in self.collector.spans if span.name == name]
+
+    def test_nesting(self):
+        folder = self.root.create_folder('a')
+        new_file = folder.upload('data', custom_name='b.txt', data_inline=True)
+        self.fs.copy([new_file], self.root)
+        self.root.list()
+
+        upload, = self.named('Folder.upload')
+        self.assertEqual(upload.attributes['buttfs.path'], str(folder.path()))
+        rest_upload, = self.collector.children(upload)
+        self.assertEqual(rest_upload.name, 'rest upload file')
+        self.assertEqual(rest_upload.attributes['http.status_code'], 200)
+        self.assertEqual(rest_upload.trace_id, upload.trace_id)
+
+        copy, = self.named('Filesystem.copy')
+        self.assertEqual(copy.attributes['buttfs.item_count'], 1)
+        self.assertEqual([span.name for span in self.collector.children(copy)], ['rest copy file'])
+
+        listing, = self.named('Container.list')
+        self.assertEqual([span.name for span in self.collector.children(listing)], ['rest list folder'])
+        create, = self.named('Folder.create_folder')
+        self.assertEqual([span.name for span in self.collector.children(create)], ['rest create folder'])
+        self.assertIn('  rest list folder', self.collector.format_tree())
+
+    def test_error_and_background_download(self):
+        new_file = self.root.upload('x' * 100, custom_name='x.txt', data_inline=True)
+        local = tempfile.mkdtemp()
+        try:
+            new_file.download(local)
+            new_file.wait_for_downloads()
+        finally:
+            shutil.rmtree(local)
+        download, = self.named('File.download')
+        rest_download, = self.collector.children(download)
+        self.assertEqual(rest_download.attributes['http.response_content_length'], 100)
+
+        self.assertRaises(errors.InvalidArgument, self.fs.move, ['/missing'], self.root)
+        move, = self.named('Filesystem.move')
+        self.assertEqual(move.status, 'error')
+        self.assertTrue(move.error.startswith('InvalidArgument'))
+
+    def test_context_propagation(self):
+        tracer = Tracer()
+        tracer.add_exporter(lambda span: None)
+        seen = []
+        with tracer.span('outer') as outer:
+            thread = threading.Thread(target=wrap(lambda: seen.append(current_span())))
+            thread.start()
+            thread.join()
+        self.assertEqual(seen, [outer])
+        self.assertIsNone(current_span())
+
+    def test_disabled(self):
+        self.s.remove_span_exporter(self.collector)
+        self.root.list()
+        self.assertEqual(self.collector.spans, [])
+
+if __name__ == '__main__':
+    unittest.main()
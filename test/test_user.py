@@ -11,9 +11,7 @@ class UserTests(ButtFSTestCase):
     UNIMPLEMENTED_SETTERS = ['email', 'first_name', 'last_name']
 
     def setUp(self):
-        self.s = Session(self.BUTTFS_BASE,
-                self.BUTTFS_ID,
-                self.BUTTFS_SECRET)
+        self.s = self.create_session(self.BUTTFS_BASE, self.BUTTFS_ID, self.BUTTFS_SECRET)
 
         self.assertRaises(
             errors.ButtFSError,